@@ -0,0 +1,116 @@
+"""
+Engine and pool metrics.
+
+- db_pool_checkout_wait_seconds: time spent waiting for a pooled connection
+  (the pools below time QueuePool._do_get, which blocks when the pool is exhausted)
+- db_pool_connections{state}: in use / idle / overflow, read at collection time
+- db_statement_seconds: duration of every statement
+- per request (see begin_request_tally): statement count and total SQL time
+"""
+
+from __future__ import annotations
+
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.utils.metrics import gauge, histogram
+
+DB_CHECKOUT_WAIT = histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time waiting for a connection from the pool",
+    ("engine",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 30.0),
+)
+DB_POOL_CONNECTIONS = gauge("db_pool_connections", "Pooled connections by state", ("engine", "state"))
+DB_STATEMENT_SECONDS = histogram(
+    "db_statement_seconds",
+    "SQL statement duration",
+    ("engine",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0),
+)
+
+
+class TimedQueuePool(QueuePool):
+    engine_name = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_CHECKOUT_WAIT.observe(time.perf_counter() - started, engine=self.engine_name)
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    engine_name = "async"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_CHECKOUT_WAIT.observe(time.perf_counter() - started, engine=self.engine_name)
+
+
+@dataclass
+class SQLTally:
+    statements: int = 0
+    seconds: float = 0.0
+
+
+# set by the HTTP middleware for the duration of a request; sync routes run in a
+# worker thread with a copy of the context, so they update the same object
+_request_tally: ContextVar[SQLTally | None] = ContextVar("request_sql_tally", default=None)
+
+
+def begin_request_tally() -> SQLTally:
+    tally = SQLTally()
+    _request_tally.set(tally)
+    return tally
+
+
+_pools: dict[str, Pool] = {}
+
+
+def _pool_states() -> dict[tuple[str, ...], float]:
+    out: dict[tuple[str, ...], float] = {}
+    for name, pool in list(_pools.items()):
+        if not isinstance(pool, QueuePool):
+            continue
+        out[(name, "in_use")] = float(pool.checkedout())
+        out[(name, "idle")] = float(pool.checkedin())
+        out[(name, "overflow")] = float(max(0, pool.overflow()))
+    return out
+
+
+DB_POOL_CONNECTIONS.set_function(_pool_states)
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Statement timing/counting on `engine` (for AsyncEngine pass .sync_engine)."""
+    _pools[name] = engine.pool
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, _cursor, _statement, _params, _context, _executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, _cursor, _statement, _params, _context, _executemany):
+        started = conn.info["query_started"].pop()
+        elapsed = time.perf_counter() - started
+        DB_STATEMENT_SECONDS.observe(elapsed, engine=name)
+        tally = _request_tally.get()
+        if tally is not None:
+            tally.statements += 1
+            tally.seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _error(ctx):
+        stack = ctx.connection.info.get("query_started") if ctx.connection is not None else None
+        if stack:
+            stack.pop()
@@ -0,0 +1,28 @@
+"""ai session question plan
+
+Revision ID: 0004_ai_session_question_plan
+Revises: 0003_seed_default_plan_products
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_ai_session_question_plan"
+down_revision = "0003_seed_default_plan_products"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # packed 16-byte question UUIDs in asking order + position of the next one
+    op.add_column("ai_sessions", sa.Column("question_plan", sa.LargeBinary(), nullable=True))
+    op.add_column(
+        "ai_sessions",
+        sa.Column("question_cursor", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("ai_sessions", "question_cursor")
+    op.drop_column("ai_sessions", "question_plan")
@@ -0,0 +1,46 @@
+"""scoring versions and re-scoring checkpoints
+
+Revision ID: 0005_scoring_versions
+Revises: 0004_ai_session_question_plan
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0005_scoring_versions"
+down_revision = "0004_ai_session_question_plan"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("ai_evaluations", sa.Column("scoring_version", sa.String(length=32), nullable=True))
+    # existing rows keep NULL, which never conflicts
+    op.create_unique_constraint(
+        "uq_ai_evals_message_version", "ai_evaluations", ["message_id", "scoring_version"]
+    )
+
+    op.create_index(
+        "ix_ai_messages_user_created_id",
+        "ai_messages",
+        ["created_at", "id"],
+        postgresql_where=sa.text("role = 'user'"),
+    )
+
+    op.create_table(
+        "scoring_checkpoints",
+        sa.Column("scoring_version", sa.String(length=32), primary_key=True),
+        sa.Column("last_created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_message_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("processed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("scoring_checkpoints")
+    op.drop_index("ix_ai_messages_user_created_id", table_name="ai_messages")
+    op.drop_constraint("uq_ai_evals_message_version", "ai_evaluations", type_="unique")
+    op.drop_column("ai_evaluations", "scoring_version")
@@ -0,0 +1,30 @@
+"""payment event queue bookkeeping
+
+Revision ID: 0006_payment_event_queue
+Revises: 0005_scoring_versions
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_payment_event_queue"
+down_revision = "0005_scoring_versions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # the webhook only stores events now; the payments worker retries failures with backoff
+    op.add_column(
+        "payments_events",
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column("payments_events", sa.Column("last_error", sa.Text(), nullable=True))
+    op.add_column("payments_events", sa.Column("available_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("payments_events", "available_at")
+    op.drop_column("payments_events", "last_error")
+    op.drop_column("payments_events", "attempts")
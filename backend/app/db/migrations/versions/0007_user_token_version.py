@@ -0,0 +1,25 @@
+"""user token version for claims-only auth
+
+Revision ID: 0007_user_token_version
+Revises: 0006_payment_event_queue
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_user_token_version"
+down_revision = "0006_payment_event_queue"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("token_version", sa.Integer(), nullable=False, server_default="0"))
+    # token version refresh reads users changed since the last poll
+    op.create_index("ix_users_updated_at", "users", ["updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_updated_at", table_name="users")
+    op.drop_column("users", "token_version")
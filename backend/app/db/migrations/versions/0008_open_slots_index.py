@@ -0,0 +1,27 @@
+"""partial index for open slot listings
+
+Revision ID: 0008_open_slots_index
+Revises: 0007_user_token_version
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008_open_slots_index"
+down_revision = "0007_user_token_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_slots_open_starts_id",
+        "slots",
+        ["starts_at_utc", "id"],
+        postgresql_where=sa.text("status = 'open'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_slots_open_starts_id", table_name="slots")
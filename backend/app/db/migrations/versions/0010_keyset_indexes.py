@@ -0,0 +1,30 @@
+"""composite indexes for keyset pagination
+
+Revision ID: 0010_keyset_indexes
+Revises: 0009_catalog_version
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+revision = "0010_keyset_indexes"
+down_revision = "0009_catalog_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # (created_at, id) is the page key; the old indexes are prefixes of the new ones
+    op.create_index("ix_ai_messages_session_created_id", "ai_messages", ["session_id", "created_at", "id"])
+    op.drop_index("ix_ai_messages_session_created", table_name="ai_messages")
+    op.create_index("ix_bookings_user_created_id", "bookings", ["user_id", "created_at", "id"])
+    op.drop_index("ix_bookings_user_created", table_name="bookings")
+    op.create_index("ix_users_created_id", "users", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_created_id", table_name="users")
+    op.create_index("ix_bookings_user_created", "bookings", ["user_id", "created_at"])
+    op.drop_index("ix_bookings_user_created_id", table_name="bookings")
+    op.create_index("ix_ai_messages_session_created", "ai_messages", ["session_id", "created_at"])
+    op.drop_index("ix_ai_messages_session_created_id", table_name="ai_messages")
@@ -0,0 +1,28 @@
+"""rolling context summary on ai_sessions
+
+Revision ID: 0011_session_context_summary
+Revises: 0010_keyset_indexes
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0011_session_context_summary"
+down_revision = "0010_keyset_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # all nullable: existing sessions fold their history on their next turn
+    op.add_column("ai_sessions", sa.Column("context_summary", sa.Text(), nullable=True))
+    op.add_column("ai_sessions", sa.Column("summary_last_created_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("ai_sessions", sa.Column("summary_last_message_id", postgresql.UUID(as_uuid=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("ai_sessions", "summary_last_message_id")
+    op.drop_column("ai_sessions", "summary_last_created_at")
+    op.drop_column("ai_sessions", "context_summary")
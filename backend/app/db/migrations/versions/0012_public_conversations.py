@@ -0,0 +1,58 @@
+"""server-side state for public therapy conversations
+
+Revision ID: 0012_public_conversations
+Revises: 0011_session_context_summary
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0012_public_conversations"
+down_revision = "0011_session_context_summary"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "public_conversations",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "diagnostic_submission_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("diagnostic_submissions.id", ondelete="SET NULL"),
+            nullable=True,
+        ),
+        sa.Column("locale", sa.String(length=5), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_public_conversations_updated", "public_conversations", ["updated_at"])
+
+    op.create_table(
+        "public_conversation_turns",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "conversation_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("public_conversations.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("role", sa.String(length=16), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(
+        "ix_public_turns_conversation_created_id",
+        "public_conversation_turns",
+        ["conversation_id", "created_at", "id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_public_turns_conversation_created_id", table_name="public_conversation_turns")
+    op.drop_table("public_conversation_turns")
+    op.drop_index("ix_public_conversations_updated", table_name="public_conversations")
+    op.drop_table("public_conversations")
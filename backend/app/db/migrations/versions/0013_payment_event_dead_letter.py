@@ -0,0 +1,23 @@
+"""dead-lettered payment events
+
+Revision ID: 0013_payment_event_dead_letter
+Revises: 0012_public_conversations
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0013_payment_event_dead_letter"
+down_revision = "0012_public_conversations"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # set when the last allowed attempt fails; the worker stops claiming the event
+    op.add_column("payments_events", sa.Column("failed_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("payments_events", "failed_at")
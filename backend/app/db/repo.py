@@ -1,13 +1,17 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from uuid import UUID
 
-from sqlalchemy import or_, select
+from sqlalchemy import Row, delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.domain.models import (
+    ORDER_WITH_PRODUCT,
+    USER_IDENTITY,
     AIEvaluation,
     AIMessage,
     AISession,
@@ -17,15 +21,139 @@ from app.domain.models import (
     Order,
     PaymentEvent,
     Product,
+    PublicConversation,
+    PublicConversationTurn,
+    RefreshToken,
+    Role,
     Slot,
     User,
+    UserStatus,
 )
+from app.utils.pagination import DEFAULT_PAGE_SIZE, keyset
 
 
 def _now_utc() -> datetime:
     return datetime.now(timezone.utc)
 
 
+# Question plans are packed 16-byte UUIDs (see app.services.question_bank)
+_PLAN_ID_BYTES = 16
+
+
+def _enqueue_payment_event_stmt(provider: str, event_id: str, event_type: str, payload: dict):
+    # one round trip; RETURNING is empty when the event_id is already stored
+    return (
+        pg_insert(PaymentEvent)
+        .values(provider=provider, event_id=event_id, type=event_type, payload_json=payload)
+        .on_conflict_do_nothing(index_elements=[PaymentEvent.event_id])
+        .returning(PaymentEvent.id)
+    )
+
+
+def _advance_question_cursor_stmt(session_id: UUID):
+    # RETURNING sees the incremented cursor, so the consumed slot starts at (cursor - 1) * 16 + 1
+    return (
+        update(AISession)
+        .where(
+            AISession.id == session_id,
+            AISession.question_plan.is_not(None),
+            AISession.question_cursor * _PLAN_ID_BYTES < func.octet_length(AISession.question_plan),
+        )
+        .values(question_cursor=AISession.question_cursor + 1)
+        .returning(
+            func.substring(
+                AISession.question_plan,
+                AISession.question_cursor * _PLAN_ID_BYTES - (_PLAN_ID_BYTES - 1),
+                _PLAN_ID_BYTES,
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _store_question_plan_stmt(session_id: UUID, plan: bytes, cursor: int):
+    return (
+        update(AISession)
+        .where(AISession.id == session_id)
+        .values(question_plan=plan, question_cursor=cursor)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _context_summary_stmt(session_id: UUID):
+    return select(
+        AISession.context_summary, AISession.summary_last_created_at, AISession.summary_last_message_id
+    ).where(AISession.id == session_id)
+
+
+def _store_context_summary_stmt(session_id: UUID, summary: str, last_created_at: datetime, last_message_id: UUID):
+    return (
+        update(AISession)
+        .where(AISession.id == session_id)
+        .values(
+            context_summary=summary,
+            summary_last_created_at=last_created_at,
+            summary_last_message_id=last_message_id,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _usable_entitlements(user_id: UUID, now: datetime) -> tuple:
+    """Filter for entitlements of the user with units left that are valid right now."""
+    return (
+        Entitlement.user_id == user_id,
+        Entitlement.qty_used < Entitlement.qty_total,
+        Entitlement.valid_from <= now,
+        or_(Entitlement.valid_to.is_(None), Entitlement.valid_to >= now),
+    )
+
+
+def _take_entitlement_stmt(user_id: UUID, kind: str, now: datetime):
+    """
+    Takes 1 unit in one statement: UPDATE ... WHERE id = (earliest expiring usable row) RETURNING id.
+    Concurrent consumers only wait on the row lock for the duration of this statement's
+    transaction, and a lost race re-checks the row (qty_used < qty_total) instead of overdrawing.
+    """
+    pick = (
+        select(Entitlement.id)
+        .where(*_usable_entitlements(user_id, now), Entitlement.kind == kind)
+        # expiring first; unlimited last
+        .order_by(Entitlement.valid_to.is_(None), Entitlement.valid_to, Entitlement.created_at)
+        .limit(1)
+        .with_for_update()
+        .scalar_subquery()
+    )
+    return (
+        update(Entitlement)
+        .where(Entitlement.id == pick, Entitlement.qty_used < Entitlement.qty_total)
+        .values(qty_used=Entitlement.qty_used + 1)
+        .returning(Entitlement.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _refund_entitlement_stmt(entitlement_id: UUID):
+    return (
+        update(Entitlement)
+        .where(Entitlement.id == entitlement_id, Entitlement.qty_used > 0)
+        .values(qty_used=Entitlement.qty_used - 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _entitlement_balances_stmt(user_id: UUID, now: datetime):
+    return (
+        select(
+            Entitlement.kind,
+            func.sum(Entitlement.qty_total - Entitlement.qty_used),
+            func.min(Entitlement.valid_to),  # NULLs (unlimited) are ignored
+        )
+        .where(*_usable_entitlements(user_id, now))
+        .group_by(Entitlement.kind)
+    )
+
+
 class Repo:
     def __init__(self, db: Session):
         self.db = db
@@ -42,6 +170,50 @@ class Repo:
     def get_user_by_email(self, email: str) -> User | None:
         return self.db.scalar(select(User).where(User.email == email.lower()))
 
+    def get_user_identity(self, user_id: UUID) -> Row | None:
+        """(id, role, status, token_version) only; enough to authenticate a request."""
+        return self.db.execute(select(*USER_IDENTITY).where(User.id == user_id)).first()
+
+    def list_users(self, *, after: tuple[datetime, UUID] | None = None, limit: int = DEFAULT_PAGE_SIZE) -> list[Row]:
+        """Oldest first by (created_at, id) from ix_users_created_id; up to limit + 1 rows."""
+        stmt = select(User.id, User.email, User.role, User.status, User.created_at)
+        return list(self.db.execute(keyset(stmt, (User.created_at, User.id), after, limit)).all())
+
+    def update_user_access(self, user: User, *, role: str | None = None, status: str | None = None) -> User:
+        """
+        Changes role and/or status and bumps token_version, which revokes every access
+        token issued before; refresh tokens are revoked too. Callers should pass the new
+        version to token_versions.note() after commit.
+        """
+        if role is not None:
+            user.role = Role(role)
+        if status is not None:
+            user.status = UserStatus(status)
+        user.token_version = (user.token_version or 0) + 1
+        self.revoke_user_refresh_tokens(user.id)
+        self.db.flush()
+        return user
+
+    # -----------------------------
+    # Refresh tokens
+    # -----------------------------
+    def create_refresh_token(self, user_id: UUID, token_hash: str, expires_at: datetime) -> RefreshToken:
+        row = RefreshToken(user_id=user_id, token_hash=token_hash, expires_at=expires_at)
+        self.db.add(row)
+        self.db.flush()
+        return row
+
+    def get_refresh_token_for_update(self, token_hash: str) -> RefreshToken | None:
+        # locked so that two concurrent refreshes cannot both rotate the same token
+        return self.db.scalar(select(RefreshToken).where(RefreshToken.token_hash == token_hash).with_for_update())
+
+    def revoke_user_refresh_tokens(self, user_id: UUID) -> None:
+        self.db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=_now_utc())
+        )
+
     # -----------------------------
     # AI Sessions / Messages / Eval
     # -----------------------------
@@ -60,12 +232,35 @@ class Repo:
         self.db.flush()
         return message
 
-    def list_messages(self, session_id: UUID) -> list[AIMessage]:
-        return list(
-            self.db.scalars(
-                select(AIMessage).where(AIMessage.session_id == session_id).order_by(AIMessage.created_at)
-            ).all()
-        )
+    def advance_question_cursor(self, session_id: UUID) -> bytes | None:
+        """
+        Atomically takes the next packed question id from the session plan.
+        Returns None if there is no plan or it is exhausted.
+        """
+        return self.db.execute(_advance_question_cursor_stmt(session_id)).scalar()
+
+    def store_question_plan(self, session_id: UUID, plan: bytes, cursor: int = 0) -> None:
+        self.db.execute(_store_question_plan_stmt(session_id, plan, cursor))
+
+    def list_messages(
+        self,
+        session_id: UUID,
+        *,
+        after: tuple[datetime, UUID] | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> list[AIMessage]:
+        """Oldest first by (created_at, id) from ix_ai_messages_session_created_id; up to limit + 1 rows."""
+        stmt = select(AIMessage).where(AIMessage.session_id == session_id)
+        return list(self.db.scalars(keyset(stmt, (AIMessage.created_at, AIMessage.id), after, limit)).all())
+
+    def get_context_summary(self, session_id: UUID) -> Row | None:
+        """(context_summary, summary_last_created_at, summary_last_message_id)"""
+        return self.db.execute(_context_summary_stmt(session_id)).first()
+
+    def store_context_summary(
+        self, session_id: UUID, summary: str, last_created_at: datetime, last_message_id: UUID
+    ) -> None:
+        self.db.execute(_store_context_summary_stmt(session_id, summary, last_created_at, last_message_id))
 
     def add_evaluation(
         self,
@@ -74,6 +269,7 @@ class Repo:
         rubric_scores: dict,
         summary_feedback: str,
         detected_issues: dict,
+        scoring_version: str | None = None,
     ) -> AIEvaluation:
         row = AIEvaluation(
             session_id=session_id,
@@ -81,6 +277,7 @@ class Repo:
             rubric_scores=rubric_scores,
             summary_feedback=summary_feedback,
             detected_issues=detected_issues,
+            scoring_version=scoring_version,
         )
         self.db.add(row)
         return row
@@ -88,31 +285,27 @@ class Repo:
     # -----------------------------
     # Entitlements
     # -----------------------------
-    def consume_entitlement(self, user_id: UUID, kind: str) -> bool:
+    def take_entitlement(self, user_id: UUID, kind: str) -> UUID | None:
         """
-        Atomically consumes 1 unit from the earliest expiring entitlement of this kind.
-        Filters expired and not-yet-valid entitlements.
+        Consumes 1 unit from the earliest expiring usable entitlement of this kind
+        and returns its id (None if the user has no units left).
+        Prefer app.services.entitlements.take(), which also skips users known to be out of units.
         """
-        now = _now_utc()
+        return self.db.scalar(_take_entitlement_stmt(user_id, kind, _now_utc()))
 
-        ent = self.db.scalar(
-            select(Entitlement)
-            .where(
-                Entitlement.user_id == user_id,
-                Entitlement.kind == kind,
-                Entitlement.qty_used < Entitlement.qty_total,
-                Entitlement.valid_from <= now,
-                or_(Entitlement.valid_to.is_(None), Entitlement.valid_to >= now),
-            )
-            # expiring first; unlimited last
-            .order_by(Entitlement.valid_to.is_(None), Entitlement.valid_to, Entitlement.created_at)
-            .with_for_update()
-        )
-        if not ent:
-            return False
+    def consume_entitlement(self, user_id: UUID, kind: str) -> bool:
+        return self.take_entitlement(user_id, kind) is not None
 
-        ent.qty_used += 1
-        return True
+    def has_entitlement(self, user_id: UUID, kind: str) -> bool:
+        stmt = select(Entitlement.id).where(*_usable_entitlements(user_id, _now_utc()), Entitlement.kind == kind)
+        return self.db.scalar(stmt.limit(1)) is not None
+
+    def refund_entitlement(self, entitlement_id: UUID) -> None:
+        self.db.execute(_refund_entitlement_stmt(entitlement_id))
+
+    def entitlement_balances(self, user_id: UUID) -> list[Row]:
+        """(kind, remaining, next_expiry) per kind over the currently usable entitlements."""
+        return list(self.db.execute(_entitlement_balances_stmt(user_id, _now_utc())).all())
 
     def consume_credit(self, user_id: UUID) -> bool:
         return self.consume_entitlement(user_id, "ai_credits")
@@ -143,8 +336,36 @@ class Repo:
     # -----------------------------
     # Slots / Bookings
     # -----------------------------
-    def list_open_slots(self) -> list[Slot]:
-        return list(self.db.scalars(select(Slot).where(Slot.status == "open").order_by(Slot.starts_at_utc)).all())
+    def list_open_slots(
+        self,
+        starts_from: datetime,
+        until: datetime,
+        *,
+        after: tuple[datetime, UUID] | None = None,
+        limit: int = 100,
+    ) -> list[Row]:
+        """
+        Open slots starting in [starts_from, until), ordered by (starts_at_utc, id) and
+        continued after the `after` key; served from ix_slots_open_starts_id. Up to limit + 1 rows.
+        """
+        stmt = select(Slot.id, Slot.starts_at_utc, Slot.duration_min, Slot.title).where(
+            Slot.status == "open",
+            Slot.starts_at_utc >= starts_from,
+            Slot.starts_at_utc < until,
+        )
+        return list(self.db.execute(keyset(stmt, (Slot.starts_at_utc, Slot.id), after, limit)).all())
+
+    def list_user_bookings(
+        self,
+        user_id: UUID,
+        *,
+        after: tuple[datetime, UUID] | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> list[Row]:
+        """(Booking, Slot) rows, newest first by (created_at, id) from ix_bookings_user_created_id; up to limit + 1."""
+        stmt = select(Booking, Slot).join(Slot, Slot.id == Booking.slot_id).where(Booking.user_id == user_id)
+        stmt = keyset(stmt, (Booking.created_at, Booking.id), after, limit, descending=True)
+        return list(self.db.execute(stmt).all())
 
     def book_slot(self, user_id: UUID, slot_id: UUID) -> Booking:
         slot = self.db.get(Slot, slot_id, with_for_update=True)
@@ -210,8 +431,57 @@ class Repo:
     def get_diagnostic_submission(self, submission_id: UUID) -> DiagnosticSubmission | None:
         return self.db.get(DiagnosticSubmission, submission_id)
 
+    # -----------------------------
+    # Public therapy conversations
+    # -----------------------------
+    def create_public_conversation(self, locale: str, diagnostic_submission_id: UUID | None) -> PublicConversation:
+        row = PublicConversation(locale=locale, diagnostic_submission_id=diagnostic_submission_id)
+        self.db.add(row)
+        self.db.flush()
+        return row
+
+    def get_public_conversation(self, conversation_id: UUID) -> PublicConversation | None:
+        return self.db.get(PublicConversation, conversation_id)
+
+    def recent_public_turns(self, conversation_id: UUID, limit: int) -> list[PublicConversationTurn]:
+        """The last `limit` turns, oldest first (ix_public_turns_conversation_created_id, read backwards)."""
+        rows = self.db.scalars(
+            select(PublicConversationTurn)
+            .where(PublicConversationTurn.conversation_id == conversation_id)
+            .order_by(PublicConversationTurn.created_at.desc(), PublicConversationTurn.id.desc())
+            .limit(limit)
+        ).all()
+        return list(reversed(rows))
+
+    def add_public_turns(self, conversation: PublicConversation, turns: list[tuple[str, str]]) -> None:
+        """Appends (role, content) turns in order; timestamps are spaced so the order survives ties."""
+        now = _now_utc()
+        for i, (role, content) in enumerate(turns):
+            self.db.add(
+                PublicConversationTurn(
+                    conversation_id=conversation.id,
+                    role=role,
+                    content=content,
+                    created_at=now + timedelta(microseconds=i),
+                )
+            )
+        conversation.updated_at = now
+
+    def purge_public_conversations(self, before: datetime, limit: int) -> int:
+        """Deletes up to `limit` conversations untouched since `before`, with their turns (ix_public_conversations_updated)."""
+        ids = list(
+            self.db.scalars(
+                select(PublicConversation.id).where(PublicConversation.updated_at < before).limit(limit)
+            )
+        )
+        if ids:
+            self.db.execute(delete(PublicConversationTurn).where(PublicConversationTurn.conversation_id.in_(ids)))
+            self.db.execute(delete(PublicConversation).where(PublicConversation.id.in_(ids)))
+        return len(ids)
+
     def find_order_by_provider_ref(self, provider_ref: str) -> Order | None:
-        return self.db.scalar(select(Order).where(Order.provider_ref == provider_ref))
+        # the only caller (apply_paid_event) reads order.product right away
+        return self.db.scalar(select(Order).where(Order.provider_ref == provider_ref).options(*ORDER_WITH_PRODUCT))
 
     # -----------------------------
     # Payment Events (webhook idempotency)
@@ -248,3 +518,124 @@ class Repo:
 
     def mark_payment_event_processed(self, evt: PaymentEvent) -> None:
         evt.processed_at = _now_utc()
+
+    def enqueue_payment_event(self, provider: str, event_id: str, event_type: str, payload: dict) -> bool:
+        """Stores the event for the payments worker. False if it was already stored (replay)."""
+        return self.db.execute(_enqueue_payment_event_stmt(provider, event_id, event_type, payload)).first() is not None
+
+    def claim_payment_event(self, max_attempts: int) -> PaymentEvent | None:
+        """
+        Locks the oldest due unprocessed event for this transaction. SKIP LOCKED lets
+        concurrent workers claim different events without waiting on each other.
+        """
+        now = _now_utc()
+        return self.db.scalar(
+            select(PaymentEvent)
+            .where(
+                PaymentEvent.processed_at.is_(None),
+                PaymentEvent.failed_at.is_(None),
+                PaymentEvent.attempts < max_attempts,
+                or_(PaymentEvent.available_at.is_(None), PaymentEvent.available_at <= now),
+            )
+            .order_by(PaymentEvent.received_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+
+    def record_payment_event_failure(self, event_pk: UUID, error: str, retry_at: datetime | None) -> None:
+        """retry_at=None: no attempts left, the event is dead-lettered (failed_at set)."""
+        values = {"attempts": PaymentEvent.attempts + 1, "last_error": error[:2000], "available_at": retry_at}
+        if retry_at is None:
+            values["failed_at"] = _now_utc()
+        self.db.execute(update(PaymentEvent).where(PaymentEvent.id == event_pk).values(**values))
+
+
+class AsyncRepo:
+    """
+    Async counterpart of Repo for the non-blocking AI message path.
+    Only covers what that path needs; extend on demand.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_user(self, user_id: UUID) -> User | None:
+        return await self.db.get(User, user_id)
+
+    async def get_user_identity(self, user_id: UUID) -> Row | None:
+        return (await self.db.execute(select(*USER_IDENTITY).where(User.id == user_id))).first()
+
+    async def get_ai_session(self, session_id: UUID) -> AISession | None:
+        return await self.db.get(AISession, session_id)
+
+    async def add_message(self, session_id: UUID, role: str, content: str) -> AIMessage:
+        message = AIMessage(session_id=session_id, role=role, content=content)
+        self.db.add(message)
+        await self.db.flush()
+        return message
+
+    async def advance_question_cursor(self, session_id: UUID) -> bytes | None:
+        return (await self.db.execute(_advance_question_cursor_stmt(session_id))).scalar()
+
+    async def store_question_plan(self, session_id: UUID, plan: bytes, cursor: int = 0) -> None:
+        await self.db.execute(_store_question_plan_stmt(session_id, plan, cursor))
+
+    async def list_messages(
+        self,
+        session_id: UUID,
+        *,
+        after: tuple[datetime, UUID] | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> list[AIMessage]:
+        stmt = select(AIMessage).where(AIMessage.session_id == session_id)
+        rows = await self.db.scalars(keyset(stmt, (AIMessage.created_at, AIMessage.id), after, limit))
+        return list(rows.all())
+
+    async def get_context_summary(self, session_id: UUID) -> Row | None:
+        return (await self.db.execute(_context_summary_stmt(session_id))).first()
+
+    async def store_context_summary(
+        self, session_id: UUID, summary: str, last_created_at: datetime, last_message_id: UUID
+    ) -> None:
+        await self.db.execute(_store_context_summary_stmt(session_id, summary, last_created_at, last_message_id))
+
+    async def add_evaluation(
+        self,
+        session_id: UUID,
+        message_id: UUID,
+        rubric_scores: dict,
+        summary_feedback: str,
+        detected_issues: dict,
+        scoring_version: str | None = None,
+    ) -> AIEvaluation:
+        row = AIEvaluation(
+            session_id=session_id,
+            message_id=message_id,
+            rubric_scores=rubric_scores,
+            summary_feedback=summary_feedback,
+            detected_issues=detected_issues,
+            scoring_version=scoring_version,
+        )
+        self.db.add(row)
+        return row
+
+    async def take_entitlement(self, user_id: UUID, kind: str) -> UUID | None:
+        """Consumes 1 unit like Repo.take_entitlement() and returns the id of the row it was taken from."""
+        return await self.db.scalar(_take_entitlement_stmt(user_id, kind, _now_utc()))
+
+    async def consume_entitlement(self, user_id: UUID, kind: str) -> bool:
+        return await self.take_entitlement(user_id, kind) is not None
+
+    async def refund_entitlement(self, entitlement_id: UUID) -> None:
+        """Gives back 1 unit taken by take_entitlement() (e.g. the reply was never delivered)."""
+        await self.db.execute(_refund_entitlement_stmt(entitlement_id))
+
+    async def delete_message(self, message_id: UUID) -> None:
+        await self.db.execute(delete(AIMessage).where(AIMessage.id == message_id))
+
+    async def consume_credit(self, user_id: UUID) -> bool:
+        return await self.consume_entitlement(user_id, "ai_credits")
+
+    async def enqueue_payment_event(self, provider: str, event_id: str, event_type: str, payload: dict) -> bool:
+        result = await self.db.execute(_enqueue_payment_event_stmt(provider, event_id, event_type, payload))
+        return result.first() is not None
@@ -1,17 +1,21 @@
 from __future__ import annotations
 
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 
+from app.db.instrumentation import TimedAsyncAdaptedQueuePool, TimedQueuePool, instrument_engine
 from app.settings import settings
 
 engine = create_engine(
     settings.database_url,
     future=True,
     pool_pre_ping=True,
+    poolclass=TimedQueuePool,
 )
+instrument_engine(engine, "sync")
 
 SessionLocal = sessionmaker(
     bind=engine,
@@ -21,6 +25,22 @@ SessionLocal = sessionmaker(
     class_=Session,
 )
 
+# Async engine for request paths that wait on network I/O (LLM calls).
+# psycopg3 speaks asyncio natively, so the same DATABASE_URL works for both engines.
+async_engine = create_async_engine(
+    settings.database_url,
+    pool_pre_ping=True,
+    poolclass=TimedAsyncAdaptedQueuePool,
+)
+instrument_engine(async_engine.sync_engine, "async")
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+    class_=AsyncSession,
+)
+
 
 def get_db() -> Generator[Session, None, None]:
     db: Session = SessionLocal()
@@ -32,3 +52,14 @@ def get_db() -> Generator[Session, None, None]:
         raise
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    db: AsyncSession = AsyncSessionLocal()
+    try:
+        yield db
+    except Exception:
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
@@ -1,13 +1,24 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
+from typing import TypeVar
 from uuid import UUID
 
 from fastapi import Depends, Header
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.db.repo import AsyncRepo, Repo
+from app.db.session import get_async_db, get_db
 from app.domain.models import APIError, User
 from app.security.auth import decode_access_token
+from app.security.token_versions import token_versions
+from app.settings import settings
+
+
+# full User rows or USER_IDENTITY projections
+_UserLike = TypeVar("_UserLike", User, Row)
 
 
 def _role_value(user: User) -> str:
@@ -20,10 +31,17 @@ def _status_value(user: User) -> str:
     return (getattr(s, "value", s) or "active").strip()
 
 
-def get_current_user(
-    authorization: str | None = Header(default=None),
-    db: Session = Depends(get_db),
-) -> User:
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """Authenticated caller as described by the access token claims."""
+
+    id: UUID
+    role: str
+    status: str
+    token_version: int
+
+
+def _token_payload(authorization: str | None) -> dict:
     if not authorization or not authorization.lower().startswith("bearer "):
         raise APIError("UNAUTHORIZED", "Missing bearer token", status_code=401)
 
@@ -32,20 +50,62 @@ def get_current_user(
         raise APIError("UNAUTHORIZED", "Missing bearer token", status_code=401)
 
     try:
-        payload = decode_access_token(token)
+        return decode_access_token(token)
     except Exception as exc:  # noqa: BLE001
         raise APIError("UNAUTHORIZED", "Invalid token", status_code=401) from exc
 
+
+def _subject(payload: dict) -> UUID:
     sub = payload.get("sub")
     if not sub:
         raise APIError("UNAUTHORIZED", "Invalid token payload", status_code=401)
 
     try:
-        user_id = sub if isinstance(sub, UUID) else UUID(str(sub))
+        return sub if isinstance(sub, UUID) else UUID(str(sub))
     except Exception as exc:  # noqa: BLE001
         raise APIError("UNAUTHORIZED", "Invalid token subject", status_code=401) from exc
 
-    user = db.get(User, user_id)
+
+def _claimed_version(payload: dict) -> int | None:
+    """The "tv" claim; None for tokens issued before claims-only auth (those take the DB path)."""
+    if "tv" not in payload:
+        return None
+    try:
+        return int(payload["tv"])
+    except (TypeError, ValueError) as exc:
+        raise APIError("UNAUTHORIZED", "Invalid token payload", status_code=401) from exc
+
+
+def _principal_from_claims(payload: dict) -> Principal | None:
+    version = _claimed_version(payload)
+    if version is None:
+        return None
+    user_id = _subject(payload)
+    return _checked_principal(payload, user_id, version, token_versions.current(user_id))
+
+
+async def _principal_from_claims_async(payload: dict) -> Principal | None:
+    """Same check; a due version refresh runs in a worker thread, not on the event loop."""
+    version = _claimed_version(payload)
+    if version is None:
+        return None
+    user_id = _subject(payload)
+    return _checked_principal(payload, user_id, version, await token_versions.current_async(user_id))
+
+
+def _checked_principal(payload: dict, user_id: UUID, version: int, accepted_version: int) -> Principal:
+    # a newer token than the cached version means the cache lags behind, not a revocation
+    if version < accepted_version:
+        raise APIError("TOKEN_REVOKED", "Token has been revoked", status_code=401)
+
+    status = str(payload.get("st") or "active")
+    if status != "active":
+        raise APIError("USER_BLOCKED", "User is not active", {"status": status}, status_code=403)
+
+    return Principal(id=user_id, role=str(payload.get("role") or "user"), status=status, token_version=version)
+
+
+def _ensure_active(user: _UserLike | None) -> _UserLike:
     if not user:
         raise APIError("UNAUTHORIZED", "User not found", status_code=401)
 
@@ -60,10 +120,69 @@ def get_current_user(
     return user
 
 
+def _principal_of(user: User | Row) -> Principal:
+    return Principal(
+        id=user.id,
+        role=_role_value(user),
+        status=_status_value(user),
+        token_version=getattr(user, "token_version", 0) or 0,
+    )
+
+
+def get_principal(
+    authorization: str | None = Header(default=None),
+    db: Session = Depends(get_db),
+) -> Principal:
+    """
+    Caller identity for routes that only need id/role. With AUTH_CLAIMS_ONLY the
+    token claims are trusted after the token version check, so no query runs
+    (the session dependency never opens a connection unless it is used).
+    """
+    payload = _token_payload(authorization)
+    if settings.auth_claims_only:
+        principal = _principal_from_claims(payload)
+        if principal is not None:
+            return principal
+    return _principal_of(_ensure_active(Repo(db).get_user_identity(_subject(payload))))
+
+
+async def get_principal_async(
+    authorization: str | None = Header(default=None),
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
+    payload = _token_payload(authorization)
+    if settings.auth_claims_only:
+        principal = await _principal_from_claims_async(payload)
+        if principal is not None:
+            return principal
+    return _principal_of(_ensure_active(await AsyncRepo(db).get_user_identity(_subject(payload))))
+
+
+def get_current_user(
+    authorization: str | None = Header(default=None),
+    db: Session = Depends(get_db),
+) -> User:
+    """Full user row, for routes that need profile fields (email, name, locale)."""
+    payload = _token_payload(authorization)
+    if settings.auth_claims_only:
+        _principal_from_claims(payload)
+    return _ensure_active(db.get(User, _subject(payload)))
+
+
+async def get_current_user_async(
+    authorization: str | None = Header(default=None),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    payload = _token_payload(authorization)
+    if settings.auth_claims_only:
+        await _principal_from_claims_async(payload)
+    return _ensure_active(await db.get(User, _subject(payload)))
+
+
 def require_roles(*roles: str):
-    def checker(user: User = Depends(get_current_user)) -> User:
-        if user.role not in roles:
+    def checker(principal: Principal = Depends(get_principal)) -> Principal:
+        if principal.role not in roles:
             raise APIError("FORBIDDEN", "Insufficient role", status_code=403)
-        return user
+        return principal
 
-    return checker
\ No newline at end of file
+    return checker
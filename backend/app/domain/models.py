@@ -8,17 +8,20 @@ from uuid import UUID, uuid4
 from pydantic import BaseModel, EmailStr, Field
 from sqlalchemy import (
     JSON,
+    BigInteger,
     DateTime,
     Enum as SAEnum,
     ForeignKey,
     Index,
     Integer,
+    LargeBinary,
     String,
     Text,
     UniqueConstraint,
+    text,
 )
 from sqlalchemy.dialects.postgresql import ARRAY, UUID as PGUUID
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from sqlalchemy.orm import DeclarativeBase, Mapped, joinedload, mapped_column, relationship
 
 
 def utcnow() -> datetime:
@@ -43,6 +46,8 @@ class UserStatus(str, Enum):
 
 class User(Base):
     __tablename__ = "users"
+    # keyset order for the admin user list
+    __table_args__ = (Index("ix_users_created_id", "created_at", "id"),)
 
     id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), primary_key=True, default=uuid4)
 
@@ -60,11 +65,18 @@ class User(Base):
         default=UserStatus.active,
     )
 
+    # Bumped on block/role change/sign-out everywhere; access tokens carry it as "tv"
+    # and are rejected once it moves on (see app.security.token_versions).
+    token_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow)
-    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow, onupdate=utcnow)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=utcnow, onupdate=utcnow, index=True
+    )
 
-    orders: Mapped[list["Order"]] = relationship(back_populates="user", lazy="selectin")
-    entitlements: Mapped[list["Entitlement"]] = relationship(back_populates="user", lazy="selectin")
+    # Lazy: a plain user fetch is one query. Opt in per query, see loading profiles below.
+    orders: Mapped[list["Order"]] = relationship(back_populates="user", lazy="select")
+    entitlements: Mapped[list["Entitlement"]] = relationship(back_populates="user", lazy="select")
 
 
 class RefreshToken(Base):
@@ -151,10 +163,25 @@ class AISession(Base):
     started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow)
     closed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
+    # Question plan: packed 16-byte question ids, consumed via question_cursor (see question_bank).
+    # Deferred: only read/written through Repo.advance_question_cursor()/store_question_plan().
+    question_plan: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True, deferred=True)
+    question_cursor: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+    # Rolling digest of earlier answers for prompt context, folded up to (created_at, id)
+    # of the last message it covers (see app.services.context_builder).
+    context_summary: Mapped[str | None] = mapped_column(Text, nullable=True, deferred=True)
+    summary_last_created_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    summary_last_message_id: Mapped[UUID | None] = mapped_column(PGUUID(as_uuid=True), nullable=True)
+
 
 class AIMessage(Base):
     __tablename__ = "ai_messages"
-    __table_args__ = (Index("ix_ai_messages_session_created", "session_id", "created_at"),)
+    __table_args__ = (
+        Index("ix_ai_messages_session_created_id", "session_id", "created_at", "id"),
+        # keyset order for batch re-scoring of user answers
+        Index("ix_ai_messages_user_created_id", "created_at", "id", postgresql_where=text("role = 'user'")),
+    )
 
     id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), primary_key=True, default=uuid4)
     session_id: Mapped[UUID] = mapped_column(ForeignKey("ai_sessions.id"), nullable=False)
@@ -165,7 +192,10 @@ class AIMessage(Base):
 
 class AIEvaluation(Base):
     __tablename__ = "ai_evaluations"
-    __table_args__ = (Index("ix_ai_evals_session_created", "session_id", "created_at"),)
+    __table_args__ = (
+        Index("ix_ai_evals_session_created", "session_id", "created_at"),
+        UniqueConstraint("message_id", "scoring_version", name="uq_ai_evals_message_version"),
+    )
 
     id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), primary_key=True, default=uuid4)
     session_id: Mapped[UUID] = mapped_column(ForeignKey("ai_sessions.id"), nullable=False)
@@ -173,12 +203,30 @@ class AIEvaluation(Base):
     rubric_scores: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
     summary_feedback: Mapped[str] = mapped_column(Text, nullable=False)
     detected_issues: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
+    # rubric version that produced the row (scoring.RUBRIC_VERSION); NULL for rows written before versioning
+    scoring_version: Mapped[str | None] = mapped_column(String(32), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow)
 
 
+class ScoringCheckpoint(Base):
+    """Resume point of a batch re-scoring run (see services.rescoring), one row per version."""
+
+    __tablename__ = "scoring_checkpoints"
+
+    scoring_version: Mapped[str] = mapped_column(String(32), primary_key=True)
+    last_created_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_message_id: Mapped[UUID | None] = mapped_column(PGUUID(as_uuid=True), nullable=True)
+    processed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow)
+
+
 class Slot(Base):
     __tablename__ = "slots"
-    __table_args__ = (Index("ix_slots_consultant_starts", "consultant_id", "starts_at_utc"),)
+    __table_args__ = (
+        Index("ix_slots_consultant_starts", "consultant_id", "starts_at_utc"),
+        # calendar listings: open slots in a time window, keyset-paged by (starts_at_utc, id)
+        Index("ix_slots_open_starts_id", "starts_at_utc", "id", postgresql_where=text("status = 'open'")),
+    )
 
     id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), primary_key=True, default=uuid4)
     consultant_id: Mapped[UUID] = mapped_column(ForeignKey("users.id"), nullable=False)
@@ -195,7 +243,7 @@ class Booking(Base):
     __tablename__ = "bookings"
     __table_args__ = (
         UniqueConstraint("slot_id", name="uq_booking_slot_id"),
-        Index("ix_bookings_user_created", "user_id", "created_at"),
+        Index("ix_bookings_user_created_id", "user_id", "created_at", "id"),
     )
 
     id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), primary_key=True, default=uuid4)
@@ -224,6 +272,35 @@ class DiagnosticSubmission(Base):
     meta_json: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow)
 
+
+class PublicConversation(Base):
+    """Anonymous /api/public/therapy/reply conversation; its id is the client's handle."""
+
+    __tablename__ = "public_conversations"
+    __table_args__ = (Index("ix_public_conversations_updated", "updated_at"),)
+
+    id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), primary_key=True, default=uuid4)
+    diagnostic_submission_id: Mapped[UUID | None] = mapped_column(
+        ForeignKey("diagnostic_submissions.id", ondelete="SET NULL"), nullable=True
+    )
+    locale: Mapped[str] = mapped_column(String(5), nullable=False, default="ru")
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow)
+
+
+class PublicConversationTurn(Base):
+    __tablename__ = "public_conversation_turns"
+    __table_args__ = (Index("ix_public_turns_conversation_created_id", "conversation_id", "created_at", "id"),)
+
+    id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), primary_key=True, default=uuid4)
+    conversation_id: Mapped[UUID] = mapped_column(
+        ForeignKey("public_conversations.id", ondelete="CASCADE"), nullable=False
+    )
+    role: Mapped[str] = mapped_column(String(16), nullable=False)  # user | assistant
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow)
+
+
 class Product(Base):
     __tablename__ = "products"
 
@@ -238,7 +315,19 @@ class Product(Base):
     metadata_json: Mapped[dict[str, Any]] = mapped_column("metadata", JSON, nullable=False, default=dict)
     active: Mapped[bool] = mapped_column(nullable=False, default=True)
 
-    orders: Mapped[list["Order"]] = relationship(back_populates="product", lazy="selectin")
+    orders: Mapped[list["Order"]] = relationship(back_populates="product", lazy="select")
+
+
+class CatalogState(Base):
+    """
+    Single row (id=1) whose version is bumped by a statement trigger on products
+    (migration 0009), whatever writes them: admin API, app.seed, SQL migrations.
+    """
+
+    __tablename__ = "catalog_state"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=1)
 
 
 class Order(Base):
@@ -256,8 +345,8 @@ class Order(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow, onupdate=utcnow)
 
-    user: Mapped["User"] = relationship(back_populates="orders", lazy="joined")
-    product: Mapped["Product"] = relationship(back_populates="orders", lazy="joined")
+    user: Mapped["User"] = relationship(back_populates="orders", lazy="select")
+    product: Mapped["Product"] = relationship(back_populates="orders", lazy="select")
 
 
 class PaymentEvent(Base):
@@ -272,6 +361,13 @@ class PaymentEvent(Base):
     received_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow)
     processed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
+    # Queue bookkeeping for the payments worker (services.payment_events)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    available_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # set when the last allowed attempt failed; the worker no longer claims the event
+    failed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
 
 class Entitlement(Base):
     __tablename__ = "entitlements"
@@ -287,19 +383,39 @@ class Entitlement(Base):
     source_order_id: Mapped[UUID] = mapped_column(ForeignKey("orders.id"), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow)
 
-    user: Mapped["User"] = relationship(back_populates="entitlements", lazy="joined")
-    order: Mapped["Order"] = relationship(lazy="joined")
+    user: Mapped["User"] = relationship(back_populates="entitlements", lazy="select")
+    order: Mapped["Order"] = relationship(lazy="select")
+
+
+# -----------------------------
+# Loading profiles
+# -----------------------------
+# Relationships above load lazily. Queries that need related rows opt in with these
+# options, e.g. select(Order).options(*ORDER_WITH_PRODUCT).
+
+# Auth only needs these columns; select(*USER_IDENTITY) skips the ORM entity altogether.
+USER_IDENTITY = (User.id, User.role, User.status, User.token_version)
+
+ORDER_WITH_PRODUCT = (joinedload(Order.product),)
 
 
 # -----------------------------
 # API error + DTO (Pydantic)
 # -----------------------------
 class APIError(Exception):
-    def __init__(self, code: str, message: str, details: dict[str, Any] | None = None, status_code: int = 400):
+    def __init__(
+        self,
+        code: str,
+        message: str,
+        details: dict[str, Any] | None = None,
+        status_code: int = 400,
+        headers: dict[str, str] | None = None,
+    ):
         self.code = code
         self.message = message
         self.details = details or {}
         self.status_code = status_code
+        self.headers = headers
         super().__init__(message)
 
 
@@ -320,6 +436,19 @@ class TokenOut(BaseModel):
     token_type: str = "bearer"
 
 
+class RefreshIn(BaseModel):
+    refresh_token: str = Field(min_length=1, max_length=512)
+
+
+class LogoutIn(BaseModel):
+    refresh_token: str | None = Field(default=None, max_length=512)
+
+
+class UserAccessIn(BaseModel):
+    role: Role | None = None
+    status: UserStatus | None = None
+
+
 class SessionCreateIn(BaseModel):
     mode: str
     locale: str = "de"
@@ -0,0 +1,220 @@
+"""
+Admission control for the public API (/api/public/*).
+
+Under overload, public requests used to queue in the threadpool until the
+client gave up, still holding DB connections and LLM calls. This ASGI
+middleware answers them 503 OVERLOADED with a Retry-After before any of that
+starts. It sheds in two cases:
+
+- inflight: ADMISSION_MAX_PUBLIC_INFLIGHT public requests are already running
+- delay: queueing delay stayed above ADMISSION_TARGET_DELAY_MS for a whole
+  interval (ADMISSION_INTERVAL_MS)
+
+Queueing delay is measured by a probe: it hands a no-op to the threadpool every
+few milliseconds and records how long the no-op waited, including event loop
+lag. While the smallest delay of an interval stays above the target, the share
+of shed public requests grows by a step. Once delay is back under the target,
+the share halves each interval.
+
+Requests with a valid bearer token and the public paths listed in
+ADMISSION_EXEMPT_PATHS (none by default) are always admitted. The same goes
+for every path outside /api/public/, the Stripe webhook included.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import random
+import time
+from typing import Callable
+
+import anyio
+
+from app.security.auth import decode_access_token
+from app.settings import settings
+from app.utils.metrics import counter, gauge, histogram
+
+PUBLIC_PREFIX = "/api/public/"
+
+_PROBE_EVERY_S = 0.05
+_SHED_STEP = 0.1
+_MAX_SHED = 0.95
+_MAX_RETRY_AFTER_S = 30
+
+ADMISSION_DECISIONS = counter(
+    "http_admission_decisions_total",
+    "Public API admission decisions (admitted: ok|authenticated, shed: inflight|delay)",
+    ("decision", "reason"),
+)
+ADMISSION_INFLIGHT = gauge("http_admission_public_inflight", "Public API requests in flight")
+ADMISSION_SHED_SHARE = gauge("http_admission_shed_share", "Share of public requests currently shed for delay")
+QUEUE_DELAY = histogram(
+    "http_queue_delay_seconds",
+    "Threadpool + event loop queueing delay seen by the admission probe",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+
+def _noop() -> None:
+    return None
+
+
+class AdmissionController:
+    """Shedding state: public requests in flight and the delay-driven shed share."""
+
+    def __init__(
+        self,
+        max_inflight: int | None = None,
+        target_delay_s: float | None = None,
+        interval_s: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        rand: Callable[[], float] = random.random,
+    ):
+        self._max_inflight = max_inflight
+        self._target_delay_s = target_delay_s
+        self._interval_s = interval_s
+        self._clock = clock
+        self._rand = rand
+        self.inflight = 0
+        self.shed_share = 0.0
+        self.delay_s = 0.0  # smallest delay of the last finished interval
+        self._window_min: float | None = None
+        self._window_end = clock() + self._interval()
+        self._probe: asyncio.Task | None = None
+
+    def _limit(self) -> int:
+        return settings.admission_max_public_inflight if self._max_inflight is None else self._max_inflight
+
+    def _target(self) -> float:
+        if self._target_delay_s is None:
+            return settings.admission_target_delay_ms / 1000.0
+        return self._target_delay_s
+
+    def _interval(self) -> float:
+        return settings.admission_interval_ms / 1000.0 if self._interval_s is None else self._interval_s
+
+    def observe_delay(self, delay_s: float) -> None:
+        """One probe sample; closes the interval and adjusts the shed share when it is over."""
+        QUEUE_DELAY.observe(delay_s)
+        self._window_min = delay_s if self._window_min is None else min(self._window_min, delay_s)
+        now = self._clock()
+        if now < self._window_end:
+            return
+        self.delay_s = self._window_min
+        if self.delay_s > self._target():
+            self.shed_share = min(_MAX_SHED, self.shed_share + _SHED_STEP)
+        else:
+            self.shed_share = self.shed_share / 2 if self.shed_share >= 0.01 else 0.0
+        self._window_min = None
+        self._window_end = now + self._interval()
+
+    def shed_reason(self) -> str | None:
+        """Why the next public request should be shed, None to admit it."""
+        if self.inflight >= self._limit():
+            return "inflight"
+        if self.shed_share and self._rand() < self.shed_share:
+            return "delay"
+        return None
+
+    def retry_after(self) -> int:
+        return min(_MAX_RETRY_AFTER_S, max(1, math.ceil(max(self.delay_s, self._interval()) * 2)))
+
+    async def _run_probe(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(_PROBE_EVERY_S)
+            lag = time.perf_counter() - started - _PROBE_EVERY_S
+            queued = time.perf_counter()
+            await anyio.to_thread.run_sync(_noop)
+            self.observe_delay(max(0.0, lag) + time.perf_counter() - queued)
+
+    def start(self) -> None:
+        if self._probe is None:
+            self._probe = asyncio.get_running_loop().create_task(self._run_probe())
+
+    async def aclose(self) -> None:
+        probe, self._probe = self._probe, None
+        if probe is not None:
+            probe.cancel()
+            try:
+                await probe
+            except asyncio.CancelledError:
+                pass
+
+
+admission = AdmissionController()
+# bound to the process-wide controller only: other instances (tests, benchmarks) stay off /metrics
+ADMISSION_INFLIGHT.set_function(lambda: float(admission.inflight))
+ADMISSION_SHED_SHARE.set_function(lambda: admission.shed_share)
+
+
+def _authenticated(scope) -> bool:
+    for name, value in scope.get("headers") or ():
+        if name == b"authorization":
+            header = value.decode("latin-1")
+            if not header.lower().startswith("bearer "):
+                return False
+            try:
+                decode_access_token(header.split(" ", 1)[1].strip())
+            except Exception:  # noqa: BLE001
+                return False
+            return True
+    return False
+
+
+class AdmissionMiddleware:
+    """Pure ASGI, so a shed request never reaches routing, the body parser or a dependency."""
+
+    def __init__(self, app, controller: AdmissionController | None = None):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "") if scope["type"] == "http" else ""
+        if not path.startswith(PUBLIC_PREFIX) or path in settings.admission_exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller or admission
+        reason = controller.shed_reason()
+        if reason is not None and _authenticated(scope):
+            # signed-in users are not shed; the token is only checked when it matters
+            ADMISSION_DECISIONS.inc(decision="admitted", reason="authenticated")
+        elif reason is not None:
+            ADMISSION_DECISIONS.inc(decision="shed", reason=reason)
+            await self._overloaded(send, reason, controller.retry_after())
+            return
+        else:
+            ADMISSION_DECISIONS.inc(decision="admitted", reason="ok")
+
+        controller.inflight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.inflight -= 1
+
+    @staticmethod
+    async def _overloaded(send, reason: str, retry_after: int) -> None:
+        body = json.dumps(
+            {
+                "error": {
+                    "code": "OVERLOADED",
+                    "message": "Service is busy, retry shortly",
+                    "details": {"reason": reason},
+                }
+            }
+        ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
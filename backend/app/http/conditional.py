@@ -0,0 +1,28 @@
+"""
+Conditional GET helpers: ETag / If-None-Match for cacheable JSON responses.
+
+Routes that serve rarely changing data build their body once, keep the
+serialized bytes with an ETag (app.utils.etag), and answer a matching
+If-None-Match with an empty 304 instead of re-sending the payload.
+"""
+
+from __future__ import annotations
+
+from fastapi import Request, Response
+
+
+def _matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # weak comparison (RFC 9110 13.1.2): proxies may have added W/ when re-encoding
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in tags
+
+
+def conditional_json(request: Request, payload: bytes, etag: str, cache_control: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
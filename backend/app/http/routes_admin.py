@@ -1,12 +1,19 @@
 from datetime import datetime
+from uuid import UUID
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 
+from app.db.repo import Repo
 from app.db.session import get_db
 from app.deps import require_roles
-from app.domain.models import Product, Slot, User
+from app.domain.models import APIError, Product, Slot, User, UserAccessIn
+from app.security.token_versions import token_versions
+from app.services.catalog import catalog
+from app.services.rubric_reports import cohort_report, session_report
+from app.services.scoring import RUBRIC_VERSION
+from app.services.slots import slot_listings
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, split_page
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
@@ -16,13 +23,46 @@ def create_product(payload: dict, db: Session = Depends(get_db), _admin=Depends(
     row = Product(**payload)
     db.add(row)
     db.commit()
+    catalog.invalidate()
     return {"data": {"id": str(row.id)}}
 
 
 @router.get("/users")
-def users(db: Session = Depends(get_db), _admin=Depends(require_roles("admin", "consultant"))):
-    rows = db.scalars(select(User)).all()
-    return {"data": [{"id": str(u.id), "email": u.email, "role": u.role, "status": u.status} for u in rows]}
+def users(
+    cursor: str | None = None,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    _admin=Depends(require_roles("admin", "consultant")),
+):
+    after = decode_cursor(cursor, datetime, UUID) if cursor else None
+    rows = Repo(db).list_users(after=after, limit=limit)
+    rows, next_cursor = split_page(rows, limit, lambda u: (u.created_at, u.id))
+    return {
+        "data": [{"id": str(u.id), "email": u.email, "role": u.role, "status": u.status} for u in rows],
+        "next_cursor": next_cursor,
+    }
+
+
+@router.patch("/users/{user_id}")
+def update_user_access(
+    user_id: UUID,
+    payload: UserAccessIn,
+    db: Session = Depends(get_db),
+    _admin=Depends(require_roles("admin")),
+):
+    user = db.get(User, user_id)
+    if not user:
+        raise APIError("NOT_FOUND", "User not found", status_code=404)
+
+    Repo(db).update_user_access(
+        user,
+        role=payload.role.value if payload.role else None,
+        status=payload.status.value if payload.status else None,
+    )
+    db.commit()
+    # effective here immediately, in other processes after their next version refresh
+    token_versions.note(user.id, user.token_version)
+    return {"data": {"id": str(user.id), "role": user.role, "status": user.status, "token_version": user.token_version}}
 
 
 @router.post("/slots")
@@ -31,4 +71,32 @@ def create_slot(payload: dict, db: Session = Depends(get_db), _admin=Depends(req
     row = Slot(**payload)
     db.add(row)
     db.commit()
-    return {"data": {"id": str(row.id)}}
\ No newline at end of file
+    slot_listings.invalidate()
+    return {"data": {"id": str(row.id)}}
+
+
+@router.get("/reports/rubrics")
+def rubric_report(
+    group_by: str = Query(default="mode"),
+    user_id: UUID | None = None,
+    mode: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    version: str = Query(default=RUBRIC_VERSION),
+    db: Session = Depends(get_db),
+    _admin=Depends(require_roles("admin", "consultant")),
+):
+    report = cohort_report(
+        db, version=version, group_by=group_by, user_id=user_id, mode=mode, since=since, until=until
+    )
+    return {"data": report}
+
+
+@router.get("/reports/rubrics/sessions/{session_id}")
+def rubric_session_report(
+    session_id: UUID,
+    version: str = Query(default=RUBRIC_VERSION),
+    db: Session = Depends(get_db),
+    _admin=Depends(require_roles("admin", "consultant")),
+):
+    return {"data": session_report(db, session_id, version=version)}
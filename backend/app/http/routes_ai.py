@@ -1,16 +1,29 @@
 from __future__ import annotations
 
+import json
+from contextlib import aclosing
 from datetime import datetime, timezone
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.repo import Repo
-from app.db.session import get_db
-from app.deps import get_current_user
+from app.db.repo import AsyncRepo, Repo
+from app.db.session import get_async_db, get_db
+from app.deps import Principal, get_principal, get_principal_async
 from app.domain.models import APIError, MessageIn, SessionCreateIn
-from app.services.ai_orchestrator import process_user_message
+from app.integrations.llm_dispatch import MEMBER, llm_bulkhead
+from app.security.rate_limit import limiter
+from app.services.ai_orchestrator import (
+    process_user_message_async,
+    settle_turn_async,
+    start_turn_async,
+    stream_turn_async,
+)
+from app.settings import settings
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, split_page
 
 router = APIRouter(prefix="/api/ai", tags=["ai"])
 
@@ -32,7 +45,7 @@ def _norm_mode(mode: str) -> str:
 
 
 @router.post("/sessions")
-def create_session(payload: SessionCreateIn, user=Depends(get_current_user), db: Session = Depends(get_db)):
+def create_session(payload: SessionCreateIn, user: Principal = Depends(get_principal), db: Session = Depends(get_db)):
     repo = Repo(db)
     try:
         mode = _norm_mode(payload.mode)
@@ -50,7 +63,7 @@ def create_session(payload: SessionCreateIn, user=Depends(get_current_user), db:
 
 
 @router.get("/sessions/{session_id}")
-def get_session(session_id: UUID, user=Depends(get_current_user), db: Session = Depends(get_db)):
+def get_session(session_id: UUID, user: Principal = Depends(get_principal), db: Session = Depends(get_db)):
     repo = Repo(db)
     sess = repo.get_ai_session(session_id)
     if not sess or sess.user_id != user.id:
@@ -59,56 +72,151 @@ def get_session(session_id: UUID, user=Depends(get_current_user), db: Session =
 
 
 @router.get("/sessions/{session_id}/messages")
-def messages(session_id: UUID, user=Depends(get_current_user), db: Session = Depends(get_db)):
+def messages(
+    session_id: UUID,
+    cursor: str | None = None,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    user: Principal = Depends(get_principal),
+    db: Session = Depends(get_db),
+):
     repo = Repo(db)
     sess = repo.get_ai_session(session_id)
     if not sess or sess.user_id != user.id:
         raise APIError("NOT_FOUND", "Session not found", status_code=404)
 
-    rows = repo.list_messages(session_id)
+    after = decode_cursor(cursor, datetime, UUID) if cursor else None
+    rows, next_cursor = split_page(
+        repo.list_messages(session_id, after=after, limit=limit), limit, lambda m: (m.created_at, m.id)
+    )
     return {
         "data": [
             {"id": str(m.id), "role": m.role, "content": m.content, "created_at": m.created_at.isoformat()}
             for m in rows
-        ]
+        ],
+        "next_cursor": next_cursor,
     }
 
 
-@router.post("/sessions/{session_id}/messages")
-def send_message(session_id: UUID, payload: MessageIn, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    repo = Repo(db)
-    sess = repo.get_ai_session(session_id)
-    if not sess or sess.user_id != user.id:
-        raise APIError("NOT_FOUND", "Session not found", status_code=404)
-
-    if sess.status != "active":
-        raise APIError("SESSION_CLOSED", "Session is closed", status_code=409)
-
-    try:
-        # Atomic consumption inside txn; will rollback on any failure below
-        if not repo.consume_credit(user.id):
-            raise APIError(
-                "NO_CREDITS",
-                "No AI credits left. Please buy an AI package.",
-                {"pricing_url": "/pricing"},
-                status_code=402,
+@router.post(
+    "/sessions/{session_id}/messages",
+    dependencies=[Depends(limiter.limit("ai.messages", settings.rate_limit_ai))],
+)
+async def send_message(
+    session_id: UUID,
+    payload: MessageIn,
+    user: Principal = Depends(get_principal_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Async path: the credit and the user message are committed before the LLM call,
+    so neither a DB connection nor a threadpool worker is held while the model responds.
+    The LLM slot is taken first: a busy assistant (503 LLM_BUSY) costs no credit.
+    """
+    with await llm_bulkhead.acquire_async(MEMBER):
+        repo = AsyncRepo(db)
+        sess = await repo.get_ai_session(session_id)
+        if not sess or sess.user_id != user.id:
+            raise APIError("NOT_FOUND", "Session not found", status_code=404)
+
+        if sess.status != "active":
+            raise APIError("SESSION_CLOSED", "Session is closed", status_code=409)
+
+        try:
+            assistant = await process_user_message_async(
+                db, session_id, user.id, payload.content, sess.locale, sess.mode
             )
+            return {"data": {"assistant_message": {"id": str(assistant.id), "content": assistant.content}}}
+
+        except APIError:
+            await db.rollback()
+            raise
+        except Exception as exc:  # noqa: BLE001
+            await db.rollback()
+            raise exc
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class _TurnStreamResponse(StreamingResponse):
+    """Runs on_close however the response ends, also when the body was never iterated."""
+
+    def __init__(self, content, *, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self._on_close = on_close
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self._on_close()
+
+
+@router.post(
+    "/sessions/{session_id}/messages/stream",
+    dependencies=[Depends(limiter.limit("ai.messages", settings.rate_limit_ai))],
+)
+async def send_message_stream(
+    session_id: UUID,
+    payload: MessageIn,
+    user: Principal = Depends(get_principal_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Same as send_message, but the reply is streamed as Server-Sent Events:
+      event: delta  data: {"text": "..."}
+      event: done   data: {"assistant_message": {"id": "...", "content": "..."}}
+    Errors before the stream starts (404/409/402/503) are regular JSON errors.
+    If the client disconnects mid-stream, the credit is refunded.
+    The LLM slot is held until the stream ends.
+    """
+    slot = await llm_bulkhead.acquire_async(MEMBER)
+    try:
+        repo = AsyncRepo(db)
+        sess = await repo.get_ai_session(session_id)
+        if not sess or sess.user_id != user.id:
+            raise APIError("NOT_FOUND", "Session not found", status_code=404)
+
+        if sess.status != "active":
+            raise APIError("SESSION_CLOSED", "Session is closed", status_code=409)
+
+        try:
+            turn = await start_turn_async(db, session_id, user.id, payload.content, sess.locale, sess.mode)
+        except APIError:
+            await db.rollback()
+            raise
+        except Exception as exc:  # noqa: BLE001
+            await db.rollback()
+            raise exc
+    except BaseException:
+        slot.release()
+        raise
 
-        assistant = process_user_message(db, session_id, payload.content, sess.locale, sess.mode)
-        db.commit()
+    async def events():
+        # aclosing: a disconnect closes the turn stream now (refund included), not at GC
+        async with aclosing(stream_turn_async(turn)) as stream:
+            async for kind, value in stream:
+                if kind == "delta":
+                    yield _sse("delta", {"text": value})
+                else:
+                    yield _sse("done", {"assistant_message": {"id": str(value.id), "content": value.content}})
 
-        return {"data": {"assistant_message": {"id": str(assistant.id), "content": assistant.content}}}
+    async def close():
+        slot.release()
+        # refunds the credit if the reply was never committed (no-op otherwise)
+        await settle_turn_async(turn)
 
-    except APIError:
-        db.rollback()
-        raise
-    except Exception as exc:  # noqa: BLE001
-        db.rollback()
-        raise exc
+    return _TurnStreamResponse(
+        events(),
+        on_close=close,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/sessions/{session_id}/close")
-def close_session(session_id: UUID, user=Depends(get_current_user), db: Session = Depends(get_db)):
+def close_session(session_id: UUID, user: Principal = Depends(get_principal), db: Session = Depends(get_db)):
     repo = Repo(db)
     sess = repo.get_ai_session(session_id)
     if not sess or sess.user_id != user.id:
@@ -1,14 +1,25 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Request
+from datetime import datetime, timezone
+
+from anyio.to_thread import run_sync
+from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
 from app.db.repo import Repo
 from app.db.session import get_db
-from app.deps import get_current_user
-from app.domain.models import APIError, LoginIn, RegisterIn
-from app.security.auth import create_access_token, hash_password, verify_password
+from app.deps import Principal, get_current_user, get_principal
+from app.domain.models import APIError, LoginIn, LogoutIn, RefreshIn, RegisterIn, User
+from app.security.auth import (
+    create_access_token,
+    hash_password_async,
+    hash_refresh_token,
+    new_refresh_token,
+    verify_and_update_password_async,
+)
 from app.security.rate_limit import limiter
+from app.services import entitlements
+from app.settings import settings
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -24,47 +35,101 @@ def _user_status_value(user) -> str:
     return getattr(st, "value", st) or "active"
 
 
-@router.post("/register")
-@limiter.limit("5/minute")
-def register(request: Request, payload: RegisterIn, db: Session = Depends(get_db)):
+def _issue_tokens(repo: Repo, user: User) -> dict:
+    """Short-lived access token with claims + a stored (hashed) refresh token."""
+    role = getattr(user.role, "value", user.role)
+    access = create_access_token(
+        str(user.id), role, status=_user_status_value(user), token_version=user.token_version or 0
+    )
+    refresh, refresh_hash, expires_at = new_refresh_token()
+    repo.create_refresh_token(user.id, refresh_hash, expires_at)
+    return {
+        "access_token": access,
+        "token_type": "bearer",
+        "expires_in": settings.jwt_exp_minutes * 60,
+        "refresh_token": refresh,
+    }
+
+
+# register and login are async: the pbkdf2 wait is awaited without holding a threadpool
+# thread, and only the short DB steps borrow one (run_sync)
+@router.post("/register", dependencies=[Depends(limiter.limit("auth.register", settings.rate_limit_auth))])
+async def register(payload: RegisterIn, db: Session = Depends(get_db)):
     repo = Repo(db)
 
-    if repo.get_user_by_email(payload.email):
+    if await run_sync(repo.get_user_by_email, payload.email):
         raise APIError("EMAIL_EXISTS", "Email already registered", status_code=409)
 
     locale = _norm_locale(payload.locale)
+    password_hash = await hash_password_async(payload.password)
 
-    user = repo.create_user(
-        payload.email,
-        hash_password(payload.password),
-        payload.name,
-        locale,
-    )
+    def create():
+        user = repo.create_user(payload.email, password_hash, payload.name, locale)
+        db.commit()
+        return user
 
-    db.commit()
+    user = await run_sync(create)
     return {"data": {"id": str(user.id), "email": user.email, "locale": user.locale}}
 
 
-@router.post("/login")
-@limiter.limit("5/minute")
-def login(request: Request, payload: LoginIn, db: Session = Depends(get_db)):
+@router.post("/login", dependencies=[Depends(limiter.limit("auth.login", settings.rate_limit_auth))])
+async def login(payload: LoginIn, db: Session = Depends(get_db)):
     repo = Repo(db)
-    user = repo.get_user_by_email(payload.email)
+    user = await run_sync(repo.get_user_by_email, payload.email)
 
-    if not user or not verify_password(payload.password, user.password_hash):
+    if not user:
+        raise APIError("INVALID_CREDENTIALS", "Invalid credentials", status_code=401)
+    valid, upgraded_hash = await verify_and_update_password_async(payload.password, user.password_hash)
+    if not valid:
         raise APIError("INVALID_CREDENTIALS", "Invalid credentials", status_code=401)
 
     status = _user_status_value(user)
     if status != "active":
         raise APIError("USER_BLOCKED", "User is not active", {"status": status}, status_code=403)
 
-    token = create_access_token(str(user.id), user.role)
-    return {"data": {"access_token": token, "token_type": "bearer"}}
+    def issue():
+        if upgraded_hash:
+            user.password_hash = upgraded_hash
+        tokens = _issue_tokens(repo, user)
+        db.commit()
+        return tokens
+
+    return {"data": await run_sync(issue)}
+
+
+@router.post("/refresh", dependencies=[Depends(limiter.limit("auth.refresh", "30/minute"))])
+def refresh(payload: RefreshIn, db: Session = Depends(get_db)):
+    """Rotates the refresh token and returns a fresh access token."""
+    repo = Repo(db)
+    row = repo.get_refresh_token_for_update(hash_refresh_token(payload.refresh_token))
+    if not row or row.expires_at <= datetime.now(timezone.utc):
+        raise APIError("INVALID_REFRESH_TOKEN", "Invalid refresh token", status_code=401)
+
+    if row.revoked_at is not None:
+        # a rotated token came back: assume it leaked and end every session of the user
+        repo.revoke_user_refresh_tokens(row.user_id)
+        db.commit()
+        raise APIError("INVALID_REFRESH_TOKEN", "Invalid refresh token", status_code=401)
+
+    user = db.get(User, row.user_id)
+    status = _user_status_value(user) if user else "deleted"
+    if status != "active":
+        raise APIError("USER_BLOCKED", "User is not active", {"status": status}, status_code=403)
+
+    row.revoked_at = datetime.now(timezone.utc)
+    tokens = _issue_tokens(repo, user)
+    db.commit()
+    return {"data": tokens}
 
 
 @router.post("/logout")
-def logout():
-    # Stateless Bearer token (no denylist in MVP)
+def logout(payload: LogoutIn | None = None, db: Session = Depends(get_db)):
+    # Access tokens expire on their own (JWT_EXP_MINUTES); the refresh token is revoked
+    if payload and payload.refresh_token:
+        row = Repo(db).get_refresh_token_for_update(hash_refresh_token(payload.refresh_token))
+        if row and row.revoked_at is None:
+            row.revoked_at = datetime.now(timezone.utc)
+            db.commit()
     return {"data": {"ok": True}}
 
 
@@ -79,4 +144,9 @@ def me(user=Depends(get_current_user)):
             "role": user.role,
             "status": getattr(user.status, "value", user.status),
         }
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/me/entitlements")
+def my_entitlements(user: Principal = Depends(get_principal), db: Session = Depends(get_db)):
+    return {"data": entitlements.balances(Repo(db), user.id)}
\ No newline at end of file
@@ -1,70 +1,40 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from datetime import datetime
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import and_, or_, select
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy import and_, select
 from sqlalchemy.orm import Session
 
 from app.db.repo import Repo
 from app.db.session import get_db
-from app.deps import get_current_user
-from app.domain.models import APIError, Booking, Entitlement, Product, Slot
+from app.deps import Principal, get_principal
+from app.domain.models import APIError, Booking, Product, Slot
+from app.http.conditional import conditional_json
+from app.services import entitlements
 from app.services.booking import create_booking
+from app.services.slots import SLOTS_CACHE_CONTROL, open_slots_page, slot_listings
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, split_page
 
 router = APIRouter(prefix="/api/booking", tags=["booking"])
 
 
-def _now_utc() -> datetime:
-    return datetime.now(timezone.utc)
-
-
-def _consume_entitlement(db: Session, user_id: UUID, kind: str) -> bool:
-    """
-    Atomically consumes 1 unit from the earliest expiring entitlement of given kind.
-    Returns False if not available.
-    """
-    now = _now_utc()
-
-    ent = db.scalar(
-        select(Entitlement)
-        .where(
-            Entitlement.user_id == user_id,
-            Entitlement.kind == kind,
-            Entitlement.qty_used < Entitlement.qty_total,
-            Entitlement.valid_from <= now,
-            or_(Entitlement.valid_to.is_(None), Entitlement.valid_to >= now),
-        )
-        # Prefer those expiring sooner (FIFO by expiry), then older ones.
-        .order_by(Entitlement.valid_to.is_(None), Entitlement.valid_to, Entitlement.created_at)
-        .with_for_update()
-    )
-    if not ent:
-        return False
-
-    ent.qty_used += 1
-    return True
-
-
 @router.get("/slots")
-def get_slots(db: Session = Depends(get_db)):
-    rows = Repo(db).list_open_slots()
-    return {
-        "data": [
-            {
-                "id": str(s.id),
-                "starts_at_utc": s.starts_at_utc.isoformat(),
-                "duration_min": s.duration_min,
-                "title": s.title,
-            }
-            for s in rows
-        ]
-    }
+def get_slots(
+    request: Request,
+    starts_from: datetime | None = Query(default=None, alias="from"),
+    until: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = Query(default=100, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    page = open_slots_page(db, starts_from=starts_from, until=until, cursor=cursor, limit=limit)
+    return conditional_json(request, page.payload, page.etag, SLOTS_CACHE_CONTROL)
 
 
 @router.post("/slots/{slot_id}/reserve")
-def reserve(slot_id: UUID, user=Depends(get_current_user), db: Session = Depends(get_db)):
+def reserve(slot_id: UUID, user: Principal = Depends(get_principal), db: Session = Depends(get_db)):
     """
     MVP reserve: does not lock the slot (no reservation table yet).
     It tells whether user can book right now (has booking_access) or needs payment.
@@ -74,23 +44,7 @@ def reserve(slot_id: UUID, user=Depends(get_current_user), db: Session = Depends
         raise APIError("SLOT_NOT_FOUND", "Slot not available", status_code=404)
 
     # Check if user already has booking_access remaining (without consuming)
-    now = _now_utc()
-    has_access = (
-        db.scalar(
-            select(Entitlement.id)
-            .where(
-                Entitlement.user_id == user.id,
-                Entitlement.kind == "booking_access",
-                Entitlement.qty_used < Entitlement.qty_total,
-                Entitlement.valid_from <= now,
-                or_(Entitlement.valid_to.is_(None), Entitlement.valid_to >= now),
-            )
-            .limit(1)
-        )
-        is not None
-    )
-
-    if has_access:
+    if entitlements.has_units(Repo(db), user.id, "booking_access"):
         return {"data": {"slot_id": str(slot_id), "status": "ready_to_book"}}
 
     booking_product = db.scalar(
@@ -107,14 +61,14 @@ def reserve(slot_id: UUID, user=Depends(get_current_user), db: Session = Depends
 
 
 @router.post("/slots/{slot_id}/book")
-def book(slot_id: UUID, user=Depends(get_current_user), db: Session = Depends(get_db)):
+def book(slot_id: UUID, user: Principal = Depends(get_principal), db: Session = Depends(get_db)):
     """
     Requires booking_access entitlement.
     Consumption + slot booking happen in the same transaction so failures rollback consumption.
     """
     try:
         # Consume booking entitlement first (will rollback on failure below)
-        if not _consume_entitlement(db, user.id, "booking_access"):
+        if not entitlements.take(Repo(db), user.id, "booking_access"):
             raise APIError(
                 "NO_BOOKING_ACCESS",
                 "No consultation credits left. Please purchase a consultation slot.",
@@ -124,6 +78,7 @@ def book(slot_id: UUID, user=Depends(get_current_user), db: Session = Depends(ge
 
         booking = create_booking(db, user.id, slot_id)
         db.commit()
+        slot_listings.invalidate()
         return {"data": {"booking_id": str(booking.id), "status": booking.status}}
 
     except APIError:
@@ -135,15 +90,17 @@ def book(slot_id: UUID, user=Depends(get_current_user), db: Session = Depends(ge
 
 
 @router.get("/my")
-def my_bookings(user=Depends(get_current_user), db: Session = Depends(get_db)):
-    # include slot info, meeting_url only for own bookings
-    stmt = (
-        select(Booking, Slot)
-        .join(Slot, Slot.id == Booking.slot_id)
-        .where(Booking.user_id == user.id)
-        .order_by(Booking.created_at.desc())
+def my_bookings(
+    cursor: str | None = None,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    user: Principal = Depends(get_principal),
+    db: Session = Depends(get_db),
+):
+    # newest first; include slot info, meeting_url only for own bookings
+    after = decode_cursor(cursor, datetime, UUID) if cursor else None
+    rows, next_cursor = split_page(
+        Repo(db).list_user_bookings(user.id, after=after, limit=limit), limit, lambda r: (r[0].created_at, r[0].id)
     )
-    rows = db.execute(stmt).all()
 
     out = []
     for b, s in rows:
@@ -163,11 +120,11 @@ def my_bookings(user=Depends(get_current_user), db: Session = Depends(get_db)):
             }
         )
 
-    return {"data": out}
+    return {"data": out, "next_cursor": next_cursor}
 
 
 @router.post("/{booking_id}/cancel")
-def cancel_booking(booking_id: UUID, user=Depends(get_current_user), db: Session = Depends(get_db)):
+def cancel_booking(booking_id: UUID, user: Principal = Depends(get_principal), db: Session = Depends(get_db)):
     """
     MVP cancel: marks booking cancelled and re-opens the slot if it was booked.
     Refund flow is not implemented here.
@@ -187,6 +144,7 @@ def cancel_booking(booking_id: UUID, user=Depends(get_current_user), db: Session
             slot.status = "open"
 
         db.commit()
+        slot_listings.invalidate()
         return {"data": {"id": str(booking_id), "status": "cancelled"}}
 
     except APIError:
@@ -1,19 +1,17 @@
 from __future__ import annotations
 
 import uuid
-from uuid import UUID
 
 from fastapi import APIRouter, Depends, Header, Request
-from sqlalchemy import select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.repo import Repo
-from app.db.session import get_db
+from app.db.repo import AsyncRepo, Repo
+from app.db.session import get_async_db, get_db
 from app.deps import get_current_user
-from app.domain.models import APIError, CheckoutIn, Order, PaymentEvent
+from app.domain.models import APIError, CheckoutIn
 from app.integrations.payments_stripe import StripeError, construct_event, create_checkout_session
-from app.services.payments import apply_paid_event
+from app.services.catalog import catalog
 from app.settings import settings
 
 router = APIRouter(prefix="/api/payments", tags=["payments"])
@@ -23,7 +21,7 @@ router = APIRouter(prefix="/api/payments", tags=["payments"])
 def checkout(payload: CheckoutIn, user=Depends(get_current_user), db: Session = Depends(get_db)):
     repo = Repo(db)
 
-    product = repo.get_product(payload.product_id)
+    product = catalog.get(db, payload.product_id)
     if not product or not product.active:
         raise APIError("PRODUCT_NOT_FOUND", "Product not found", status_code=404)
 
@@ -68,8 +66,14 @@ def checkout(payload: CheckoutIn, user=Depends(get_current_user), db: Session =
 async def webhook(
     request: Request,
     stripe_signature: str | None = Header(default=None, alias="Stripe-Signature"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
+    """
+    Fast path: verify, store, answer. Side effects (orders, entitlements) are applied
+    by the payments worker (python -m app.payments_worker), so a burst of events or
+    a Stripe replay never makes Stripe wait and retry. The response only says whether
+    the event was stored; it has not been applied yet.
+    """
     payload = await request.body()
 
     try:
@@ -81,51 +85,8 @@ async def webhook(
     except StripeError as exc:
         raise APIError("INVALID_SIGNATURE", str(exc), status_code=401) from exc
 
-    repo = Repo(db)
-
-    # Store event for audit + idempotency.
-    # Repo.insert_payment_event() is race-safe; we still keep a defensive catch.
-    try:
-        evt, is_new = repo.insert_payment_event(
-            "stripe",
-            event["id"],
-            event.get("type", "unknown"),
-            event,
-        )
-    except IntegrityError:
-        db.rollback()
-        existing = db.scalar(select(PaymentEvent).where(PaymentEvent.event_id == event["id"]))
-        if existing:
-            return {"data": {"received": True, "deduplicated": True, "processed": False}}
-        raise
-
-    processed = False
-    try:
-        if is_new:
-            etype = event.get("type")
-
-            # Preferred signal: checkout.session.completed with metadata.order_id
-            if etype == "checkout.session.completed":
-                obj = (event.get("data") or {}).get("object") or {}
-                meta = obj.get("metadata") or {}
-                order_id = meta.get("order_id")
-
-                # Only consider paid sessions
-                if obj.get("payment_status") == "paid" and order_id:
-                    order = db.get(Order, UUID(order_id))
-                    if order and order.provider_ref:
-                        # apply_paid_event is idempotent (skips if already paid)
-                        apply_paid_event(db, order.provider_ref)
-                        processed = True
-
-        repo.mark_payment_event_processed(evt)
-        db.commit()
-
-    except APIError:
-        db.rollback()
-        raise
-    except Exception as exc:  # noqa: BLE001
-        db.rollback()
-        raise exc
+    # INSERT ... ON CONFLICT DO NOTHING: a replayed event_id is acknowledged, not re-queued
+    is_new = await AsyncRepo(db).enqueue_payment_event("stripe", event["id"], event.get("type", "unknown"), event)
+    await db.commit()
 
-    return {"data": {"received": True, "deduplicated": not is_new, "processed": processed}}
+    return {"data": {"received": True, "deduplicated": not is_new}}
@@ -1,18 +1,28 @@
+from datetime import datetime
 from secrets import token_urlsafe
 from typing import Literal
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Request
+from anyio.to_thread import run_sync
+from fastapi import APIRouter, Depends, Query, Request
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
 from app.db.repo import Repo
 from app.db.session import get_db
 from app.domain.models import APIError
-from app.integrations.llm_openai import generate_therapy_reply
+from app.http.conditional import conditional_json
+from app.integrations.llm_dispatch import PUBLIC, llm_bulkhead
+from app.integrations.llm_openai import generate_therapy_reply_async
 from app.integrations.payments_stripe import StripeError, create_checkout_session, is_stripe_configured
-from app.security.auth import hash_password
+from app.security.passwords import unusable_password
+from app.security.rate_limit import limiter
+from app.services.catalog import PRODUCTS_CACHE_CONTROL, catalog
+from app.services.context_builder import therapy_context
+from app.services.diagnostic_context import DEFAULT_CONTEXT, diagnostic_contexts
+from app.services.slots import SLOTS_CACHE_CONTROL, open_slots_page
 from app.settings import settings
+from app.utils.pagination import MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/api/public", tags=["public"])
 
@@ -56,7 +66,14 @@ class PublicTherapyHistoryItem(BaseModel):
 
 
 class PublicTherapyReplyIn(BaseModel):
+    """
+    Clients send only the new message plus the conversation_id of the previous reply
+    (none on the first turn); the server keeps the turns. `history` is for clients that
+    still resend the whole conversation: with history and no conversation_id nothing is stored.
+    """
+
     message: str = Field(min_length=2, max_length=8000)
+    conversation_id: str | None = Field(default=None, max_length=64)
     diagnostic_submission_id: str | None = Field(default=None)
     locale: str = Field(default="ru", max_length=5)
     history: list[PublicTherapyHistoryItem] = Field(default_factory=list, max_length=30)
@@ -66,6 +83,7 @@ class PublicTherapyReplyOut(BaseModel):
     reply: str
     plan: str
     risk_level: str
+    conversation_id: str | None = None
 
 
 def detect_plan(payload: DiagnosticSubmitIn) -> str:
@@ -91,6 +109,13 @@ def _safe_redirect_url(value: str | None) -> str | None:
     return candidate
 
 
+def _parse_uuid(value: str | None) -> UUID | None:
+    try:
+        return UUID(value) if value else None
+    except ValueError:
+        return None
+
+
 def _normalize_locale(locale: str) -> str:
     loc = (locale or "ru").strip().lower()
     if loc.startswith("de"):
@@ -113,32 +138,22 @@ def expert():
 
 
 @router.get("/products")
-def products(db: Session = Depends(get_db)):
-    repo = Repo(db)
-    rows = repo.list_products()
-    return {
-        "data": [
-            {"id": str(p.id), "code": p.code, "price_cents": p.price_cents, "currency": p.currency, "type": p.type}
-            for p in rows
-        ]
-    }
+def products(request: Request, db: Session = Depends(get_db)):
+    snap = catalog.snapshot(db)
+    return conditional_json(request, snap.products_payload, snap.products_etag, PRODUCTS_CACHE_CONTROL)
 
 
 @router.get("/slots")
-def slots(db: Session = Depends(get_db)):
-    repo = Repo(db)
-    rows = repo.list_open_slots()
-    return {
-        "data": [
-            {
-                "id": str(s.id),
-                "starts_at_utc": s.starts_at_utc.isoformat(),
-                "duration_min": s.duration_min,
-                "title": s.title,
-            }
-            for s in rows
-        ]
-    }
+def slots(
+    request: Request,
+    starts_from: datetime | None = Query(default=None, alias="from"),
+    until: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = Query(default=100, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    page = open_slots_page(db, starts_from=starts_from, until=until, cursor=cursor, limit=limit)
+    return conditional_json(request, page.payload, page.etag, SLOTS_CACHE_CONTROL)
 
 
 @router.post("/diagnostic", response_model=DiagnosticSubmitOut)
@@ -161,58 +176,87 @@ def submit_diagnostic(payload: DiagnosticSubmitIn, request: Request, db: Session
     return DiagnosticSubmitOut(id=str(row.id), recommended_plan=row.recommended_plan)
 
 
-@router.post("/therapy/reply", response_model=PublicTherapyReplyOut)
-def public_therapy_reply(payload: PublicTherapyReplyIn, db: Session = Depends(get_db)):
-    repo = Repo(db)
+@router.post(
+    "/therapy/reply",
+    response_model=PublicTherapyReplyOut,
+    dependencies=[Depends(limiter.limit("public.therapy", settings.rate_limit_ai))],
+)
+async def public_therapy_reply(payload: PublicTherapyReplyIn, db: Session = Depends(get_db)):
+    # async: a request queued for an LLM slot waits on the event loop, not in a threadpool
+    # thread, so a public spike cannot starve the sync routes. The slot is taken before the
+    # first query, so a queued request holds no DB connection either; a full public queue
+    # answers 503 LLM_BUSY before anything is written
+    with await llm_bulkhead.acquire_async(PUBLIC):
+        return await _therapy_reply(payload, db)
 
-    diagnostic_context: dict[str, str | list[str]] = {
-        "reasons": [],
-        "goal": "",
-        "situation": "",
-        "history": "",
-        "focus": ["Стабилизация", "Осознанность", "Ответственное поведение"],
-    }
-    plan = "start"
-    risk_level = "moderate"
-
-    if payload.diagnostic_submission_id:
-        diag = None
-        try:
-            diag_id = UUID(payload.diagnostic_submission_id)
-            diag = repo.get_diagnostic_submission(diag_id)
-        except ValueError:
-            diag = None
-
-        if diag:
-            diagnostic_context = {
-                "reasons": diag.reasons,
-                "goal": diag.goal,
-                "situation": diag.situation,
-                "history": diag.history,
-                "focus": [
-                    f"Триггер: {diag.reasons[0]}" if diag.reasons else "Стабилизация",
-                    f"Цель: {diag.goal[:160]}",
-                    "Снижение риска срыва",
-                ],
-            }
-            plan = diag.recommended_plan
-            risk_level = "high" if len(diag.history or "") > 160 else "moderate"
-
-    reply = generate_therapy_reply(
-        locale=_normalize_locale(payload.locale),
-        diagnostic_context=diagnostic_context,
-        history=[m.model_dump() for m in payload.history],
+
+async def _therapy_reply(payload: PublicTherapyReplyIn, db: Session) -> PublicTherapyReplyOut:
+    repo = Repo(db)
+    locale = _normalize_locale(payload.locale)
+
+    # the DB steps borrow a threadpool thread (run_sync); the model call is awaited without one
+    def load():
+        diag_id = _parse_uuid(payload.diagnostic_submission_id)
+        conversation = None
+        # a new conversation is only written with its first turn pair, after a successful reply
+        new = False
+        if payload.conversation_id:
+            conversation_id = _parse_uuid(payload.conversation_id)
+            conversation = repo.get_public_conversation(conversation_id) if conversation_id else None
+            if conversation is None:
+                raise APIError("CONVERSATION_NOT_FOUND", "Conversation not found, start a new one", status_code=404)
+            diag_id = conversation.diagnostic_submission_id or diag_id
+            turns = repo.recent_public_turns(conversation.id, settings.therapy_history_turns)
+            history = [{"role": t.role, "content": t.content} for t in turns]
+        elif payload.history:
+            # compatibility: the client resends the conversation, keep nothing server-side
+            history = [m.model_dump() for m in payload.history]
+        else:
+            new = True
+            history = []
+
+        diagnostic = DEFAULT_CONTEXT
+        if diag_id:
+            # one read per submission and process; later turns hit the cache
+            diagnostic = diagnostic_contexts.get(diag_id, repo.get_diagnostic_submission) or DEFAULT_CONTEXT
+
+        # release the connection while the model is working
+        db.commit()
+        return conversation, new, diag_id, history, diagnostic
+
+    conversation, new, diag_id, history, diagnostic = await run_sync(load)
+
+    context = therapy_context(diagnostic.facts, history)
+    reply = await generate_therapy_reply_async(
+        locale=locale,
+        diagnostic_context=diagnostic.facts,
         user_message=payload.message,
+        context=context.render(locale),
     )
 
-    return PublicTherapyReplyOut(reply=reply, plan=plan, risk_level=risk_level)
+    if conversation is not None or new:
+
+        def store():
+            target = conversation or repo.create_public_conversation(locale, diag_id)
+            repo.add_public_turns(target, [("user", payload.message.strip()), ("assistant", reply)])
+            db.commit()
+            return target
+
+        conversation = await run_sync(store)
+
+    return PublicTherapyReplyOut(
+        reply=reply,
+        plan=diagnostic.plan,
+        risk_level=diagnostic.risk_level,
+        conversation_id=str(conversation.id) if conversation is not None else None,
+    )
 
 
 @router.post("/checkout", response_model=PublicCheckoutOut)
 def public_checkout(payload: PublicCheckoutIn, db: Session = Depends(get_db)):
     repo = Repo(db)
     product_code = PLAN_TO_PRODUCT_CODE[payload.plan]
-    product = repo.get_product_by_code(product_code)
+    product = catalog.get_by_code(db, product_code)
     if not product:
         raise APIError(
             "PRODUCT_NOT_FOUND",
@@ -229,7 +273,7 @@ def public_checkout(payload: PublicCheckoutIn, db: Session = Depends(get_db)):
         name = (payload.name or payload.email.split("@")[0] or "Client")[:120]
         user = repo.create_user(
             email=payload.email,
-            password_hash=hash_password(token_urlsafe(24)),
+            password_hash=unusable_password(),
             name=name,
             locale="de",
         )
@@ -0,0 +1,237 @@
+"""
+Admission in front of the LLM provider (app.integrations.llm_openai).
+
+Every AI reply holds a slot while it talks to the provider. Slots are limited
+per process (LLM_MAX_CONCURRENCY) and per traffic class (LLM_CLASS_CONCURRENCY):
+"member" for paid /api/ai turns, "public" for /api/public/therapy/reply. A call
+that finds no free slot waits in its class queue (at most LLM_CLASS_QUEUE
+entries, LLM_QUEUE_TIMEOUT_S). Freed slots go to member waiters before public
+ones, FIFO within a class, so a public spike can neither take every slot nor
+get ahead of paying users.
+
+A full queue or a wait that runs out fails fast with 503 LLM_BUSY and a
+Retry-After estimated from recent call durations. Sync routes (threadpool) and
+async ones (event loop) share the same slots.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+
+from app.domain.models import APIError
+from app.settings import settings
+from app.utils.metrics import counter, gauge, histogram
+
+MEMBER = "member"
+PUBLIC = "public"
+# slot hand-out order when several classes wait
+_PRIORITY = (MEMBER, PUBLIC)
+
+_MAX_RETRY_AFTER_S = 60
+
+LLM_QUEUE_WAIT = histogram(
+    "llm_queue_wait_seconds",
+    "Time an LLM call waited for a slot (0 when one was free)",
+    ("traffic",),
+    buckets=(0.005, 0.025, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0),
+)
+LLM_BULKHEAD_CALLS = gauge(
+    "llm_bulkhead_calls",
+    "LLM calls holding a slot (running) or waiting for one (queued)",
+    ("traffic", "state"),
+)
+LLM_REJECTED = counter(
+    "llm_bulkhead_rejected_total",
+    "LLM calls turned away (queue_full|timeout)",
+    ("traffic", "reason"),
+)
+
+
+class _Waiter:
+    """A queued call; woken from whichever thread frees a slot."""
+
+    __slots__ = ("traffic", "granted", "_event", "_loop", "_future")
+
+    def __init__(self, traffic: str, loop: asyncio.AbstractEventLoop | None = None):
+        self.traffic = traffic
+        self.granted = False
+        self._loop = loop
+        self._event = threading.Event() if loop is None else None
+        self._future = loop.create_future() if loop is not None else None
+
+    def wake(self) -> None:
+        self.granted = True
+        if self._event is not None:
+            self._event.set()
+        else:
+            self._loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self._future.done():
+            self._future.set_result(None)
+
+
+class LLMSlot:
+    """A held slot. Use as a context manager or call release() (idempotent)."""
+
+    def __init__(self, bulkhead: LLMBulkhead, traffic: str):
+        self.traffic = traffic
+        self._bulkhead = bulkhead
+        self._started = time.perf_counter()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._bulkhead._release(self.traffic, time.perf_counter() - self._started)
+
+    def __enter__(self) -> LLMSlot:
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.release()
+
+
+class LLMBulkhead:
+    def __init__(
+        self,
+        max_concurrency: int | None = None,
+        class_limits: dict[str, int] | None = None,
+        queue_limits: dict[str, int] | None = None,
+        timeout_s: float | None = None,
+    ):
+        self._max_concurrency = max_concurrency
+        self._class_limits = class_limits
+        self._queue_limits = queue_limits
+        self._timeout_s = timeout_s
+        self._running: dict[str, int] = {}
+        self._total = 0
+        self._queues: dict[str, deque[_Waiter]] = {}
+        # moving average of how long a slot is held, for Retry-After
+        self._hold_s = 2.0
+        self._lock = threading.Lock()
+
+    # limits are read per call so settings changes (and test overrides) apply at once
+    def _total_limit(self) -> int:
+        return settings.llm_max_concurrency if self._max_concurrency is None else self._max_concurrency
+
+    def _class_limit(self, traffic: str) -> int:
+        limits = settings.llm_class_concurrency if self._class_limits is None else self._class_limits
+        return limits.get(traffic, self._total_limit())
+
+    def _queue_limit(self, traffic: str) -> int:
+        limits = settings.llm_class_queue if self._queue_limits is None else self._queue_limits
+        return limits.get(traffic, 0)
+
+    def _timeout(self) -> float:
+        return settings.llm_queue_timeout_s if self._timeout_s is None else self._timeout_s
+
+    # -- under self._lock --
+    def _free(self, traffic: str) -> bool:
+        return self._total < self._total_limit() and self._running.get(traffic, 0) < self._class_limit(traffic)
+
+    def _take(self, traffic: str) -> None:
+        self._running[traffic] = self._running.get(traffic, 0) + 1
+        self._total += 1
+
+    def _dispatch(self) -> None:
+        order = sorted(self._queues, key=lambda t: _PRIORITY.index(t) if t in _PRIORITY else len(_PRIORITY))
+        for traffic in order:
+            queue = self._queues[traffic]
+            while queue and self._free(traffic):
+                self._take(traffic)
+                queue.popleft().wake()
+
+    def _busy(self, traffic: str, reason: str, position: int) -> APIError:
+        LLM_REJECTED.inc(traffic=traffic, reason=reason)
+        slots = max(1, min(self._class_limit(traffic), self._total_limit()))
+        retry_after = min(_MAX_RETRY_AFTER_S, max(1, math.ceil(self._hold_s * (position + 1) / slots)))
+        return APIError(
+            "LLM_BUSY",
+            "The assistant is busy, retry shortly",
+            {"traffic": traffic, "reason": reason},
+            status_code=503,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    def _enter(self, traffic: str, loop: asyncio.AbstractEventLoop | None) -> _Waiter | None:
+        """Takes a free slot (returns None) or queues a waiter; raises LLM_BUSY when the queue is full."""
+        with self._lock:
+            queue = self._queues.setdefault(traffic, deque())
+            if not queue and self._free(traffic):
+                self._take(traffic)
+                return None
+            if len(queue) >= self._queue_limit(traffic):
+                raise self._busy(traffic, "queue_full", len(queue))
+            waiter = _Waiter(traffic, loop)
+            queue.append(waiter)
+            return waiter
+
+    def _settle(self, waiter: _Waiter) -> None:
+        """After the wait: returns if the waiter got its slot, otherwise dequeues it and raises LLM_BUSY."""
+        with self._lock:
+            if waiter.granted:
+                return
+            queue = self._queues[waiter.traffic]
+            position = queue.index(waiter)
+            del queue[position]
+            error = self._busy(waiter.traffic, "timeout", position)
+        raise error
+
+    def _release(self, traffic: str, held_s: float | None) -> None:
+        with self._lock:
+            self._running[traffic] -= 1
+            self._total -= 1
+            if held_s is not None:
+                self._hold_s = 0.8 * self._hold_s + 0.2 * held_s
+            self._dispatch()
+
+    # -- public API --
+    def acquire(self, traffic: str) -> LLMSlot:
+        """Blocks the calling thread until a slot is free; LLM_BUSY (503) if the queue is full or the wait runs out."""
+        started = time.perf_counter()
+        waiter = self._enter(traffic, None)
+        if waiter is not None:
+            waiter._event.wait(self._timeout())
+            self._settle(waiter)
+        LLM_QUEUE_WAIT.observe(time.perf_counter() - started, traffic=traffic)
+        return LLMSlot(self, traffic)
+
+    async def acquire_async(self, traffic: str) -> LLMSlot:
+        """Async twin of acquire(); a cancelled wait gives its slot back."""
+        started = time.perf_counter()
+        waiter = self._enter(traffic, asyncio.get_running_loop())
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(waiter._future, self._timeout())
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                with self._lock:
+                    granted = waiter.granted
+                    if not granted:
+                        self._queues[traffic].remove(waiter)
+                if granted:
+                    self._release(traffic, None)
+                raise
+            self._settle(waiter)
+        LLM_QUEUE_WAIT.observe(time.perf_counter() - started, traffic=traffic)
+        return LLMSlot(self, traffic)
+
+    def snapshot(self) -> dict[tuple[str, str], float]:
+        with self._lock:
+            out: dict[tuple[str, str], float] = {}
+            for traffic in set(self._running) | set(self._queues):
+                out[(traffic, "running")] = float(self._running.get(traffic, 0))
+                out[(traffic, "queued")] = float(len(self._queues.get(traffic, ())))
+            return out
+
+
+llm_bulkhead = LLMBulkhead()
+# bound to the process-wide bulkhead only: other instances (tests, benchmarks) stay off /metrics
+LLM_BULKHEAD_CALLS.set_function(llm_bulkhead.snapshot)
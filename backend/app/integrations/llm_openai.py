@@ -1,14 +1,361 @@
 from __future__ import annotations
 
+import importlib.util
 import os
-from typing import Any
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Mapping
 
-from openai import OpenAI
+import httpx
+import openai
+from openai import AsyncOpenAI, OpenAI
 
 from app.settings import settings
+from app.utils import metrics
 
 DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
 
+# HTTP/2 needs the optional `h2` package (httpx[http2]); without it we stay on HTTP/1.1 keep-alive.
+_H2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class LLMClientManager:
+    """
+    Process-wide OpenAI clients (sync + async), each backed by one keep-alive
+    httpx connection pool, so calls reuse TCP/TLS connections to the provider.
+
+    Clients are built lazily and rebuilt if the API key changes.
+    start()/aclose() are wired to FastAPI startup/shutdown in app.main.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sync: OpenAI | None = None
+        self._sync_key: str | None = None
+        self._async: AsyncOpenAI | None = None
+        self._async_key: str | None = None
+
+    @staticmethod
+    def _limits() -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=settings.llm_pool_max_connections,
+            max_keepalive_connections=settings.llm_pool_max_keepalive,
+            keepalive_expiry=settings.llm_keepalive_expiry_s,
+        )
+
+    @staticmethod
+    def _timeout() -> httpx.Timeout:
+        return httpx.Timeout(settings.llm_timeout_s, connect=settings.llm_connect_timeout_s)
+
+    @staticmethod
+    def _http2() -> bool:
+        return bool(settings.llm_http2) and _H2_AVAILABLE
+
+    def _client_kwargs(self, api_key: str) -> dict[str, Any]:
+        return {
+            "api_key": api_key,
+            "base_url": settings.openai_base_url or None,
+            "timeout": self._timeout(),
+            "max_retries": settings.llm_max_retries,
+        }
+
+    def sync_client(self) -> OpenAI:
+        key = settings.openai_api_key
+        client = self._sync
+        if client is not None and self._sync_key == key:
+            return client
+
+        with self._lock:
+            if self._sync is None or self._sync_key != key:
+                old = self._sync
+                self._sync = OpenAI(
+                    **self._client_kwargs(key),
+                    http_client=httpx.Client(limits=self._limits(), http2=self._http2(), timeout=self._timeout()),
+                )
+                self._sync_key = key
+                if old is not None:
+                    old.close()
+            return self._sync
+
+    def async_client(self) -> AsyncOpenAI:
+        key = settings.openai_api_key
+        client = self._async
+        if client is not None and self._async_key == key:
+            return client
+
+        with self._lock:
+            if self._async is None or self._async_key != key:
+                # a replaced async client is left to GC: it cannot be awaited from here
+                self._async = AsyncOpenAI(
+                    **self._client_kwargs(key),
+                    http_client=httpx.AsyncClient(limits=self._limits(), http2=self._http2(), timeout=self._timeout()),
+                )
+                self._async_key = key
+            return self._async
+
+    def start(self) -> None:
+        if getattr(settings, "openai_api_key", None):
+            self.sync_client()
+            self.async_client()
+
+    async def aclose(self) -> None:
+        with self._lock:
+            sync_client, async_client = self._sync, self._async
+            self._sync = self._async = None
+            self._sync_key = self._async_key = None
+        if sync_client is not None:
+            sync_client.close()
+        if async_client is not None:
+            await async_client.close()
+
+
+llm_clients = LLMClientManager()
+
+
+# -----------------------------
+# Endpoint capability / circuit breaker
+# -----------------------------
+RESPONSES = "responses"
+CHAT = "chat"
+
+_BREAKER_STATE_CODES = {"closed": 0, "open": 1, "half_open": 2}
+
+
+@dataclass
+class _BreakerEntry:
+    state: str = "closed"
+    failures: int = 0
+    open_until: float = 0.0
+
+
+class EndpointBreaker:
+    """
+    Remembers per (model, endpoint) whether the provider endpoint works.
+
+    - capability errors (404/400/403, SDK without the endpoint) open the breaker at once
+    - transient errors open it after `failure_threshold` consecutive failures
+    - an open endpoint is skipped until `cooldown_s` passes, then one probe
+      call is let through (half-open); success closes it, failure re-opens it
+    """
+
+    def __init__(self, failure_threshold: int, cooldown_s: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.cooldown_s = float(cooldown_s)
+        self._clock = clock
+        self._entries: dict[tuple[str, str], _BreakerEntry] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, model: str, endpoint: str) -> bool:
+        entry = self._entries.get((model, endpoint))
+        if entry is None or entry.state == "closed":
+            return True
+        with self._lock:
+            now = self._clock()
+            if now >= entry.open_until:
+                # this caller is the probe; a lost probe is retried after another cooldown
+                entry.state = "half_open"
+                entry.open_until = now + self.cooldown_s
+                return True
+            return False
+
+    def record_success(self, model: str, endpoint: str) -> None:
+        entry = self._entries.get((model, endpoint))
+        if entry is None or (entry.state == "closed" and entry.failures == 0):
+            return
+        with self._lock:
+            entry.state = "closed"
+            entry.failures = 0
+
+    def record_failure(self, model: str, endpoint: str, exc: BaseException | None = None) -> None:
+        if _is_request_error(exc):
+            return
+        with self._lock:
+            entry = self._entries.setdefault((model, endpoint), _BreakerEntry())
+            entry.failures += 1
+            if entry.state == "half_open" or _is_capability_error(exc) or entry.failures >= self.failure_threshold:
+                entry.state = "open"
+                entry.open_until = self._clock() + self.cooldown_s
+
+    def state(self, model: str, endpoint: str) -> str:
+        entry = self._entries.get((model, endpoint))
+        return entry.state if entry else "closed"
+
+    def snapshot(self) -> dict[tuple[str, str], float]:
+        with self._lock:
+            return {key: float(_BREAKER_STATE_CODES[e.state]) for key, e in self._entries.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# 400 codes that mean the endpoint rejects what every request sends, not this one request
+_CAPABILITY_CODES = frozenset({"unsupported_parameter"})
+# client attributes an older SDK may not have
+_ENDPOINT_ATTRS = frozenset({"responses", "chat", "completions"})
+
+
+def _is_capability_error(exc: BaseException | None) -> bool:
+    """Errors meaning "this endpoint/model combination does not work here", not a blip."""
+    if isinstance(exc, (openai.NotFoundError, openai.PermissionDeniedError)):
+        return True
+    if isinstance(exc, openai.BadRequestError):
+        return getattr(exc, "code", None) in _CAPABILITY_CODES
+    return isinstance(exc, AttributeError) and getattr(exc, "name", None) in _ENDPOINT_ATTRS
+
+
+def _is_request_error(exc: BaseException | None) -> bool:
+    """A 400 caused by the request itself (context too long, bad value): says nothing about the endpoint."""
+    return isinstance(exc, openai.BadRequestError) and not _is_capability_error(exc)
+
+
+llm_breaker = EndpointBreaker(
+    failure_threshold=settings.llm_breaker_failure_threshold,
+    cooldown_s=settings.llm_breaker_cooldown_s,
+)
+
+LLM_BREAKER_STATE = metrics.gauge(
+    "llm_breaker_state",
+    "LLM endpoint breaker state per model (0=closed, 1=open, 2=half_open)",
+    labelnames=("model", "endpoint"),
+)
+LLM_BREAKER_STATE.set_function(llm_breaker.snapshot)
+
+LLM_FALLBACKS = metrics.counter(
+    "llm_fallback_total",
+    "LLM fallbacks from one endpoint to the next (chat or static reply)",
+    labelnames=("model", "source", "target", "reason"),
+)
+
+LLM_CALL_SECONDS = metrics.histogram(
+    "llm_call_seconds",
+    "LLM call latency (streams: until the last delta)",
+    labelnames=("model", "endpoint", "outcome"),
+    buckets=(0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0),
+)
+LLM_TOKENS = metrics.counter(
+    "llm_tokens_total",
+    "Tokens reported by the provider",
+    labelnames=("model", "endpoint", "kind"),
+)
+
+
+def _record_call(model: str, endpoint: str, started: float, outcome: str, usage: Any = None) -> None:
+    LLM_CALL_SECONDS.observe(time.perf_counter() - started, model=model, endpoint=endpoint, outcome=outcome)
+    if usage is None:
+        return
+    # Responses API: input/output_tokens; Chat Completions: prompt/completion_tokens
+    prompt = getattr(usage, "input_tokens", None) or getattr(usage, "prompt_tokens", None) or 0
+    completion = getattr(usage, "output_tokens", None) or getattr(usage, "completion_tokens", None) or 0
+    if prompt:
+        LLM_TOKENS.inc(prompt, model=model, endpoint=endpoint, kind="prompt")
+    if completion:
+        LLM_TOKENS.inc(completion, model=model, endpoint=endpoint, kind="completion")
+
+
+def _chat_messages(system: str, user: str) -> list[dict[str, str]]:
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user},
+    ]
+
+
+def _chat_text(resp: Any) -> str | None:
+    content = resp.choices[0].message.content
+    if content and content.strip():
+        return content.strip()
+    return None
+
+
+def _complete(model: str, system: str, user: str) -> str | None:
+    """
+    Responses API -> Chat Completions, skipping endpoints the breaker knows are down.
+    Returns None when neither produced text (caller uses its static fallback).
+    """
+    client = llm_clients.sync_client()
+
+    if llm_breaker.allow(model, RESPONSES):
+        started = time.perf_counter()
+        try:
+            resp = client.responses.create(model=model, instructions=system, input=user)
+        except Exception as exc:
+            _record_call(model, RESPONSES, started, "error")
+            llm_breaker.record_failure(model, RESPONSES, exc)
+            LLM_FALLBACKS.inc(model=model, source=RESPONSES, target=CHAT, reason="error")
+        else:
+            _record_call(model, RESPONSES, started, "ok", getattr(resp, "usage", None))
+            llm_breaker.record_success(model, RESPONSES)
+            text = _response_text(resp)
+            if text:
+                return text
+            LLM_FALLBACKS.inc(model=model, source=RESPONSES, target=CHAT, reason="empty")
+    else:
+        LLM_FALLBACKS.inc(model=model, source=RESPONSES, target=CHAT, reason="breaker_open")
+
+    if llm_breaker.allow(model, CHAT):
+        started = time.perf_counter()
+        try:
+            resp = client.chat.completions.create(model=model, messages=_chat_messages(system, user))
+        except Exception as exc:
+            _record_call(model, CHAT, started, "error")
+            llm_breaker.record_failure(model, CHAT, exc)
+            LLM_FALLBACKS.inc(model=model, source=CHAT, target="static", reason="error")
+        else:
+            _record_call(model, CHAT, started, "ok", getattr(resp, "usage", None))
+            llm_breaker.record_success(model, CHAT)
+            text = _chat_text(resp)
+            if text:
+                return text
+            LLM_FALLBACKS.inc(model=model, source=CHAT, target="static", reason="empty")
+    else:
+        LLM_FALLBACKS.inc(model=model, source=CHAT, target="static", reason="breaker_open")
+
+    return None
+
+
+async def _complete_async(model: str, system: str, user: str) -> str | None:
+    """Async twin of _complete()."""
+    client = llm_clients.async_client()
+
+    if llm_breaker.allow(model, RESPONSES):
+        started = time.perf_counter()
+        try:
+            resp = await client.responses.create(model=model, instructions=system, input=user)
+        except Exception as exc:
+            _record_call(model, RESPONSES, started, "error")
+            llm_breaker.record_failure(model, RESPONSES, exc)
+            LLM_FALLBACKS.inc(model=model, source=RESPONSES, target=CHAT, reason="error")
+        else:
+            _record_call(model, RESPONSES, started, "ok", getattr(resp, "usage", None))
+            llm_breaker.record_success(model, RESPONSES)
+            text = _response_text(resp)
+            if text:
+                return text
+            LLM_FALLBACKS.inc(model=model, source=RESPONSES, target=CHAT, reason="empty")
+    else:
+        LLM_FALLBACKS.inc(model=model, source=RESPONSES, target=CHAT, reason="breaker_open")
+
+    if llm_breaker.allow(model, CHAT):
+        started = time.perf_counter()
+        try:
+            resp = await client.chat.completions.create(model=model, messages=_chat_messages(system, user))
+        except Exception as exc:
+            _record_call(model, CHAT, started, "error")
+            llm_breaker.record_failure(model, CHAT, exc)
+            LLM_FALLBACKS.inc(model=model, source=CHAT, target="static", reason="error")
+        else:
+            _record_call(model, CHAT, started, "ok", getattr(resp, "usage", None))
+            llm_breaker.record_success(model, CHAT)
+            text = _chat_text(resp)
+            if text:
+                return text
+            LLM_FALLBACKS.inc(model=model, source=CHAT, target="static", reason="empty")
+    else:
+        LLM_FALLBACKS.inc(model=model, source=CHAT, target="static", reason="breaker_open")
+
+    return None
+
 
 def _fallback(mode: str, question: str, locale: str) -> str:
     if (locale or "de").strip().lower().startswith("de"):
@@ -22,16 +369,7 @@ def _fallback(mode: str, question: str, locale: str) -> str:
     )
 
 
-def generate_assistant_reply(mode: str, question: str, user_answer: str, locale: str) -> str:
-    """
-    Generates assistant reply for MPU training.
-    Output contract:
-      - short feedback on user's last answer (clarity/responsibility/specificity/consistency)
-      - then asks the provided `question` as the next question
-    """
-    if not getattr(settings, "openai_api_key", None):
-        return _fallback(mode=mode, question=question, locale=locale)
-
+def _assistant_prompts(mode: str, question: str, user_answer: str, locale: str, context: str = "") -> tuple[str, str]:
     loc = (locale or "de").strip().lower()
     is_de = loc.startswith("de")
 
@@ -39,87 +377,180 @@ def generate_assistant_reply(mode: str, question: str, user_answer: str, locale:
         system = (
             "Du bist ein strenger MPU-Interviewtrainer. "
             "Deine Aufgabe: kurze, konkrete Rückmeldung geben und dann die nächste Frage stellen. "
-            "Keine langen Erklärungen, keine Floskeln. Keine erfundenen Fakten.\n"
+            "Keine langen Erklärungen, keine Floskeln. Keine erfundenen Fakten. "
+            "Weise auf Widersprüche zu früheren Antworten hin.\n"
             "Format:\n"
             "Feedback: 2-4 Sätze (Klarheit, Verantwortung, Konkretheit, evtl. Widerspruch).\n"
             "Nächste Frage: <genau eine Frage>\n"
         )
         user = (
             f"Modus: {mode}\n"
-            f"Letzte Antwort des Nutzers:\n{user_answer}\n\n"
+            + (f"Bisheriger Verlauf:\n{context}\n\n" if context else "")
+            + f"Letzte Antwort des Nutzers:\n{user_answer}\n\n"
             f"Bitte stelle als nächste Frage exakt diese:\n{question}\n"
         )
     else:
         system = (
             "You are a strict MPU interview trainer. "
             "Your job: give short, concrete feedback, then ask the next question. "
-            "No long explanations, no fluff. Do not invent facts.\n"
+            "No long explanations, no fluff. Do not invent facts. "
+            "Point out contradictions with earlier answers.\n"
             "Format:\n"
             "Feedback: 2-4 sentences (clarity, responsibility, specificity, contradictions if any).\n"
             "Next question: <exactly one question>\n"
         )
         user = (
             f"Mode: {mode}\n"
-            f"User's last answer:\n{user_answer}\n\n"
+            + (f"Conversation so far:\n{context}\n\n" if context else "")
+            + f"User's last answer:\n{user_answer}\n\n"
             f"Ask exactly this as the next question:\n{question}\n"
         )
+    return system, user
 
-    model = getattr(settings, "openai_model", None) or DEFAULT_MODEL
 
-    # 1) Try Responses API (new)
+def _response_text(resp: Any) -> str | None:
+    """Extracts text from a Responses API result (output_text or structured output)."""
+    text = getattr(resp, "output_text", None)
+    if text and str(text).strip():
+        return str(text).strip()
+
+    # fallback: try to extract from structured output
     try:
-        from openai import OpenAI  # type: ignore
+        out: list[str] = []
+        for item in getattr(resp, "output", []) or []:
+            if getattr(item, "type", None) == "message":
+                for c in getattr(item, "content", []) or []:
+                    if getattr(c, "type", None) in ("output_text", "text"):
+                        out.append(getattr(c, "text", "") or "")
+        joined = "\n".join([t for t in out if t]).strip()
+        if joined:
+            return joined
+    except Exception:
+        pass
+    return None
 
-        client = OpenAI(api_key=settings.openai_api_key)
 
-        resp = client.responses.create(
-            model=model,
-            instructions=system,
-            input=user,
-        )
+def generate_assistant_reply(mode: str, question: str, user_answer: str, locale: str, context: str = "") -> str:
+    """
+    Generates assistant reply for MPU training.
+    Output contract:
+      - short feedback on user's last answer (clarity/responsibility/specificity/consistency)
+      - then asks the provided `question` as the next question
+    `context` is the packed session context (app.services.context_builder), rendered.
+    """
+    if not getattr(settings, "openai_api_key", None):
+        return _fallback(mode=mode, question=question, locale=locale)
 
-        text = getattr(resp, "output_text", None)
-        if text and str(text).strip():
-            return str(text).strip()
+    system, user = _assistant_prompts(mode, question, user_answer, locale, context)
+    model = getattr(settings, "openai_model", None) or DEFAULT_MODEL
 
-        # fallback: try to extract from structured output
-        try:
-            out: list[str] = []
-            for item in getattr(resp, "output", []) or []:
-                if getattr(item, "type", None) == "message":
-                    for c in getattr(item, "content", []) or []:
-                        if getattr(c, "type", None) in ("output_text", "text"):
-                            out.append(getattr(c, "text", "") or "")
-            joined = "\n".join([t for t in out if t]).strip()
-            if joined:
-                return joined
-        except Exception:
-            pass
+    # Responses API (new) -> Chat Completions (older envs) -> static fallback
+    return _complete(model, system, user) or _fallback(mode=mode, question=question, locale=locale)
 
+
+async def generate_assistant_reply_async(
+    mode: str, question: str, user_answer: str, locale: str, context: str = ""
+) -> str:
+    """
+    Non-blocking variant of generate_assistant_reply() on AsyncOpenAI.
+    Same prompts, same Responses -> Chat Completions -> static fallback chain.
+    """
+    if not getattr(settings, "openai_api_key", None):
         return _fallback(mode=mode, question=question, locale=locale)
 
-    except Exception:
-        pass
+    system, user = _assistant_prompts(mode, question, user_answer, locale, context)
+    model = getattr(settings, "openai_model", None) or DEFAULT_MODEL
 
-    # 2) Fallback to Chat Completions (older envs)
-    try:
-        from openai import OpenAI  # type: ignore
-
-        client = OpenAI(api_key=settings.openai_api_key)
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": user},
-            ],
-        )
-        content = resp.choices[0].message.content
-        if content and content.strip():
-            return content.strip()
-    except Exception:
-        pass
+    return await _complete_async(model, system, user) or _fallback(mode=mode, question=question, locale=locale)
 
-    return _fallback(mode=mode, question=question, locale=locale)
+
+async def stream_assistant_reply(
+    mode: str, question: str, user_answer: str, locale: str, context: str = ""
+) -> AsyncIterator[str]:
+    """
+    Streams the assistant reply as text deltas (Responses API, then Chat Completions).
+    Yields the static fallback as a single chunk if nothing could be streamed.
+    A provider error after the first delta ends the stream with what was produced so far.
+    """
+    if not getattr(settings, "openai_api_key", None):
+        yield _fallback(mode=mode, question=question, locale=locale)
+        return
+
+    system, user = _assistant_prompts(mode, question, user_answer, locale, context)
+    model = getattr(settings, "openai_model", None) or DEFAULT_MODEL
+    client = llm_clients.async_client()
+    emitted = False
+
+    if llm_breaker.allow(model, RESPONSES):
+        started = time.perf_counter()
+        usage = None
+        try:
+            stream = await client.responses.create(
+                model=model,
+                instructions=system,
+                input=user,
+                stream=True,
+            )
+            # `async with` releases the pooled connection even if the consumer stops early
+            async with stream:
+                async for event in stream:
+                    event_type = getattr(event, "type", None)
+                    if event_type == "response.output_text.delta":
+                        delta = getattr(event, "delta", "") or ""
+                        if delta:
+                            emitted = True
+                            yield delta
+                    elif event_type == "response.completed":
+                        usage = getattr(getattr(event, "response", None), "usage", None)
+        except Exception as exc:
+            _record_call(model, RESPONSES, started, "error")
+            if not emitted:
+                llm_breaker.record_failure(model, RESPONSES, exc)
+                LLM_FALLBACKS.inc(model=model, source=RESPONSES, target=CHAT, reason="error")
+        else:
+            _record_call(model, RESPONSES, started, "ok", usage)
+            llm_breaker.record_success(model, RESPONSES)
+            if not emitted:
+                LLM_FALLBACKS.inc(model=model, source=RESPONSES, target=CHAT, reason="empty")
+    else:
+        LLM_FALLBACKS.inc(model=model, source=RESPONSES, target=CHAT, reason="breaker_open")
+
+    if emitted:
+        return
+
+    reason = "breaker_open"
+    if llm_breaker.allow(model, CHAT):
+        reason = "empty"
+        started = time.perf_counter()
+        usage = None
+        try:
+            stream = await client.chat.completions.create(
+                model=model,
+                messages=_chat_messages(system, user),
+                stream=True,
+                # the last chunk then carries token usage (and no choices)
+                stream_options={"include_usage": True},
+            )
+            async with stream:
+                async for chunk in stream:
+                    usage = getattr(chunk, "usage", None) or usage
+                    choices = getattr(chunk, "choices", None) or []
+                    delta = (getattr(choices[0].delta, "content", None) or "") if choices else ""
+                    if delta:
+                        emitted = True
+                        yield delta
+        except Exception as exc:
+            _record_call(model, CHAT, started, "error")
+            if not emitted:
+                reason = "error"
+                llm_breaker.record_failure(model, CHAT, exc)
+        else:
+            _record_call(model, CHAT, started, "ok", usage)
+            llm_breaker.record_success(model, CHAT)
+
+    if not emitted:
+        LLM_FALLBACKS.inc(model=model, source=CHAT, target="static", reason=reason)
+        yield _fallback(mode=mode, question=question, locale=locale)
 
 
 def _therapy_fallback(locale: str, focus: list[str]) -> str:
@@ -146,16 +577,7 @@ def _therapy_fallback(locale: str, focus: list[str]) -> str:
     )
 
 
-def generate_therapy_reply(
-    *,
-    locale: str,
-    diagnostic_context: dict[str, Any],
-    history: list[dict[str, str]],
-    user_message: str,
-) -> str:
-    if not getattr(settings, "openai_api_key", None):
-        return _therapy_fallback(locale=locale, focus=diagnostic_context.get("focus", []))
-
+def _therapy_prompts(locale: str, user_message: str, context: str) -> tuple[str, str]:
     loc = (locale or "ru").strip().lower()
     is_ru = loc.startswith("ru")
 
@@ -190,44 +612,43 @@ def generate_therapy_reply(
             "Format: validation, concise analysis, concrete 2-4 step exercise, one precise follow-up question."
         )
 
-    snippets: list[str] = []
-    for msg in history[-8:]:
-        role = "Клиент" if msg.get("role") == "user" else "Эксперт"
-        snippets.append(f"{role}: {msg.get('content', '').strip()}")
+    user_input = (context + "\n\n" if context else "") + f"Текущее сообщение клиента:\n{user_message.strip()}"
+    return system, user_input
 
-    user_input = (
-        f"Контекст диагностики: {diagnostic_context}\n\n"
-        f"Недавняя история диалога:\n" + "\n".join(snippets) + "\n\n"
-        f"Текущее сообщение клиента:\n{user_message.strip()}"
-    )
 
+def generate_therapy_reply(
+    *,
+    locale: str,
+    diagnostic_context: Mapping[str, Any],
+    user_message: str,
+    context: str = "",
+) -> str:
+    """`context`: diagnostic facts and recent history, packed by app.services.context_builder."""
+    if not getattr(settings, "openai_api_key", None):
+        return _therapy_fallback(locale=locale, focus=diagnostic_context.get("focus", []))
+
+    system, user_input = _therapy_prompts(locale, user_message, context)
     model = getattr(settings, "openai_model", None) or DEFAULT_MODEL
-    client = OpenAI(api_key=settings.openai_api_key)
 
-    try:
-        resp = client.responses.create(
-            model=model,
-            instructions=system,
-            input=user_input,
-        )
-        text = getattr(resp, "output_text", None)
-        if text and str(text).strip():
-            return str(text).strip()
-    except Exception:
-        pass
+    return _complete(model, system, user_input) or _therapy_fallback(
+        locale=locale, focus=diagnostic_context.get("focus", [])
+    )
 
-    try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": user_input},
-            ],
-        )
-        content = resp.choices[0].message.content
-        if content and content.strip():
-            return content.strip()
-    except Exception:
-        pass
 
-    return _therapy_fallback(locale=locale, focus=diagnostic_context.get("focus", []))
+async def generate_therapy_reply_async(
+    *,
+    locale: str,
+    diagnostic_context: Mapping[str, Any],
+    user_message: str,
+    context: str = "",
+) -> str:
+    """Non-blocking variant of generate_therapy_reply() on AsyncOpenAI."""
+    if not getattr(settings, "openai_api_key", None):
+        return _therapy_fallback(locale=locale, focus=diagnostic_context.get("focus", []))
+
+    system, user_input = _therapy_prompts(locale, user_message, context)
+    model = getattr(settings, "openai_model", None) or DEFAULT_MODEL
+
+    return await _complete_async(model, system, user_input) or _therapy_fallback(
+        locale=locale, focus=diagnostic_context.get("focus", [])
+    )
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import time
 from typing import Any, Dict, Optional
 
 import stripe
 
+from app.utils.metrics import histogram
+
+STRIPE_CALL_SECONDS = histogram("stripe_call_seconds", "Stripe API call latency", ("op", "outcome"))
+
 
 class StripeError(Exception):
     pass
@@ -82,6 +87,8 @@ def create_checkout_session(
             "quantity": 1,
         }
 
+    started = time.perf_counter()
+    outcome = "error"
     try:
         session = stripe.checkout.Session.create(
             mode="payment",
@@ -94,8 +101,11 @@ def create_checkout_session(
                 "product_id": product_id,
             },
         )
+        outcome = "ok"
     except Exception as e:
         raise StripeError(f"Failed to create checkout session: {e}") from e
+    finally:
+        STRIPE_CALL_SECONDS.observe(time.perf_counter() - started, op="checkout.session.create", outcome=outcome)
 
     return {"id": session["id"], "url": session.get("url")}
 
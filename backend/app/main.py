@@ -2,15 +2,16 @@ from __future__ import annotations
 
 import time
 import uuid
+from contextlib import asynccontextmanager
 
 import structlog
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
+from fastapi.responses import JSONResponse, Response
 
+from app.db.instrumentation import begin_request_tally
 from app.domain.models import APIError
+from app.http.admission import AdmissionMiddleware, admission
 from app.http.routes_admin import router as admin_router
 from app.http.routes_ai import router as ai_router
 from app.http.routes_auth import router as auth_router
@@ -18,10 +19,42 @@ from app.http.routes_booking import router as booking_router
 from app.http.routes_files import router as files_router
 from app.http.routes_payments import router as payments_router
 from app.http.routes_public import router as public_router
+from app.integrations.llm_openai import llm_clients
+from app.security.passwords import password_hasher
 from app.security.rate_limit import limiter
+from app.services.entitlements import grant_notices
 from app.settings import settings
-
-app = FastAPI(title=settings.app_name)
+from app.utils.log_pipeline import log_pipeline
+from app.utils.metrics import CONTENT_TYPE, counter, histogram, render
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # warm up pooled LLM clients; close their connection pools on shutdown
+    llm_clients.start()
+    # queueing-delay probe for public API admission control
+    admission.start()
+    # grants applied by the payments worker clear this process's empty-balance cache
+    grant_notices.start()
+    # calibrate the password cost on this machine (also starts the hashing pool)
+    rounds = await password_hasher.tune_async()
+    logger.info("password_hasher_ready", rounds=rounds, workers=password_hasher.workers)
+    try:
+        yield
+    finally:
+        await admission.aclose()
+        await grant_notices.aclose()
+        await llm_clients.aclose()
+        await limiter.aclose()
+        password_hasher.shutdown()
+        log_pipeline.stop()
+
+
+app = FastAPI(title=settings.app_name, lifespan=lifespan)
+
+# sheds /api/public/* under overload; added first so CORS headers and the
+# correlation middleware still apply to the 503s it sends
+app.add_middleware(AdmissionMiddleware)
 
 # CORS
 app.add_middleware(
@@ -32,28 +65,69 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.state.limiter = limiter
-app.add_middleware(SlowAPIMiddleware)
-
-structlog.configure(processors=[structlog.processors.JSONRenderer()])
+structlog.configure(processors=[log_pipeline])
 logger = structlog.get_logger()
 
+HTTP_REQUEST_SECONDS = histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template",
+    ("route", "method", "status"),
+)
+HTTP_DB_STATEMENTS = histogram(
+    "http_request_db_statements",
+    "SQL statements executed per request",
+    ("route",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+HTTP_DB_SECONDS = histogram(
+    "http_request_db_seconds",
+    "Total SQL time per request",
+    ("route",),
+)
+HTTP_EXCEPTIONS = counter("http_request_exceptions_total", "Requests that raised", ("route",))
+
+
+def _route_label(request: Request) -> str:
+    # the template ("/api/ai/sessions/{session_id}/messages"), never the raw path,
+    # so ids don't turn into one series each
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
 
 @app.middleware("http")
 async def correlation_middleware(request: Request, call_next):
     correlation_id = request.headers.get("x-correlation-id", str(uuid.uuid4()))
     request.state.correlation_id = correlation_id
     start = time.perf_counter()
-    response = await call_next(request)
-    response.headers["x-correlation-id"] = correlation_id
-    logger.info(
-        "request",
-        correlation_id=correlation_id,
-        path=request.url.path,
-        method=request.method,
-        duration_ms=(time.perf_counter() - start) * 1000,
-    )
-    return response
+    sql = begin_request_tally()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        response.headers["x-correlation-id"] = correlation_id
+        return response
+    except Exception:
+        HTTP_EXCEPTIONS.inc(route=_route_label(request))
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        route = _route_label(request)
+        HTTP_REQUEST_SECONDS.observe(elapsed, route=route, method=request.method, status=str(status_code))
+        HTTP_DB_STATEMENTS.observe(sql.statements, route=route)
+        HTTP_DB_SECONDS.observe(sql.seconds, route=route)
+        duration_ms = elapsed * 1000
+        # only a deque append here; rendering and stdout writes happen on the log writer thread
+        if log_pipeline.should_log_request(status_code, duration_ms):
+            log_pipeline.submit(
+                {
+                    "event": "request",
+                    "correlation_id": correlation_id,
+                    "path": request.url.path,
+                    "method": request.method,
+                    "status": status_code,
+                    "duration_ms": round(duration_ms, 2),
+                }
+            )
 
 
 @app.exception_handler(APIError)
@@ -61,14 +135,7 @@ async def api_error_handler(_request: Request, exc: APIError):
     return JSONResponse(
         status_code=exc.status_code,
         content={"error": {"code": exc.code, "message": exc.message, "details": exc.details}},
-    )
-
-
-@app.exception_handler(RateLimitExceeded)
-async def rl_handler(_request: Request, _exc: RateLimitExceeded):
-    return JSONResponse(
-        status_code=429,
-        content={"error": {"code": "RATE_LIMIT", "message": "Too many requests", "details": {}}},
+        headers=exc.headers,
     )
 
 
@@ -77,6 +144,13 @@ def health():
     return {"data": {"status": "ok"}}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    if settings.metrics_token and request.headers.get("authorization") != f"Bearer {settings.metrics_token}":
+        raise APIError("UNAUTHORIZED", "Missing or invalid metrics token", status_code=401)
+    return Response(render(), media_type=CONTENT_TYPE)
+
+
 app.include_router(public_router)
 app.include_router(auth_router)
 app.include_router(ai_router)
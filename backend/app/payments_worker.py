@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import argparse
+import signal
+import threading
+
+import structlog
+
+from app.db.session import SessionLocal
+from app.services.payment_events import drain_payment_events
+from app.services.public_conversations import purge_stale_conversations
+from app.settings import settings
+
+logger = structlog.get_logger()
+
+
+def _purge_public_conversations() -> None:
+    try:
+        purged = purge_stale_conversations(SessionLocal)
+    except Exception as exc:  # noqa: BLE001
+        logger.error("public_conversation_purge_failed", error=str(exc))
+        return
+    if purged:
+        logger.info("public_conversations_purged", count=purged)
+
+
+def _purge_loop(stop: threading.Event) -> None:
+    # the worker is the one long-running background process, so it also expires public conversations
+    while not stop.is_set():
+        _purge_public_conversations()
+        stop.wait(settings.public_conversation_purge_interval_s)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply payment events stored by the Stripe webhook")
+    parser.add_argument("--concurrency", type=int, default=settings.payment_worker_concurrency)
+    parser.add_argument("--poll-interval", type=float, default=settings.payment_worker_poll_interval_s)
+    parser.add_argument("--once", action="store_true", help="Drain the due events and exit")
+    args = parser.parse_args()
+
+    if not settings.redis_url:
+        # the API processes then keep answering 402 to users cached as out of units until the entry expires
+        logger.warning(
+            "entitlement_grant_notices_disabled",
+            reason="REDIS_URL not set",
+            empty_cache_s=settings.entitlement_empty_cache_s,
+        )
+
+    if args.once:
+        handled = drain_payment_events(SessionLocal, concurrency=args.concurrency)
+        _purge_public_conversations()
+        print(f"payments_worker drained handled={handled}")
+        return
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    threading.Thread(target=_purge_loop, args=(stop,), name="public-conversation-purge", daemon=True).start()
+
+    handled = drain_payment_events(
+        SessionLocal,
+        concurrency=args.concurrency,
+        stop=stop,
+        poll_interval_s=args.poll_interval,
+    )
+    print(f"payments_worker stopped handled={handled}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from app.db.session import SessionLocal
+from app.services.rescoring import RescoreStats, rescore_messages
+from app.services.scoring import RUBRIC_VERSION
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-score historical user answers with the current rubric")
+    parser.add_argument("--version", default=RUBRIC_VERSION, help="Scoring version tag (default: current rubric)")
+    parser.add_argument("--batch-size", type=int, default=2000, help="Messages per keyset page / INSERT")
+    parser.add_argument("--workers", type=int, default=None, help="Scoring processes (default: CPU count, 0 = inline)")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many messages")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the beginning")
+    parser.add_argument("--report-every", type=float, default=5.0, help="Seconds between progress lines")
+    args = parser.parse_args()
+
+    last_report = 0.0
+
+    def report(stats: RescoreStats) -> None:
+        nonlocal last_report
+        now = time.monotonic()
+        if now - last_report >= args.report_every:
+            last_report = now
+            print(
+                f"rescore version={args.version} processed={stats.processed} total={stats.total_processed} "
+                f"written={stats.written} rate={stats.rate:.0f}/s elapsed={stats.elapsed_s:.0f}s",
+                flush=True,
+            )
+
+    stats = rescore_messages(
+        SessionLocal,
+        version=args.version,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        limit=args.limit,
+        restart=args.restart,
+        progress=report,
+    )
+    print(
+        "rescore completed "
+        f"version={args.version} processed={stats.processed} total={stats.total_processed} "
+        f"written={stats.written} rate={stats.rate:.0f}/s elapsed={stats.elapsed_s:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,45 @@
-from datetime import datetime, timedelta
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone
 
 import jwt
-from passlib.context import CryptContext
 
+from app.security.passwords import password_hasher
 from app.settings import settings
 
-pwd_context = CryptContext(
-    schemes=["pbkdf2_sha256"],
-    deprecated="auto",
-)
-
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
 
 
 def verify_password(password: str, hashed: str) -> bool:
-    return pwd_context.verify(password, hashed)
+    return password_hasher.verify(password, hashed)[0]
+
+
+def verify_and_update_password(password: str, hashed: str) -> tuple[bool, str | None]:
+    """(valid, new hash or None): the new hash is set when the stored one is below the current cost."""
+    return password_hasher.verify(password, hashed)
+
+
+async def hash_password_async(password: str) -> str:
+    return await password_hasher.hash_async(password)
+
 
+async def verify_and_update_password_async(password: str, hashed: str) -> tuple[bool, str | None]:
+    """Async twin of verify_and_update_password(): the request holds no thread while pbkdf2 runs."""
+    return await password_hasher.verify_async(password, hashed)
 
-def create_access_token(user_id: str, role: str) -> str:
+
+def create_access_token(user_id: str, role: str, *, status: str = "active", token_version: int = 0) -> str:
+    """
+    Short-lived access token. role/status/token version travel as claims so that
+    app.deps.get_principal can authenticate without loading the user.
+    """
     payload = {
         "sub": user_id,
         "role": role,
+        "st": status,
+        "tv": token_version,
         "exp": datetime.utcnow() + timedelta(minutes=settings.jwt_exp_minutes),
     }
     return jwt.encode(payload, settings.jwt_secret, algorithm="HS256")
@@ -30,3 +47,15 @@ def create_access_token(user_id: str, role: str) -> str:
 
 def decode_access_token(token: str) -> dict:
     return jwt.decode(token, settings.jwt_secret, algorithms=["HS256"])
+
+
+def hash_refresh_token(token: str) -> str:
+    # refresh tokens are random, so a plain digest is enough (no salt/stretching needed)
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def new_refresh_token() -> tuple[str, str, datetime]:
+    """Returns (token for the client, hash to store, expiry)."""
+    token = secrets.token_urlsafe(32)
+    expires_at = datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_exp_days)
+    return token, hash_refresh_token(token), expires_at
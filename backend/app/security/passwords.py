@@ -0,0 +1,217 @@
+"""
+Password hashing off the request threads.
+
+pbkdf2 is deliberately slow, so hashing runs in a small dedicated process pool
+instead of the threadpool that serves every sync route. The auth routes await
+the result on the event loop (hash_async/verify_async), so a pending hash holds
+no request thread; when more than PASSWORD_HASH_MAX_PENDING hashes are already
+queued the call fails fast with 503. hash()/verify() block the calling thread
+and are meant for scripts.
+
+The cost (pbkdf2 rounds) is calibrated at startup against PASSWORD_HASH_TARGET_MS
+and never drops below PASSWORD_HASH_MIN_ROUNDS. A hash is upgraded on the next
+successful login when its rounds are below that floor or more than 20% below the
+calibrated cost; replicas calibrate independently, so a tighter rule would have
+them rehash each other's hashes on every login.
+
+Workers are started with forkserver: the pool is created lazily, after the app
+has started its background threads, and a forked child can deadlock on a lock
+one of those threads held at fork time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import secrets
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+
+import anyio
+from passlib.hash import pbkdf2_sha256
+
+from app.domain.models import APIError
+from app.settings import settings
+from app.utils.metrics import gauge, histogram
+
+# Stored instead of a hash for accounts nobody signs into with a password (guest
+# checkout). Never a valid pbkdf2 string, so verification fails without hashing.
+UNUSABLE_PASSWORD_PREFIX = "!"
+
+_CALIBRATION_ROUNDS = 20_000
+_MAX_ROUNDS = 5_000_000
+# stored rounds this far below the calibrated cost trigger an upgrade
+_REHASH_MARGIN = 0.2
+_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+PASSWORD_HASH_SECONDS = histogram(
+    "password_hash_seconds",
+    "Password hash/verify latency including queue wait",
+    ("op",),
+)
+PASSWORD_HASH_QUEUE = gauge("password_hash_queue_depth", "Password hashes waiting for a free worker")
+
+
+def unusable_password() -> str:
+    return UNUSABLE_PASSWORD_PREFIX + secrets.token_urlsafe(16)
+
+
+def is_usable_password(hashed: str | None) -> bool:
+    return bool(hashed) and not hashed.startswith(UNUSABLE_PASSWORD_PREFIX)
+
+
+# --- worker side (module-level so the process pool can pickle them) ---
+def _hash(password: str, rounds: int) -> str:
+    return pbkdf2_sha256.using(rounds=rounds).hash(password)
+
+
+def _verify(password: str, hashed: str, rounds: int, rehash_below: int) -> tuple[bool, str | None]:
+    """(valid, upgraded hash or None); the upgrade is computed in the same round trip."""
+    try:
+        if not pbkdf2_sha256.verify(password, hashed):
+            return False, None
+    except (ValueError, TypeError):
+        return False, None
+    if pbkdf2_sha256.from_string(hashed).rounds < rehash_below:
+        return True, _hash(password, rounds)
+    return True, None
+
+
+def _time_hash(rounds: int) -> float:
+    started = time.perf_counter()
+    _hash("calibration-password", rounds)
+    return time.perf_counter() - started
+
+
+class _InlineExecutor:
+    """workers=0: run in the calling thread (tests, one-off scripts)."""
+
+    def submit(self, fn, *args) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args))
+        except BaseException as exc:  # noqa: BLE001
+            future.set_exception(exc)
+        return future
+
+    def shutdown(self, wait: bool = True) -> None:
+        pass
+
+
+class PasswordHasher:
+    def __init__(self, workers: int | None = None, max_pending: int | None = None):
+        self._workers = workers
+        self._max_pending = max_pending
+        self._pool: Executor | _InlineExecutor | None = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.rounds = settings.password_hash_min_rounds
+
+    @property
+    def workers(self) -> int:
+        return settings.password_hash_workers if self._workers is None else self._workers
+
+    def queue_depth(self) -> float:
+        return float(max(0, self._pending - self.workers))
+
+    def _executor(self) -> Executor | _InlineExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    if self.workers > 0:
+                        self._pool = ProcessPoolExecutor(
+                            max_workers=self.workers,
+                            mp_context=multiprocessing.get_context(_START_METHOD),
+                        )
+                    else:
+                        self._pool = _InlineExecutor()
+        return self._pool
+
+    def _rehash_below(self) -> int:
+        floor = max(settings.password_hash_min_rounds, int(self.rounds * (1 - _REHASH_MARGIN)))
+        return min(floor, self.rounds)  # never demand more than an upgrade would produce
+
+    def _reserve(self) -> None:
+        max_pending = settings.password_hash_max_pending if self._max_pending is None else self._max_pending
+        with self._lock:
+            if self._pending >= max_pending:
+                raise APIError(
+                    "AUTH_BUSY",
+                    "Too many sign-in attempts in progress, retry shortly",
+                    status_code=503,
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+
+    def _finish(self, op: str, started: float) -> None:
+        with self._lock:
+            self._pending -= 1
+        PASSWORD_HASH_SECONDS.observe(time.perf_counter() - started, op=op)
+
+    async def _await(self, fn, *args):
+        """Runs fn in the pool without holding a thread while it works."""
+        executor = self._executor()
+        if isinstance(executor, _InlineExecutor):
+            # workers=0 computes in place; keep that off the event loop
+            return await anyio.to_thread.run_sync(fn, *args)
+        return await asyncio.wrap_future(executor.submit(fn, *args))
+
+    def _run(self, op: str, fn, *args):
+        self._reserve()
+        started = time.perf_counter()
+        try:
+            return self._executor().submit(fn, *args).result()
+        finally:
+            self._finish(op, started)
+
+    async def _run_async(self, op: str, fn, *args):
+        self._reserve()
+        started = time.perf_counter()
+        try:
+            return await self._await(fn, *args)
+        finally:
+            self._finish(op, started)
+
+    def hash(self, password: str) -> str:
+        return self._run("hash", _hash, password, self.rounds)
+
+    def verify(self, password: str, hashed: str | None) -> tuple[bool, str | None]:
+        """(valid, new hash to store or None)."""
+        if not is_usable_password(hashed):
+            return False, None
+        return self._run("verify", _verify, password, hashed, self.rounds, self._rehash_below())
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run_async("hash", _hash, password, self.rounds)
+
+    async def verify_async(self, password: str, hashed: str | None) -> tuple[bool, str | None]:
+        """Async twin of verify()."""
+        if not is_usable_password(hashed):
+            return False, None
+        return await self._run_async("verify", _verify, password, hashed, self.rounds, self._rehash_below())
+
+    def _set_rounds(self, elapsed: float, target_ms: float | None) -> int:
+        target_s = (settings.password_hash_target_ms if target_ms is None else target_ms) / 1000.0
+        rounds = int(_CALIBRATION_ROUNDS * target_s / max(elapsed, 1e-6)) // 1000 * 1000
+        self.rounds = min(max(rounds, settings.password_hash_min_rounds), _MAX_ROUNDS)
+        return self.rounds
+
+    def tune(self, target_ms: float | None = None) -> int:
+        """Sets rounds so one hash takes about target_ms on this machine; returns them."""
+        return self._set_rounds(self._executor().submit(_time_hash, _CALIBRATION_ROUNDS).result(), target_ms)
+
+    async def tune_async(self, target_ms: float | None = None) -> int:
+        """tune() awaited on the event loop (startup); no thread waits for the measurement."""
+        return self._set_rounds(await self._await(_time_hash, _CALIBRATION_ROUNDS), target_ms)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+
+password_hasher = PasswordHasher()
+# bound to the process-wide hasher only: other instances (tests, benchmarks) stay off /metrics
+PASSWORD_HASH_QUEUE.set_function(password_hasher.queue_depth)
@@ -1,4 +1,241 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+"""
+Request rate limits shared by all workers.
 
-limiter = Limiter(key_func=get_remote_address)
\ No newline at end of file
+Limits use GCRA, the token-bucket equivalent that needs one stored value per key
+(the "theoretical arrival time"): a "5/minute" limit allows a burst of 5 and then
+one request every 12 seconds. With REDIS_URL set, the state lives in Redis and is
+updated by one Lua script per request, so every uvicorn worker and replica
+enforces the same budget. Without Redis, or while Redis is unreachable, each
+process enforces the limit on its own.
+
+Routes opt in with a dependency:
+
+    @router.post("/login", dependencies=[Depends(limiter.limit("auth.login", settings.rate_limit_auth))])
+
+RATE_LIMITS (JSON, e.g. {"auth.login": "10/minute"}) overrides limits per route
+name. Requests carrying a valid access token are keyed by user id, others by
+client address.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Protocol
+
+import jwt
+import structlog
+from fastapi import Request
+
+from app.domain.models import APIError
+from app.security.auth import decode_access_token
+from app.settings import settings
+from app.utils.metrics import counter
+
+logger = structlog.get_logger()
+
+RATE_LIMIT_DECISIONS = counter("rate_limit_decisions_total", "Rate limit checks", ("route", "outcome"))
+RATE_LIMIT_BACKEND_ERRORS = counter("rate_limit_backend_errors_total", "Shared limiter backend failures", ("backend",))
+
+_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_LIMIT_RE = re.compile(r"^\s*(\d+)\s*(?:/|per)\s*(\d+)?\s*(second|minute|hour|day)s?\s*$")
+
+# after a Redis failure, stay on the local backend for this long before retrying
+_REDIS_RETRY_S = 5.0
+
+
+@dataclass(frozen=True)
+class Rate:
+    limit: int
+    window_s: float
+
+    @property
+    def interval_s(self) -> float:
+        return self.window_s / self.limit
+
+
+def parse_rate(value: str) -> Rate:
+    """Parses "5/minute", "100 per hour" or "10/30 seconds"."""
+    m = _LIMIT_RE.match(value.lower())
+    if not m or int(m.group(1)) <= 0:
+        raise ValueError(f"Invalid rate limit: {value!r}")
+    return Rate(limit=int(m.group(1)), window_s=float(int(m.group(2) or 1) * _UNITS[m.group(3)]))
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    remaining: int
+    retry_after_s: float
+
+
+def gcra(tat: float, now: float, rate: Rate) -> tuple[Decision, float]:
+    """One GCRA step: (decision, new theoretical arrival time to store if allowed)."""
+    new_tat = max(tat, now) + rate.interval_s
+    delay = new_tat - now - rate.window_s
+    if delay > 0:
+        return Decision(False, 0, delay), tat
+    return Decision(True, int((rate.window_s - (new_tat - now)) / rate.interval_s), 0.0), new_tat
+
+
+class RateLimitBackend(Protocol):
+    async def hit(self, key: str, rate: Rate) -> Decision: ...
+
+
+class MemoryBackend:
+    """Per-process state; expired keys are swept once the table grows."""
+
+    _SWEEP_AT = 100_000
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._tat: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def hit_sync(self, key: str, rate: Rate) -> Decision:
+        with self._lock:
+            now = self._clock()
+            decision, tat = gcra(self._tat.get(key, 0.0), now, rate)
+            self._tat[key] = tat
+            if len(self._tat) > self._SWEEP_AT:
+                self._tat = {k: t for k, t in self._tat.items() if t > now}
+        return decision
+
+    async def hit(self, key: str, rate: Rate) -> Decision:
+        return self.hit_sync(key, rate)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tat.clear()
+
+
+# KEYS[1] = bucket; ARGV = interval_s, window_s. Uses the Redis clock, so app servers
+# with skewed clocks share one timeline. Floats travel as strings (Lua numbers in
+# replies are truncated to integers).
+GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < now then tat = now end
+local new_tat = tat + interval
+local delay = new_tat - now - window
+if delay > 0 then
+  return {0, '0', tostring(delay)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, tostring(math.floor((window - (new_tat - now)) / interval)), '0'}
+"""
+
+
+class RedisBackend:
+    def __init__(self, client, prefix: str = "rl:"):
+        self._client = client
+        self._prefix = prefix
+        self._script = client.register_script(GCRA_SCRIPT)
+
+    async def hit(self, key: str, rate: Rate) -> Decision:
+        allowed, remaining, retry_after = await self._script(
+            keys=[self._prefix + key], args=[repr(rate.interval_s), repr(rate.window_s)]
+        )
+        return Decision(bool(int(allowed)), int(float(remaining)), float(retry_after))
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+def _redis_from_url(url: str) -> RedisBackend:
+    import redis.asyncio as redis  # deferred: only needed when REDIS_URL is set
+
+    # a limiter that waits on a slow Redis defeats its purpose: fail fast, fall back
+    return RedisBackend(redis.Redis.from_url(url, socket_timeout=0.1, socket_connect_timeout=0.2))
+
+
+def _client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def request_identity(request: Request) -> str:
+    """u:<user id> for requests with a valid access token, ip:<address> otherwise."""
+    auth = request.headers.get("authorization", "")
+    if auth.lower().startswith("bearer "):
+        try:
+            sub = decode_access_token(auth[7:].strip()).get("sub")
+        except jwt.PyJWTError:
+            sub = None
+        if sub:
+            return f"u:{sub}"
+    return f"ip:{_client_ip(request)}"
+
+
+class RateLimiter:
+    def __init__(self, shared: RateLimitBackend | None = None, local: MemoryBackend | None = None):
+        self._shared = shared
+        self._shared_configured = shared is not None
+        self.local = local or MemoryBackend()
+        self._shared_down_until = 0.0
+        self._rates: dict[str, Rate] = {}
+
+    def _shared_backend(self) -> RateLimitBackend | None:
+        if self._shared is None and not self._shared_configured and settings.redis_url:
+            self._shared_configured = True
+            try:
+                self._shared = _redis_from_url(settings.redis_url)
+            except ImportError:
+                logger.warning("rate_limit_redis_unavailable", reason="redis package not installed")
+        return self._shared
+
+    def _rate(self, name: str, default: str) -> Rate:
+        spec = settings.rate_limits.get(name, default)
+        rate = self._rates.get(spec)
+        if rate is None:
+            rate = self._rates[spec] = parse_rate(spec)
+        return rate
+
+    async def hit(self, key: str, rate: Rate) -> Decision:
+        shared = self._shared_backend()
+        if shared is not None and time.monotonic() >= self._shared_down_until:
+            try:
+                return await shared.hit(key, rate)
+            except Exception as exc:  # noqa: BLE001
+                self._shared_down_until = time.monotonic() + _REDIS_RETRY_S
+                RATE_LIMIT_BACKEND_ERRORS.inc(backend=type(shared).__name__)
+                logger.warning("rate_limit_backend_error", error=str(exc))
+        return await self.local.hit(key, rate)
+
+    def limit(
+        self,
+        name: str,
+        default: str,
+        key: Callable[[Request], str] = request_identity,
+    ) -> Callable[[Request], Awaitable[None]]:
+        """FastAPI dependency enforcing `default` (or RATE_LIMITS[name]) per key."""
+
+        async def dependency(request: Request) -> None:
+            rate = self._rate(name, default)
+            decision = await self.hit(f"{name}:{key(request)}", rate)
+            RATE_LIMIT_DECISIONS.inc(route=name, outcome="allowed" if decision.allowed else "limited")
+            if not decision.allowed:
+                raise APIError(
+                    "RATE_LIMIT",
+                    "Too many requests",
+                    status_code=429,
+                    headers={"Retry-After": str(max(1, math.ceil(decision.retry_after_s)))},
+                )
+
+        return dependency
+
+    def reset(self) -> None:
+        self.local.reset()
+        self._shared_down_until = 0.0
+
+    async def aclose(self) -> None:
+        if isinstance(self._shared, RedisBackend):
+            await self._shared.aclose()
+
+
+limiter = RateLimiter()
@@ -0,0 +1,112 @@
+"""
+Per-process view of users' current token versions.
+
+Access tokens carry the user's token_version ("tv"). Blocking a user or changing
+their role bumps users.token_version, which invalidates every token issued before.
+Instead of reading the user on each request, every process keeps the versions of
+users that were ever bumped and re-reads the rows changed since its last poll at
+most every AUTH_VERSION_REFRESH_S seconds. Bumps made by this process apply
+immediately (note()); bumps from other processes within one refresh interval.
+Async callers use current_async(): the poll is a sync query behind a lock, so
+it runs in a worker thread and never on the event loop.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable
+from uuid import UUID
+
+import anyio
+from sqlalchemy import select
+
+from app.db.session import SessionLocal
+from app.domain.models import User
+from app.settings import settings
+
+# rows come back as (user_id, token_version)
+VersionLoader = Callable[[datetime | None], Iterable[tuple[UUID, int]]]
+
+# re-read a margin before the last poll: updated_at is stamped by app servers whose clocks may differ
+_POLL_OVERLAP = timedelta(seconds=60)
+
+
+def _load_from_db(since: datetime | None) -> list[tuple[UUID, int]]:
+    stmt = select(User.id, User.token_version)
+    stmt = stmt.where(User.token_version > 0) if since is None else stmt.where(User.updated_at >= since)
+    db = SessionLocal()
+    try:
+        return [(row[0], row[1]) for row in db.execute(stmt).all()]
+    finally:
+        db.close()
+
+
+class TokenVersionCache:
+    def __init__(self, loader: VersionLoader = _load_from_db, refresh_s: float | None = None):
+        self._loader = loader
+        self._refresh_s = refresh_s
+        self._versions: dict[UUID, int] = {}
+        self._polled_at: datetime | None = None
+        self._next_refresh = 0.0
+        self._lock = threading.Lock()
+
+    def _interval(self) -> float:
+        return settings.auth_version_refresh_s if self._refresh_s is None else self._refresh_s
+
+    def refresh(self) -> None:
+        started = datetime.now(timezone.utc)
+        since = None if self._polled_at is None else self._polled_at - _POLL_OVERLAP
+        rows = self._loader(since)
+        versions = self._versions
+        for user_id, version in rows:
+            if version > versions.get(user_id, 0):
+                versions[user_id] = version
+        self._polled_at = started
+
+    def _maybe_refresh(self) -> None:
+        if time.monotonic() < self._next_refresh:
+            return
+        # one request refreshes, the others keep using the current view
+        if not self._lock.acquire(blocking=self._polled_at is None):
+            return
+        try:
+            if time.monotonic() >= self._next_refresh:
+                try:
+                    self.refresh()
+                except Exception:
+                    # without a first load nothing can be validated; later failures keep the last view
+                    if self._polled_at is None:
+                        raise
+                self._next_refresh = time.monotonic() + self._interval()
+        finally:
+            self._lock.release()
+
+    def current(self, user_id: UUID) -> int:
+        """Lowest token version still accepted for the user."""
+        self._maybe_refresh()
+        return self._versions.get(user_id, 0)
+
+    async def current_async(self, user_id: UUID) -> int:
+        """current() for the event loop: a due refresh (query + lock) runs in a worker thread."""
+        if time.monotonic() >= self._next_refresh:
+            # while another caller refreshes, later ones keep the current view without a thread hop;
+            # before the first load everyone waits for it (in their own thread)
+            if self._polled_at is None or not self._lock.locked():
+                await anyio.to_thread.run_sync(self._maybe_refresh)
+        return self._versions.get(user_id, 0)
+
+    def note(self, user_id: UUID, version: int) -> None:
+        """Record a bump made by this process (call after commit)."""
+        if version > self._versions.get(user_id, 0):
+            self._versions[user_id] = version
+
+    def reset(self) -> None:
+        with self._lock:
+            self._versions.clear()
+            self._polled_at = None
+            self._next_refresh = 0.0
+
+
+token_versions = TokenVersionCache()
@@ -1,11 +1,40 @@
 from __future__ import annotations
 
+import time
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable
+from uuid import UUID
+
+import anyio
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.repo import Repo
-from app.integrations.llm_openai import generate_assistant_reply
-from app.services.question_bank import next_question
-from app.services.scoring import evaluate_user_message
+from app.db.repo import AsyncRepo, Repo
+from app.db.session import AsyncSessionLocal
+from app.domain.models import APIError
+from app.integrations.llm_dispatch import MEMBER, llm_bulkhead
+from app.integrations.llm_openai import (
+    generate_assistant_reply,
+    generate_assistant_reply_async,
+    stream_assistant_reply,
+)
+from app.services import entitlements
+from app.services.context_builder import session_context, session_context_async
+from app.services.question_bank import next_session_question, next_session_question_async
+from app.services.scoring import RUBRIC_VERSION, evaluate_user_message
+from app.utils import metrics
+
+AI_STREAM_TTFT = metrics.histogram(
+    "ai_stream_time_to_first_token_seconds",
+    "Time from accepting a streamed AI message to the first reply token",
+    labelnames=("mode",),
+)
+AI_STREAM_RESULTS = metrics.counter(
+    "ai_stream_results_total",
+    "Streamed AI replies by outcome (completed|aborted)",
+    labelnames=("outcome",),
+)
 
 
 def process_user_message(db: Session, session_id, user_content: str, locale: str, mode: str):
@@ -24,20 +53,24 @@ def process_user_message(db: Session, session_id, user_content: str, locale: str
         # service-level guard; routes should also validate
         raise ValueError("Empty user message")
 
+    mode_norm = (mode or "").strip().lower() or None
+    # earlier turns only: the new answer is passed separately
+    context = session_context(repo, session_id, mode_norm or "practice").render(locale)
     user_msg = repo.add_message(session_id, "user", content)
 
     scoring = evaluate_user_message(content)
 
     # IMPORTANT: mode-aware question selection
-    mode_norm = (mode or "").strip().lower() or None
-    question = next_question(db, locale=locale, mode=mode_norm)
+    question = next_session_question(db, session_id, locale=locale, mode=mode_norm)
 
-    assistant_content = generate_assistant_reply(
-        mode=mode_norm or "practice",
-        question=question,
-        user_answer=content,
-        locale=locale,
-    )
+    with llm_bulkhead.acquire(MEMBER):
+        assistant_content = generate_assistant_reply(
+            mode=mode_norm or "practice",
+            question=question,
+            user_answer=content,
+            locale=locale,
+            context=context,
+        )
     assistant_msg = repo.add_message(session_id, "assistant", assistant_content)
 
     repo.add_evaluation(
@@ -46,5 +79,189 @@ def process_user_message(db: Session, session_id, user_content: str, locale: str
         rubric_scores=scoring.get("rubric_scores", {}),
         summary_feedback=scoring.get("summary_feedback", ""),
         detected_issues=scoring.get("detected_issues", {}),
+        scoring_version=RUBRIC_VERSION,
     )
     return assistant_msg
+
+
+@dataclass
+class PendingTurn:
+    """A user message that is committed and paid for, waiting for the assistant reply."""
+
+    session_id: UUID
+    user_id: UUID
+    user_message_id: UUID
+    entitlement_id: UUID
+    content: str
+    question: str
+    mode: str
+    locale: str
+    context: str = ""  # rendered prompt context of the earlier turns
+    started_at: float = field(default_factory=time.perf_counter)
+    settled: bool = False  # reply committed or turn refunded; set exactly once
+
+
+async def start_turn_async(
+    db: AsyncSession,
+    session_id: UUID,
+    user_id: UUID,
+    user_content: str,
+    locale: str,
+    mode: str,
+) -> PendingTurn:
+    """
+    Phase 1 of a turn: consume credit + write user message + pick question -> COMMIT.
+    Raises NO_CREDITS (402) before anything is written.
+    """
+    repo = AsyncRepo(db)
+
+    content = (user_content or "").strip()
+    if not content:
+        raise ValueError("Empty user message")
+
+    entitlement_id = await entitlements.take_async(repo, user_id, "ai_credits")
+    if not entitlement_id:
+        raise APIError(
+            "NO_CREDITS",
+            "No AI credits left. Please buy an AI package.",
+            {"pricing_url": "/pricing"},
+            status_code=402,
+        )
+
+    mode_norm = (mode or "").strip().lower() or "practice"
+    # read (and fold into the stored summary) before the new message is written
+    context = (await session_context_async(repo, session_id, mode_norm)).render(locale)
+    user_msg = await repo.add_message(session_id, "user", content)
+
+    question = await next_session_question_async(db, session_id, locale=locale, mode=mode_norm)
+    await db.commit()
+
+    return PendingTurn(
+        session_id=session_id,
+        user_id=user_id,
+        user_message_id=user_msg.id,
+        entitlement_id=entitlement_id,
+        content=content,
+        question=question,
+        mode=mode_norm,
+        locale=locale,
+        context=context,
+    )
+
+
+async def finish_turn_async(db: AsyncSession, turn: PendingTurn, assistant_content: str):
+    """Phase 3 of a turn: write assistant message + evaluation -> COMMIT."""
+    repo = AsyncRepo(db)
+    scoring = evaluate_user_message(turn.content)
+
+    assistant_msg = await repo.add_message(turn.session_id, "assistant", assistant_content)
+    await repo.add_evaluation(
+        session_id=turn.session_id,
+        message_id=turn.user_message_id,
+        rubric_scores=scoring.get("rubric_scores", {}),
+        summary_feedback=scoring.get("summary_feedback", ""),
+        detected_issues=scoring.get("detected_issues", {}),
+        scoring_version=RUBRIC_VERSION,
+    )
+    await db.commit()
+    return assistant_msg
+
+
+async def abort_turn_async(db: AsyncSession, turn: PendingTurn) -> None:
+    """Undoes phase 1 when the reply was never delivered: refunds the credit, drops the user message."""
+    repo = AsyncRepo(db)
+    await entitlements.refund_async(repo, turn.entitlement_id, turn.user_id, "ai_credits")
+    await repo.delete_message(turn.user_message_id)
+    await db.commit()
+
+
+async def process_user_message_async(
+    db: AsyncSession,
+    session_id: UUID,
+    user_id: UUID,
+    user_content: str,
+    locale: str,
+    mode: str,
+):
+    """
+    Async pipeline with the same steps as process_user_message(), split into
+    short transactions so no DB connection is held while the LLM is working:
+
+      1) consume credit + write user message + pick question -> COMMIT
+      2) LLM call (no open transaction, connection back in the pool)
+      3) write assistant message + evaluation -> COMMIT
+
+    Unlike the sync variant, this function owns the commits.
+    If step 3 fails the credit stays consumed and the user message stays stored.
+    """
+    turn = await start_turn_async(db, session_id, user_id, user_content, locale, mode)
+
+    assistant_content = await generate_assistant_reply_async(
+        mode=turn.mode,
+        question=turn.question,
+        user_answer=turn.content,
+        locale=turn.locale,
+        context=turn.context,
+    )
+    return await finish_turn_async(db, turn, assistant_content)
+
+
+async def stream_turn_async(
+    turn: PendingTurn,
+    session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+) -> AsyncIterator[tuple[str, Any]]:
+    """
+    Streams the reply for a started turn.
+
+    Yields ("delta", str) per text chunk and finally ("done", AIMessage) once the
+    assistant message and evaluation are committed. Uses its own DB session,
+    because the request-scoped one may already be closed while the response streams.
+
+    If the stream does not complete (client disconnect, cancellation, error)
+    the turn is aborted and the credit is refunded. A stream that is never
+    iterated is refunded by settle_turn_async(), which the route also calls
+    when the response ends.
+    """
+    chunks: list[str] = []
+    try:
+        replies = stream_assistant_reply(
+            mode=turn.mode,
+            question=turn.question,
+            user_answer=turn.content,
+            locale=turn.locale,
+            context=turn.context,
+        )
+        # closed on exit, so the provider stream is released at once and not at GC
+        async with aclosing(replies):
+            async for delta in replies:
+                if not chunks:
+                    AI_STREAM_TTFT.observe(time.perf_counter() - turn.started_at, mode=turn.mode)
+                chunks.append(delta)
+                yield ("delta", delta)
+
+        assistant_content = "".join(chunks).strip()
+        # shielded, and settled right after the commit: a disconnect while the reply is being
+        # committed (or the session closed) must not refund a turn that was answered
+        with anyio.CancelScope(shield=True):
+            async with session_factory() as db:
+                assistant_msg = await finish_turn_async(db, turn, assistant_content)
+                turn.settled = True
+        AI_STREAM_RESULTS.inc(outcome="completed")
+        yield ("done", assistant_msg)
+    finally:
+        await settle_turn_async(turn, session_factory)
+
+
+async def settle_turn_async(
+    turn: PendingTurn,
+    session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+) -> None:
+    """Refunds a streamed turn whose reply was never committed; a no-op once the turn is settled."""
+    if turn.settled:
+        return
+    turn.settled = True  # before the first await: a concurrent caller sees it
+    AI_STREAM_RESULTS.inc(outcome="aborted")
+    # shielded: cancellation must not skip the refund
+    with anyio.CancelScope(shield=True):
+        async with session_factory() as db:
+            await abort_turn_async(db, turn)
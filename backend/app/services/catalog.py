@@ -0,0 +1,146 @@
+"""
+In-process product catalog.
+
+Products change only through /api/admin/products, app.seed and migrations, yet
+every checkout and pricing page looked them up in Postgres. Each process keeps an
+immutable snapshot (lookups by id and by code, the serialized /products payload
+and its ETag) tagged with catalog_state.version. At most every
+CATALOG_VERSION_CHECK_S the version row is read (one primary-key lookup); the
+snapshot is rebuilt only when it moved. Admin changes in this process apply
+immediately.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.domain.models import CatalogState, Product
+from app.settings import settings
+from app.utils.etag import etag_for, json_bytes
+
+# browsers and a CDN may reuse /products for a minute, then revalidate with the ETag
+PRODUCTS_CACHE_CONTROL = "public, max-age=60"
+
+
+@dataclass(frozen=True)
+class ProductView:
+    """Detached, read-only copy of a Product row."""
+
+    id: UUID
+    code: str
+    type: str
+    name_de: str
+    name_en: str
+    price_cents: int
+    currency: str
+    stripe_price_id: str | None
+    metadata_json: dict[str, Any]
+    active: bool
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int
+    by_id: dict[UUID, ProductView] = field(default_factory=dict)
+    by_code: dict[str, ProductView] = field(default_factory=dict)  # active products only
+    active: tuple[ProductView, ...] = ()
+    products_payload: bytes = b""
+    products_etag: str = ""
+
+
+def _view(p: Product) -> ProductView:
+    return ProductView(
+        id=p.id,
+        code=p.code,
+        type=p.type,
+        name_de=p.name_de,
+        name_en=p.name_en,
+        price_cents=p.price_cents,
+        currency=p.currency,
+        stripe_price_id=p.stripe_price_id,
+        metadata_json=dict(p.metadata_json or {}),
+        active=bool(p.active),
+    )
+
+
+def _build(db: Session, version: int) -> CatalogSnapshot:
+    views = [_view(p) for p in db.scalars(select(Product).order_by(Product.code)).all()]
+    active = tuple(v for v in views if v.active)
+    payload = json_bytes(
+        {
+            "data": [
+                {"id": str(p.id), "code": p.code, "price_cents": p.price_cents, "currency": p.currency, "type": p.type}
+                for p in active
+            ]
+        }
+    )
+    return CatalogSnapshot(
+        version=version,
+        by_id={v.id: v for v in views},
+        by_code={v.code: v for v in active},
+        active=active,
+        products_payload=payload,
+        products_etag=etag_for(payload),
+    )
+
+
+def _read_version(db: Session) -> int:
+    # no row (fresh database before migration 0009): every check rebuilds
+    version = db.scalar(select(CatalogState.version).where(CatalogState.id == 1))
+    return -1 if version is None else version
+
+
+class ProductCatalog:
+    def __init__(self, check_s: float | None = None):
+        self._check_s = check_s
+        self._snapshot: CatalogSnapshot | None = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def _interval(self) -> float:
+        return settings.catalog_version_check_s if self._check_s is None else self._check_s
+
+    def snapshot(self, db: Session) -> CatalogSnapshot:
+        current = self._snapshot
+        if current is not None and time.monotonic() < self._next_check:
+            return current
+        with self._lock:
+            current = self._snapshot
+            if current is not None and time.monotonic() < self._next_check:
+                return current
+            version = _read_version(db)
+            if current is None or version != current.version or version < 0:
+                current = _build(db, version)
+                self._snapshot = current
+            self._next_check = time.monotonic() + self._interval()
+            return current
+
+    def invalidate(self) -> None:
+        """Forces a version check on the next lookup (call after committing product changes)."""
+        self._next_check = 0.0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._snapshot = None
+            self._next_check = 0.0
+
+    def get(self, db: Session, product_id: UUID) -> ProductView | None:
+        """Any product by id, active or not (callers check .active)."""
+        return self.snapshot(db).by_id.get(product_id)
+
+    def get_by_code(self, db: Session, code: str) -> ProductView | None:
+        """Active product by code."""
+        return self.snapshot(db).by_code.get(code)
+
+    def list_active(self, db: Session) -> tuple[ProductView, ...]:
+        return self.snapshot(db).active
+
+
+catalog = ProductCatalog()
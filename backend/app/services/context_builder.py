@@ -0,0 +1,209 @@
+"""
+Prompt context for AI turns under a fixed token budget.
+
+A context has three parts, packed in this order:
+- facts: diagnostic data (therapy), each fact cut to its share of the facts budget
+- summary: a rolling digest of the user's earlier answers in the session
+- recent messages: newest first until the budget is used up, each one capped
+
+The summary lives on ai_sessions. Messages that drop out of the recent window
+are folded into it once and the fold position (created_at, id) is stored next
+to it, so a turn reads the summary plus the last few messages instead of the
+whole history, and the prompt stays the same size however long the session
+runs. Budgets are per mode (LLM_CONTEXT_BUDGETS, default
+LLM_CONTEXT_BUDGET_TOKENS) and counted with app.utils.tokens.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Iterable, Mapping, Sequence
+from uuid import UUID
+
+from app.db.repo import AsyncRepo, Repo
+from app.settings import settings
+from app.utils.metrics import histogram
+from app.utils.tokens import count_tokens, truncate_tokens
+
+LLM_CONTEXT_TOKENS = histogram(
+    "llm_context_tokens",
+    "Tokens of packed conversation context per prompt",
+    ("mode",),
+    buckets=(50, 100, 200, 400, 800, 1200, 1600, 2000, 3000, 4000),
+)
+
+# messages read per step while folding a long backlog (first turn after the upgrade)
+_FOLD_BATCH = 50
+_DIGEST_CHARS = 200
+_LINE_OVERHEAD = 4  # label, separator and newline per rendered message
+
+# (facts, summary, recent messages, user label, assistant label)
+_HEADINGS = {
+    "de": ("Fakten aus der Diagnostik", "Frühere Antworten (kurz)", "Letzte Nachrichten", "Nutzer", "Assistent"),
+    "en": ("Diagnostic facts", "Earlier answers (summary)", "Recent messages", "User", "Assistant"),
+    "ru": ("Контекст диагностики", "Прежние ответы (кратко)", "Недавняя история диалога", "Клиент", "Эксперт"),
+}
+
+
+@dataclass(frozen=True)
+class ContextBudget:
+    total: int
+    facts: int
+    summary: int
+    message: int  # cap per recent message
+
+
+def budget_for(mode: str) -> ContextBudget:
+    total = settings.llm_context_budgets.get(mode, settings.llm_context_budget_tokens)
+    return ContextBudget(total=total, facts=total // 4, summary=total // 4, message=max(64, total // 5))
+
+
+@dataclass(frozen=True)
+class Turn:
+    role: str  # user | assistant
+    content: str
+
+
+@dataclass(frozen=True)
+class PackedContext:
+    facts: str = ""
+    summary: str = ""
+    turns: tuple[Turn, ...] = ()
+    tokens: int = 0
+
+    def render(self, locale: str) -> str:
+        loc = (locale or "de").strip().lower()[:2]
+        facts_h, summary_h, recent_h, user_label, assistant_label = _HEADINGS.get(loc, _HEADINGS["en"])
+        parts = []
+        if self.facts:
+            parts.append(f"{facts_h}:\n{self.facts}")
+        if self.summary:
+            parts.append(f"{summary_h}:\n{self.summary}")
+        if self.turns:
+            lines = [f"{user_label if t.role == 'user' else assistant_label}: {t.content}" for t in self.turns]
+            parts.append(f"{recent_h}:\n" + "\n".join(lines))
+        return "\n\n".join(parts)
+
+
+def format_facts(facts: Mapping[str, Any], max_tokens: int) -> str:
+    """One line per non-empty fact, each cut to an equal share of `max_tokens`."""
+    lines = []
+    for key, value in facts.items():
+        if isinstance(value, (list, tuple)):
+            value = "; ".join(str(v) for v in value if v)
+        value = " ".join(str(value or "").split())
+        if value:
+            lines.append((key, value))
+    if not lines:
+        return ""
+    share = max(8, max_tokens // len(lines))
+    return "\n".join(f"{key}: {truncate_tokens(value, share)}" for key, value in lines)
+
+
+def pack(mode: str, *, facts: str = "", summary: str = "", turns: Sequence[Turn] = ()) -> PackedContext:
+    budget = budget_for(mode)
+    facts = truncate_tokens(facts, budget.facts)
+    summary = truncate_tokens(summary, budget.summary)
+    used = count_tokens(facts) + count_tokens(summary)
+
+    picked: list[Turn] = []
+    for turn in reversed(turns):
+        content = truncate_tokens(" ".join(turn.content.split()), budget.message)
+        cost = count_tokens(content) + _LINE_OVERHEAD
+        if used + cost > budget.total:
+            break
+        picked.append(Turn(turn.role, content))
+        used += cost
+
+    LLM_CONTEXT_TOKENS.observe(used, mode=mode)
+    return PackedContext(facts=facts, summary=summary, turns=tuple(reversed(picked)), tokens=used)
+
+
+# -----------------------------
+# Rolling session summary
+# -----------------------------
+def _digest(text: str) -> str:
+    text = " ".join(text.split())
+    first = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+    if len(first) <= _DIGEST_CHARS:
+        return first
+    return first[:_DIGEST_CHARS].rsplit(" ", 1)[0] + "…"
+
+
+def fold_summary(summary: str, messages: Iterable[Any], max_tokens: int) -> str:
+    """Appends a digest of each user message; drops the oldest lines beyond `max_tokens`."""
+    lines = summary.splitlines() if summary else []
+    lines += [f"- {_digest(m.content)}" for m in messages if m.role == "user" and m.content.strip()]
+    costs = [count_tokens(line) + 1 for line in lines]
+    total = sum(costs)
+    start = 0
+    while start < len(lines) and total > max_tokens:
+        total -= costs[start]
+        start += 1
+    return "\n".join(lines[start:])
+
+
+@dataclass(frozen=True)
+class SummaryState:
+    text: str = ""
+    last_key: tuple[datetime, UUID] | None = None
+
+
+def _state(row) -> SummaryState:
+    if row is None or row.summary_last_message_id is None:
+        return SummaryState(text=(row.context_summary or "") if row is not None else "")
+    return SummaryState(row.context_summary or "", (row.summary_last_created_at, row.summary_last_message_id))
+
+
+def _advance(state: SummaryState, rows: list, window: int, max_tokens: int) -> tuple[SummaryState, list]:
+    """Folds everything but the last `window` of `rows` (messages after the fold position)."""
+    if len(rows) <= window:
+        return state, rows
+    folded, recent = rows[:-window], rows[-window:]
+    last = folded[-1]
+    return SummaryState(fold_summary(state.text, folded, max_tokens), (last.created_at, last.id)), recent
+
+
+def session_context(repo: Repo, session_id: UUID, mode: str) -> PackedContext:
+    """
+    Context of a training session before its next user message. Updates the stored
+    summary when messages left the recent window (flushed with the caller's transaction).
+    """
+    budget = budget_for(mode)
+    window = settings.llm_context_recent_messages
+    start = state = _state(repo.get_context_summary(session_id))
+    while True:
+        rows = repo.list_messages(session_id, after=state.last_key, limit=window + _FOLD_BATCH)
+        more = len(rows) > window + _FOLD_BATCH
+        state, recent = _advance(state, rows, window, budget.summary)
+        if not more:
+            break
+    if state != start:
+        repo.store_context_summary(session_id, state.text, *state.last_key)
+    return pack(mode, summary=state.text, turns=[Turn(m.role, m.content) for m in recent])
+
+
+async def session_context_async(repo: AsyncRepo, session_id: UUID, mode: str) -> PackedContext:
+    """Async twin of session_context()."""
+    budget = budget_for(mode)
+    window = settings.llm_context_recent_messages
+    start = state = _state(await repo.get_context_summary(session_id))
+    while True:
+        rows = await repo.list_messages(session_id, after=state.last_key, limit=window + _FOLD_BATCH)
+        more = len(rows) > window + _FOLD_BATCH
+        state, recent = _advance(state, rows, window, budget.summary)
+        if not more:
+            break
+    if state != start:
+        await repo.store_context_summary(session_id, state.text, *state.last_key)
+    return pack(mode, summary=state.text, turns=[Turn(m.role, m.content) for m in recent])
+
+
+def therapy_context(diagnostic_context: Mapping[str, Any], history: Sequence[dict[str, str]]) -> PackedContext:
+    """Context for a public therapy reply: diagnostic facts plus the client-sent history."""
+    budget = budget_for("therapy")
+    facts = format_facts(diagnostic_context, budget.facts)
+    turns = [Turn(m.get("role", "user"), m.get("content", "")) for m in history if m.get("content")]
+    return pack("therapy", facts=facts, turns=turns)
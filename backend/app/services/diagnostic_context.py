@@ -0,0 +1,122 @@
+"""
+Diagnostic context for public therapy replies.
+
+A diagnostic submission never changes after /api/public/diagnostic, but every
+therapy turn that refers to it needs the derived context (facts, focus list,
+plan, risk level). Derived contexts are kept per process in an LRU with a TTL
+(DIAGNOSTIC_CACHE_SIZE, DIAGNOSTIC_CACHE_TTL_S), so a conversation reads its
+submission once. Unknown ids are not cached.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Callable, Mapping
+from uuid import UUID
+
+from app.domain.models import DiagnosticSubmission
+from app.settings import settings
+from app.utils.metrics import counter, gauge
+
+DIAGNOSTIC_CACHE_LOOKUPS = counter(
+    "diagnostic_context_cache_lookups_total",
+    "Diagnostic context lookups by outcome (hit|miss|expired|not_found)",
+    ("outcome",),
+)
+DIAGNOSTIC_CACHE_SIZE = gauge("diagnostic_context_cache_entries", "Cached diagnostic contexts")
+
+_DEFAULT_FOCUS = ("Стабилизация", "Осознанность", "Ответственное поведение")
+
+
+@dataclass(frozen=True)
+class DiagnosticContext:
+    facts: Mapping[str, Any] = field(
+        default_factory=lambda: MappingProxyType(
+            {"reasons": [], "goal": "", "situation": "", "history": "", "focus": list(_DEFAULT_FOCUS)}
+        )
+    )
+    plan: str = "start"
+    risk_level: str = "moderate"
+
+
+DEFAULT_CONTEXT = DiagnosticContext()
+
+
+def derive(diag: DiagnosticSubmission) -> DiagnosticContext:
+    facts = {
+        "reasons": list(diag.reasons or []),
+        "goal": diag.goal,
+        "situation": diag.situation,
+        "history": diag.history,
+        "focus": [
+            f"Триггер: {diag.reasons[0]}" if diag.reasons else "Стабилизация",
+            f"Цель: {diag.goal[:160]}",
+            "Снижение риска срыва",
+        ],
+    }
+    return DiagnosticContext(
+        facts=MappingProxyType(facts),
+        plan=diag.recommended_plan,
+        risk_level="high" if len(diag.history or "") > 160 else "moderate",
+    )
+
+
+class DiagnosticContextCache:
+    def __init__(self, max_entries: int | None = None, ttl_s: float | None = None):
+        self._max_entries = max_entries
+        self._ttl_s = ttl_s
+        self._entries: OrderedDict[UUID, tuple[float, DiagnosticContext]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _limits(self) -> tuple[int, float]:
+        max_entries = settings.diagnostic_cache_size if self._max_entries is None else self._max_entries
+        ttl_s = settings.diagnostic_cache_ttl_s if self._ttl_s is None else self._ttl_s
+        return max_entries, ttl_s
+
+    def get(
+        self,
+        submission_id: UUID,
+        load: Callable[[UUID], DiagnosticSubmission | None],
+    ) -> DiagnosticContext | None:
+        """Cached context of the submission; `load` reads the row on a miss. None if it doesn't exist."""
+        max_entries, ttl_s = self._limits()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(submission_id)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(submission_id)
+                    DIAGNOSTIC_CACHE_LOOKUPS.inc(outcome="hit")
+                    return entry[1]
+                del self._entries[submission_id]
+
+        diag = load(submission_id)
+        if diag is None:
+            DIAGNOSTIC_CACHE_LOOKUPS.inc(outcome="not_found")
+            return None
+        DIAGNOSTIC_CACHE_LOOKUPS.inc(outcome="expired" if entry is not None else "miss")
+        context = derive(diag)
+        if max_entries > 0 and ttl_s > 0:
+            with self._lock:
+                self._entries[submission_id] = (now + ttl_s, context)
+                self._entries.move_to_end(submission_id)
+                while len(self._entries) > max_entries:
+                    self._entries.popitem(last=False)
+        return context
+
+    def forget(self, submission_id: UUID) -> None:
+        with self._lock:
+            self._entries.pop(submission_id, None)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+diagnostic_contexts = DiagnosticContextCache()
+# bound to the process-wide cache only: other instances (tests, benchmarks) stay off /metrics
+DIAGNOSTIC_CACHE_SIZE.set_function(lambda: float(len(diagnostic_contexts._entries)))
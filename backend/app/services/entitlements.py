@@ -0,0 +1,249 @@
+"""
+Entitlement consumption and balances.
+
+A unit is taken with one conditional UPDATE ... RETURNING (Repo.take_entitlement);
+there is no separate read-then-write round trip holding the row lock.
+
+Users found without units are remembered per process for ENTITLEMENT_EMPTY_CACHE_S,
+so repeated attempts from an exhausted account (402 retries, polling clients) never
+reach the database. Grants and refunds clear the entry once their transaction has
+committed, never before: a reader that queried in between would cache "empty"
+again. Every clear bumps a generation, and a reader whose query overlapped one
+does not cache its result.
+
+Grants (the payments worker) are announced to the API processes over Redis
+pub/sub when REDIS_URL is set; without Redis, or while the subscription is down,
+another process's entry expires after ENTITLEMENT_EMPTY_CACHE_S. Refunds only
+clear the entry of the process that served the turn.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from uuid import UUID
+
+import structlog
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.db.repo import AsyncRepo, Repo
+from app.settings import settings
+from app.utils.metrics import counter
+
+logger = structlog.get_logger()
+
+ENTITLEMENT_TAKES = counter(
+    "entitlement_takes_total",
+    "Attempts to consume one entitlement unit",
+    ("kind", "outcome"),  # taken | empty | cached_empty
+)
+
+_EMPTY_CACHE_MAX = 50_000
+
+GRANTS_CHANNEL = "entitlements:granted"
+# after a lost subscription, wait this long before subscribing again
+_RESUBSCRIBE_S = 5.0
+
+
+class EmptyBalanceCache:
+    def __init__(self, ttl_s: float | None = None, max_entries: int = _EMPTY_CACHE_MAX):
+        self._ttl_s = ttl_s
+        self._max_entries = max_entries
+        self._until: OrderedDict[tuple[UUID, str], float] = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _ttl(self) -> float:
+        return settings.entitlement_empty_cache_s if self._ttl_s is None else self._ttl_s
+
+    def known_empty(self, user_id: UUID, kind: str) -> bool:
+        key = (user_id, kind)
+        until = self._until.get(key)
+        if until is None:
+            return False
+        if until > time.monotonic():
+            return True
+        with self._lock:
+            self._until.pop(key, None)
+        return False
+
+    def generation(self) -> int:
+        """Read before querying a balance; pass to note_empty()."""
+        return self._generation
+
+    def note_empty(self, user_id: UUID, kind: str, generation: int) -> None:
+        ttl = self._ttl()
+        if ttl <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return  # something was cleared while the caller queried; its "empty" may predate a grant
+            self._until[(user_id, kind)] = time.monotonic() + ttl
+            self._until.move_to_end((user_id, kind))
+            while len(self._until) > self._max_entries:
+                self._until.popitem(last=False)
+
+    def forget(self, user_id: UUID, kind: str) -> None:
+        with self._lock:
+            self._generation += 1
+            self._until.pop((user_id, kind), None)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._until.clear()
+
+
+empty_balances = EmptyBalanceCache()
+
+
+class GrantNotices:
+    """Grant announcements between processes over Redis pub/sub; inactive without REDIS_URL."""
+
+    def __init__(self, channel: str = GRANTS_CHANNEL):
+        self._channel = channel
+        self._publisher = None
+        self._listener: asyncio.Task | None = None
+
+    def publish(self, user_id: UUID, kind: str) -> None:
+        """Best effort: the grant is committed either way, other processes then wait out the TTL."""
+        if not settings.redis_url:
+            return
+        try:
+            if self._publisher is None:
+                import redis  # deferred: only needed when REDIS_URL is set
+
+                self._publisher = redis.Redis.from_url(
+                    settings.redis_url, socket_timeout=0.5, socket_connect_timeout=0.5
+                )
+            self._publisher.publish(self._channel, f"{user_id}:{kind}")
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("entitlement_grant_notice_failed", error=str(exc))
+
+    @staticmethod
+    def received(data: bytes | str) -> None:
+        if isinstance(data, bytes):
+            data = data.decode()
+        user_id, _, kind = data.partition(":")
+        try:
+            empty_balances.forget(UUID(user_id), kind)
+        except ValueError:
+            logger.warning("entitlement_grant_notice_invalid", data=data)
+
+    def start(self) -> None:
+        if settings.redis_url and self._listener is None:
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def _listen(self) -> None:
+        try:
+            import redis.asyncio as redis  # deferred: only needed when REDIS_URL is set
+        except ImportError:
+            logger.warning("entitlement_grant_notices_unavailable", reason="redis package not installed")
+            return
+        client = redis.Redis.from_url(settings.redis_url)
+        try:
+            while True:
+                try:
+                    async with client.pubsub() as pubsub:
+                        await pubsub.subscribe(self._channel)
+                        # grants announced while we were not subscribed are lost: drop every entry
+                        empty_balances.reset()
+                        async for message in pubsub.listen():
+                            if message["type"] == "message":
+                                self.received(message["data"])
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning("entitlement_grant_notices_lost", error=str(exc))
+                    await asyncio.sleep(_RESUBSCRIBE_S)
+        finally:
+            await client.aclose()
+
+    async def aclose(self) -> None:
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.cancel()
+            try:
+                await listener
+            except asyncio.CancelledError:
+                pass
+        if self._publisher is not None:
+            self._publisher.close()
+            self._publisher = None
+
+
+grant_notices = GrantNotices()
+
+
+def _forget_after_commit(db, user_id: UUID, kind: str, announce: bool) -> None:
+    # Session.info is shared with the AsyncSession wrapping it
+    db.info.setdefault("empty_balances_forget", set()).add((user_id, kind, announce))
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_on_commit(session: Session) -> None:
+    for user_id, kind, announce in session.info.pop("empty_balances_forget", ()):
+        empty_balances.forget(user_id, kind)
+        if announce:
+            grant_notices.publish(user_id, kind)
+
+
+def granted(db: Session, user_id: UUID, kind: str) -> None:
+    """Call in the transaction granting units: once it commits, every process stops treating the user as empty."""
+    _forget_after_commit(db, user_id, kind, announce=True)
+
+
+def _taken(user_id: UUID, kind: str, entitlement_id: UUID | None, generation: int) -> UUID | None:
+    if entitlement_id is None:
+        empty_balances.note_empty(user_id, kind, generation)
+        ENTITLEMENT_TAKES.inc(kind=kind, outcome="empty")
+    else:
+        ENTITLEMENT_TAKES.inc(kind=kind, outcome="taken")
+    return entitlement_id
+
+
+def take(repo: Repo, user_id: UUID, kind: str) -> UUID | None:
+    """Consumes 1 unit (in the caller's transaction); returns the entitlement id or None."""
+    if empty_balances.known_empty(user_id, kind):
+        ENTITLEMENT_TAKES.inc(kind=kind, outcome="cached_empty")
+        return None
+    generation = empty_balances.generation()
+    return _taken(user_id, kind, repo.take_entitlement(user_id, kind), generation)
+
+
+def has_units(repo: Repo, user_id: UUID, kind: str) -> bool:
+    """Whether take() would currently succeed, without consuming anything."""
+    if empty_balances.known_empty(user_id, kind):
+        return False
+    generation = empty_balances.generation()
+    if repo.has_entitlement(user_id, kind):
+        return True
+    empty_balances.note_empty(user_id, kind, generation)
+    return False
+
+
+async def take_async(repo: AsyncRepo, user_id: UUID, kind: str) -> UUID | None:
+    if empty_balances.known_empty(user_id, kind):
+        ENTITLEMENT_TAKES.inc(kind=kind, outcome="cached_empty")
+        return None
+    generation = empty_balances.generation()
+    return _taken(user_id, kind, await repo.take_entitlement(user_id, kind), generation)
+
+
+async def refund_async(repo: AsyncRepo, entitlement_id: UUID, user_id: UUID, kind: str) -> None:
+    """Gives the unit back in the caller's transaction; the empty entry is cleared when it commits."""
+    await repo.refund_entitlement(entitlement_id)
+    # not announced: publishing would block the event loop, and only this process served the turn
+    _forget_after_commit(repo.db, user_id, kind, announce=False)
+
+
+def balances(repo: Repo, user_id: UUID) -> dict[str, dict]:
+    """Remaining usable units and the nearest expiry per kind, e.g. {"ai_credits": {...}}."""
+    return {
+        kind: {
+            "remaining": int(remaining or 0),
+            "next_expiry": next_expiry.isoformat() if next_expiry else None,
+        }
+        for kind, remaining, next_expiry in repo.entitlement_balances(user_id)
+    }
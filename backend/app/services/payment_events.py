@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+import structlog
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db.repo import Repo
+from app.domain.models import Order, PaymentEvent
+from app.services.payments import apply_paid_event
+from app.settings import settings
+from app.utils.metrics import counter, histogram
+
+logger = structlog.get_logger()
+
+PAYMENT_EVENT_APPLY = histogram(
+    "payment_event_apply_seconds",
+    "Time to apply one stored payment event (claim to commit)",
+    ("type", "outcome"),
+)
+PAYMENT_EVENT_LAG = histogram(
+    "payment_event_lag_seconds",
+    "Time from webhook receipt to the event being applied",
+    ("type",),
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0),
+)
+PAYMENT_EVENT_RESULTS = counter("payment_events_total", "Stored payment events handled by the worker", ("outcome",))
+
+_RETRY_MAX_S = 300
+
+
+def _now_utc() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _retry_at(attempts: int) -> datetime:
+    # 2, 4, 8, ... seconds, capped
+    return _now_utc() + timedelta(seconds=min(2 ** (attempts + 1), _RETRY_MAX_S))
+
+
+def apply_payment_event(db: Session, event: dict) -> bool:
+    """
+    Side effects of one Stripe event. Returns True if it granted something.
+    Idempotent (apply_paid_event skips paid orders), so a replay after a crash is harmless.
+    """
+    # Preferred signal: checkout.session.completed with metadata.order_id
+    if event.get("type") != "checkout.session.completed":
+        return False
+
+    obj = (event.get("data") or {}).get("object") or {}
+    meta = obj.get("metadata") or {}
+    order_id = meta.get("order_id")
+
+    # Only consider paid sessions
+    if obj.get("payment_status") != "paid" or not order_id:
+        return False
+
+    order = db.get(Order, UUID(order_id))
+    if not order or not order.provider_ref:
+        return False
+
+    apply_paid_event(db, order.provider_ref)
+    return True
+
+
+def _observe(evt_type: str, outcome: str, started: float, received_at: datetime | None = None) -> None:
+    PAYMENT_EVENT_APPLY.observe(time.perf_counter() - started, type=evt_type, outcome=outcome)
+    PAYMENT_EVENT_RESULTS.inc(outcome=outcome)
+    if received_at is not None:
+        if received_at.tzinfo is None:
+            received_at = received_at.replace(tzinfo=timezone.utc)
+        PAYMENT_EVENT_LAG.observe((_now_utc() - received_at).total_seconds(), type=evt_type)
+
+
+def process_next_event(session_factory: sessionmaker) -> bool:
+    """
+    Claims, applies and marks one due event in a single transaction; the row lock
+    taken by the claim is what keeps concurrent workers off the same event.
+    Returns False when nothing is due.
+    """
+    db = session_factory()
+    try:
+        repo = Repo(db)
+        evt: PaymentEvent | None = repo.claim_payment_event(settings.payment_event_max_attempts)
+        if evt is None:
+            db.rollback()
+            return False
+
+        started = time.perf_counter()
+        event_pk, evt_type, attempts, received_at = evt.id, evt.type, evt.attempts, evt.received_at
+        try:
+            # savepoint: a failure undoes the side effects but keeps the row locked
+            # until the failure is recorded, so no other worker retries it early
+            with db.begin_nested():
+                applied = apply_payment_event(db, evt.payload_json or {})
+        except Exception as exc:  # noqa: BLE001
+            dead = attempts + 1 >= settings.payment_event_max_attempts
+            retry_at = None if dead else _retry_at(attempts)
+            repo.record_payment_event_failure(event_pk, f"{type(exc).__name__}: {exc}", retry_at)
+            db.commit()
+            _observe(evt_type, "dead" if dead else "failed", started)
+            # a dead event is never retried: its order stays unpaid until someone looks
+            log = logger.error if dead else logger.warning
+            log(
+                "payment_event_dead" if dead else "payment_event_failed",
+                event_id=str(event_pk),
+                type=evt_type,
+                attempts=attempts + 1,
+                error=str(exc),
+            )
+            return True
+
+        repo.mark_payment_event_processed(evt)
+        db.commit()
+
+        outcome = "applied" if applied else "skipped"
+        _observe(evt_type, outcome, started, received_at)
+        logger.info(
+            "payment_event_processed",
+            event_id=str(event_pk),
+            type=evt_type,
+            outcome=outcome,
+            latency_ms=int((time.perf_counter() - started) * 1000),
+        )
+        return True
+    finally:
+        db.close()
+
+
+def drain_payment_events(
+    session_factory: sessionmaker,
+    *,
+    concurrency: int | None = None,
+    stop: threading.Event | None = None,
+    poll_interval_s: float | None = None,
+) -> int:
+    """
+    Runs `concurrency` workers that apply due events until the queue is empty
+    (stop=None) or until `stop` is set, polling every poll_interval_s while idle.
+    Returns the number of events handled.
+    """
+    concurrency = concurrency or settings.payment_worker_concurrency
+    poll = settings.payment_worker_poll_interval_s if poll_interval_s is None else poll_interval_s
+
+    def worker() -> int:
+        handled = 0
+        while stop is None or not stop.is_set():
+            try:
+                claimed = process_next_event(session_factory)
+            except Exception as exc:  # noqa: BLE001
+                # DB unavailable etc.: a long-running worker backs off instead of dying
+                if stop is None:
+                    raise
+                logger.error("payment_worker_error", error=str(exc))
+                stop.wait(poll)
+                continue
+            if claimed:
+                handled += 1
+            elif stop is None:
+                break
+            else:
+                stop.wait(poll)
+        return handled
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="payments-worker") as pool:
+        futures = [pool.submit(worker) for _ in range(concurrency)]
+        return sum(f.result() for f in futures)
@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 
 from app.db.repo import Repo
 from app.domain.models import APIError
+from app.services import entitlements
 
 
 def _now_utc() -> datetime:
@@ -110,3 +111,4 @@ def apply_paid_event(db: Session, provider_ref: str) -> None:
         ent.valid_to = now + timedelta(days=int(valid_days))
 
     db.flush()
+    entitlements.granted(db, order.user_id, kind)
@@ -0,0 +1,36 @@
+"""
+Retention of anonymous public therapy conversations (/api/public/therapy/reply).
+
+A conversation is stored together with its first turn pair, so a failed or
+rejected first reply leaves nothing behind. Conversations untouched for
+PUBLIC_CONVERSATION_TTL_S are deleted with their turns by the payments worker
+(app.payments_worker), every PUBLIC_CONVERSATION_PURGE_INTERVAL_S.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import sessionmaker
+
+from app.db.repo import Repo
+from app.settings import settings
+
+# conversations deleted per transaction, so a large backlog never holds long locks
+_PURGE_BATCH = 1000
+
+
+def purge_stale_conversations(session_factory: sessionmaker, now: datetime | None = None) -> int:
+    """Deletes every expired conversation, one commit per batch; returns how many were deleted."""
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(seconds=settings.public_conversation_ttl_s)
+    purged = 0
+    while True:
+        db = session_factory()
+        try:
+            batch = Repo(db).purge_public_conversations(cutoff, _PURGE_BATCH)
+            db.commit()
+        finally:
+            db.close()
+        purged += batch
+        if batch < _PURGE_BATCH:
+            return purged
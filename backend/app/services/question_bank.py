@@ -1,11 +1,21 @@
 from __future__ import annotations
 
+import asyncio
+import random
+import threading
+import time
+import weakref
+from dataclasses import dataclass
 from uuid import UUID
 
-from sqlalchemy import func, select
+import anyio
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.db.repo import AsyncRepo, Repo
 from app.domain.models import Question
+from app.settings import settings
 
 # Level bands per mode (MVP heuristic)
 _MODE_LEVELS = {
@@ -36,37 +46,224 @@ def _fallback_question(locale: str, mode: str | None) -> str:
         return "Please briefly describe your current situation related to the MPU topic."
 
 
-def _pick_question(
-    db: Session,
-    *,
-    mode: str | None,
-    topic_id: UUID | None,
-    level_min: int | None,
-    level_max: int | None,
-) -> Question | None:
-    stmt = select(Question)
+# -----------------------------
+# In-memory question index
+# -----------------------------
+@dataclass(frozen=True, slots=True)
+class IndexedQuestion:
+    id: UUID
+    topic_id: UUID
+    level: int
+    question_de: str
+    question_en: str
+
+
+class QuestionIndex:
+    """
+    Immutable snapshot of the question bank, bucketed by (topic_id, level) and by level.
+
+    Sampling touches at most one bucket per level in the band (levels are a
+    small fixed range), so a pick is O(1) in the size of the bank and picks
+    uniformly across all matching questions.
+    """
+
+    def __init__(self, rows: list[IndexedQuestion]):
+        self._by_topic_level: dict[tuple[UUID, int], list[IndexedQuestion]] = {}
+        self._by_level: dict[int, list[IndexedQuestion]] = {}
+        for q in rows:
+            self._by_topic_level.setdefault((q.topic_id, q.level), []).append(q)
+            self._by_level.setdefault(q.level, []).append(q)
+        self._by_id: dict[UUID, IndexedQuestion] = {q.id: q for q in rows}
+        self.levels = sorted(self._by_level)
+        self.size = len(rows)
+
+    def get(self, question_id: UUID) -> IndexedQuestion | None:
+        return self._by_id.get(question_id)
+
+    def band_ids(self, *, level_min: int | None, level_max: int | None) -> list[UUID]:
+        return [
+            q.id
+            for level in self.levels
+            if (level_min is None or level >= level_min) and (level_max is None or level <= level_max)
+            for q in self._by_level[level]
+        ]
+
+    def sample(
+        self,
+        *,
+        topic_id: UUID | None,
+        level_min: int | None,
+        level_max: int | None,
+        rng: random.Random | None = None,
+    ) -> IndexedQuestion | None:
+        buckets: list[list[IndexedQuestion]] = []
+        for level in self.levels:
+            if level_min is not None and level < level_min:
+                continue
+            if level_max is not None and level > level_max:
+                continue
+            bucket = self._by_level[level] if topic_id is None else self._by_topic_level.get((topic_id, level))
+            if bucket:
+                buckets.append(bucket)
+
+        total = sum(len(b) for b in buckets)
+        if not total:
+            return None
+
+        pick = (rng or random).randrange(total)
+        for bucket in buckets:
+            if pick < len(bucket):
+                return bucket[pick]
+            pick -= len(bucket)
+        return None
+
+
+def _question_rows_stmt():
+    return select(Question.id, Question.topic_id, Question.level, Question.question_de, Question.question_en)
+
+
+def _build_index(rows) -> QuestionIndex:
+    return QuestionIndex([IndexedQuestion(*row) for row in rows])
+
+
+def load_question_index(db: Session) -> QuestionIndex:
+    return _build_index(db.execute(_question_rows_stmt()).all())
+
+
+async def load_question_index_async(db: AsyncSession) -> QuestionIndex:
+    rows = (await db.execute(_question_rows_stmt())).all()
+    # bucketing the whole bank is CPU work; keep it off the event loop
+    return await anyio.to_thread.run_sync(_build_index, rows)
+
+
+_index: QuestionIndex | None = None
+_index_loaded_at = 0.0
+# bumped by every invalidation, so a load that overlapped one is not cached
+_index_generation = 0
+_index_lock = threading.Lock()
+# the async path waits on these (one per event loop) instead of on _index_lock, which would block the loop
+_async_index_locks: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock] = weakref.WeakKeyDictionary()
 
-    if topic_id is not None:
-        stmt = stmt.where(Question.topic_id == topic_id)
 
+def invalidate_question_index() -> None:
+    """
+    Drops the cached index; the next pick reloads it. Call after questions change.
+    Only this process is affected: others see the change once their index is
+    older than QUESTION_INDEX_TTL_S.
+    """
+    global _index, _index_generation
+    with _index_lock:
+        _index = None
+        _index_generation += 1
+
+
+def _cached_index() -> QuestionIndex | None:
+    index = _index
+    if index is None:
+        return None
+    # TTL bounds staleness for changes made by other workers/processes
+    if time.monotonic() - _index_loaded_at > settings.question_index_ttl_s:
+        return None
+    return index
+
+
+def get_question_index(db: Session) -> QuestionIndex:
+    global _index, _index_loaded_at
+    index = _cached_index()
+    if index is not None:
+        return index
+
+    with _index_lock:
+        index = _cached_index()
+        if index is None:
+            index = load_question_index(db)
+            _index, _index_loaded_at = index, time.monotonic()
+        return index
+
+
+async def get_question_index_async(db: AsyncSession) -> QuestionIndex:
+    """
+    get_question_index() for the event loop: one caller at a time reloads
+    (asyncio.Lock), querying through the async session and building the index
+    in a worker thread. Like the sync path, it is fresh across processes only
+    up to QUESTION_INDEX_TTL_S; invalidation reaches this process alone.
+    """
+    global _index, _index_loaded_at
+    index = _cached_index()
+    if index is not None:
+        return index
+
+    loop = asyncio.get_running_loop()
+    lock = _async_index_locks.get(loop)
+    if lock is None:
+        lock = _async_index_locks[loop] = asyncio.Lock()
+    async with lock:
+        index = _cached_index()
+        if index is None:
+            generation = _index_generation
+            index = await load_question_index_async(db)
+            if generation == _index_generation:
+                _index, _index_loaded_at = index, time.monotonic()
+        return index
+
+
+@event.listens_for(Question, "after_insert")
+@event.listens_for(Question, "after_update")
+@event.listens_for(Question, "after_delete")
+def _mark_questions_changed(_mapper, _connection, target) -> None:
+    session = Session.object_session(target)
+    if session is not None:
+        session.info["questions_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    if session.info.pop("questions_changed", False):
+        invalidate_question_index()
+
+
+def _level_band(mode: str | None, level_min: int | None, level_max: int | None) -> tuple[int | None, int | None]:
     # Apply level constraints with sane defaults by mode
     if (level_min is None or level_max is None) and mode in _MODE_LEVELS:
         lm, lx = _MODE_LEVELS[mode]
         level_min = lm if level_min is None else level_min
         level_max = lx if level_max is None else level_max
+    return (
+        int(level_min) if level_min is not None else None,
+        int(level_max) if level_max is not None else None,
+    )
+
+
+def _pick_question(
+    index: QuestionIndex,
+    *,
+    mode: str | None,
+    topic_id: UUID | None,
+    level_min: int | None,
+    level_max: int | None,
+) -> IndexedQuestion | None:
+    lm, lx = _level_band(mode, level_min, level_max)
+    q = index.sample(topic_id=topic_id, level_min=lm, level_max=lx)
 
-    if level_min is not None:
-        stmt = stmt.where(Question.level >= int(level_min))
-    if level_max is not None:
-        stmt = stmt.where(Question.level <= int(level_max))
+    # Widen constraints progressively if nothing found
+    if not q and topic_id is not None:
+        q = index.sample(topic_id=None, level_min=lm, level_max=lx)
 
-    # Random pick within constraints
-    stmt = stmt.order_by(func.random()).limit(1)
+    if not q and (level_min is not None or level_max is not None):
+        lm, lx = _level_band(mode, None, None)
+        q = index.sample(topic_id=topic_id, level_min=lm, level_max=lx)
 
-    q = db.scalar(stmt)
     return q
 
 
+def _question_text(q: IndexedQuestion | None, loc: str, mode: str | None) -> str:
+    if not q:
+        return _fallback_question(loc, mode)
+
+    text = q.question_de if loc == "de" else q.question_en
+    return text or _fallback_question(loc, mode)
+
+
 def next_question(
     db: Session,
     locale: str = "de",
@@ -86,27 +283,119 @@ def next_question(
       - mode: diagnostic|practice|mock
       - topic_id: pick from a topic
       - level_min/level_max: override difficulty band
+
+    Picks from the in-memory QuestionIndex; the DB is only read when the index is (re)loaded.
     """
     loc = _normalize_locale(locale)
     mode_norm = (mode or "").strip().lower() or None
 
     q = _pick_question(
-        db,
+        get_question_index(db),
         mode=mode_norm,
         topic_id=topic_id,
         level_min=level_min,
         level_max=level_max,
     )
+    return _question_text(q, loc, mode_norm)
 
-    # Widen constraints progressively if nothing found
-    if not q and topic_id is not None:
-        q = _pick_question(db, mode=mode_norm, topic_id=None, level_min=level_min, level_max=level_max)
 
-    if not q and (level_min is not None or level_max is not None):
-        q = _pick_question(db, mode=mode_norm, topic_id=topic_id, level_min=None, level_max=None)
+async def next_question_async(
+    db: AsyncSession,
+    locale: str = "de",
+    *,
+    mode: str | None = None,
+    topic_id: UUID | None = None,
+    level_min: int | None = None,
+    level_max: int | None = None,
+) -> str:
+    """
+    Async variant of next_question() with the same widening rules.
+    """
+    loc = _normalize_locale(locale)
+    mode_norm = (mode or "").strip().lower() or None
 
-    if not q:
-        return _fallback_question(loc, mode_norm)
+    q = _pick_question(
+        await get_question_index_async(db),
+        mode=mode_norm,
+        topic_id=topic_id,
+        level_min=level_min,
+        level_max=level_max,
+    )
+    return _question_text(q, loc, mode_norm)
 
-    text = q.question_de if loc == "de" else q.question_en
-    return text or _fallback_question(loc, mode_norm)
+
+# -----------------------------
+# Per-session question plan
+# -----------------------------
+_PLAN_ID_BYTES = 16
+_PLAN_MAX_SKIPS = 8  # plan entries pointing at deleted questions
+
+
+def build_question_plan(index: QuestionIndex, mode: str | None, rng: random.Random | None = None) -> bytes:
+    """
+    Shuffled sequence of question ids from the mode's level band, packed as 16-byte UUIDs.
+    Capped at QUESTION_PLAN_SIZE entries (8 KB for 512), far beyond a realistic session.
+    """
+    lm, lx = _level_band(mode, None, None)
+    ids = index.band_ids(level_min=lm, level_max=lx)
+    picked = (rng or random).sample(ids, min(len(ids), settings.question_plan_size))
+    return b"".join(qid.bytes for qid in picked)
+
+
+def _plan_entry(raw: bytes | None) -> UUID | None:
+    if not raw or len(raw) != _PLAN_ID_BYTES:
+        return None
+    return UUID(bytes=bytes(raw))
+
+
+def next_session_question(db: Session, session_id: UUID, locale: str = "de", *, mode: str | None = None) -> str:
+    """
+    Next question of the session's plan: no repeats until the mode's band is exhausted,
+    then a fresh shuffle. The plan lives on ai_sessions and the cursor is advanced by a
+    single UPDATE ... RETURNING, so it survives restarts and is safe across workers.
+    Must run inside the caller's transaction.
+    """
+    loc = _normalize_locale(locale)
+    mode_norm = (mode or "").strip().lower() or None
+    repo = Repo(db)
+    index = get_question_index(db)
+
+    for _ in range(_PLAN_MAX_SKIPS):
+        qid = _plan_entry(repo.advance_question_cursor(session_id))
+        if qid is None:
+            plan = build_question_plan(index, mode_norm)
+            if not plan:
+                break
+            repo.store_question_plan(session_id, plan, cursor=1)
+            qid = _plan_entry(plan[:_PLAN_ID_BYTES])
+
+        q = index.get(qid)
+        if q:
+            return _question_text(q, loc, mode_norm)
+
+    return next_question(db, locale=loc, mode=mode_norm)
+
+
+async def next_session_question_async(
+    db: AsyncSession, session_id: UUID, locale: str = "de", *, mode: str | None = None
+) -> str:
+    """Async variant of next_session_question()."""
+    loc = _normalize_locale(locale)
+    mode_norm = (mode or "").strip().lower() or None
+    repo = AsyncRepo(db)
+    index = await get_question_index_async(db)
+
+    for _ in range(_PLAN_MAX_SKIPS):
+        qid = _plan_entry(await repo.advance_question_cursor(session_id))
+        if qid is None:
+            plan = build_question_plan(index, mode_norm)
+            if not plan:
+                break
+            await repo.store_question_plan(session_id, plan, cursor=1)
+            qid = _plan_entry(plan[:_PLAN_ID_BYTES])
+
+        q = index.get(qid)
+        if q:
+            return _question_text(q, loc, mode_norm)
+
+    return await next_question_async(db, locale=loc, mode=mode_norm)
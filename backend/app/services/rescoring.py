@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterator, Sequence
+from uuid import UUID, uuid4
+
+from sqlalchemy import Row, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.domain.models import AIEvaluation, AIMessage, ScoringCheckpoint, utcnow
+from app.services.scoring import evaluate_user_message
+
+
+@dataclass
+class RescoreStats:
+    processed: int = 0  # user messages scored in this run
+    written: int = 0  # evaluation rows inserted (already-scored messages are skipped)
+    total_processed: int = 0  # including earlier runs of the same version
+    elapsed_s: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        return self.processed / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+
+class _InlineExecutor:
+    """Executor.map() in the calling process (workers=0: tests, small runs, debugging)."""
+
+    def map(self, fn, items, chunksize: int = 1) -> Iterator:
+        return iter([fn(item) for item in items])
+
+    def shutdown(self, wait: bool = True) -> None:
+        pass
+
+
+def _fetch_page(db: Session, after: tuple[datetime, UUID] | None, limit: int) -> Sequence[Row]:
+    # plain column rows, no ORM identity map: memory stays flat over millions of messages
+    stmt = select(AIMessage.id, AIMessage.session_id, AIMessage.content, AIMessage.created_at).where(
+        AIMessage.role == "user"
+    )
+    if after is not None:
+        stmt = stmt.where(tuple_(AIMessage.created_at, AIMessage.id) > tuple_(*after))
+    return db.execute(stmt.order_by(AIMessage.created_at, AIMessage.id).limit(limit)).all()
+
+
+def _page_size(batch_size: int, limit: int | None, stats: RescoreStats, pending: int = 0) -> int:
+    if limit is None:
+        return batch_size
+    return max(0, min(batch_size, limit - stats.processed - pending))
+
+
+def _insert_evaluations(db: Session, rows: list[dict]) -> int:
+    if not rows:
+        return 0
+    dialect = db.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    # one multi-row INSERT per page; messages already scored with this version are skipped
+    stmt = insert(AIEvaluation.__table__).on_conflict_do_nothing(index_elements=["message_id", "scoring_version"])
+    # RETURNING counts inserted rows reliably for batched executemany
+    return len(db.execute(stmt.returning(AIEvaluation.__table__.c.id), rows).all())
+
+
+def _evaluation_rows(page: Sequence[Row], results: list[dict], version: str) -> list[dict]:
+    now = utcnow()
+    return [
+        {
+            "id": uuid4(),
+            "session_id": msg.session_id,
+            "message_id": msg.id,
+            "rubric_scores": res.get("rubric_scores", {}),
+            "summary_feedback": res.get("summary_feedback", ""),
+            "detected_issues": res.get("detected_issues", {}),
+            "scoring_version": version,
+            "created_at": now,
+        }
+        for msg, res in zip(page, results)
+    ]
+
+
+def rescore_messages(
+    session_factory: sessionmaker,
+    *,
+    version: str,
+    batch_size: int = 1000,
+    workers: int | None = None,
+    limit: int | None = None,
+    restart: bool = False,
+    progress: Callable[[RescoreStats], None] | None = None,
+) -> RescoreStats:
+    """
+    Re-scores historical user messages with the current rubric and stores the
+    results as AIEvaluation rows tagged with `version`.
+
+    Messages are read in (created_at, id) keyset pages. While the pool scores one
+    page the next one is already being fetched; each page is written with a
+    single INSERT together with the checkpoint, in one transaction, so an
+    interrupted run resumes after the last committed page (restart=True starts
+    over; rows already written for the version are kept and skipped).
+
+    workers=None uses one process per CPU, workers=0 scores in-process.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    pool: Executor | _InlineExecutor = ProcessPoolExecutor(max_workers=workers) if workers > 0 else _InlineExecutor()
+    stats = RescoreStats()
+    started = time.perf_counter()
+
+    db = session_factory()
+    try:
+        checkpoint = db.get(ScoringCheckpoint, version)
+        if checkpoint is None:
+            checkpoint = ScoringCheckpoint(scoring_version=version, processed=0)
+            db.add(checkpoint)
+        elif restart:
+            checkpoint.last_created_at, checkpoint.last_message_id, checkpoint.processed = None, None, 0
+        db.commit()
+
+        after = (
+            (checkpoint.last_created_at, checkpoint.last_message_id)
+            if checkpoint.last_created_at is not None and checkpoint.last_message_id is not None
+            else None
+        )
+        stats.total_processed = checkpoint.processed
+
+        page = _fetch_page(db, after, _page_size(batch_size, limit, stats))
+        while page:
+            chunksize = max(1, len(page) // (max(workers, 1) * 4))
+            scored = pool.map(evaluate_user_message, [msg.content for msg in page], chunksize=chunksize)
+
+            last = page[-1]
+            after = (last.created_at, last.id)
+            size = _page_size(batch_size, limit, stats, pending=len(page))
+            next_page = _fetch_page(db, after, size) if size else []
+
+            stats.written += _insert_evaluations(db, _evaluation_rows(page, list(scored), version))
+            stats.processed += len(page)
+            stats.total_processed += len(page)
+            checkpoint.last_created_at, checkpoint.last_message_id = after
+            checkpoint.processed = stats.total_processed
+            checkpoint.updated_at = utcnow()
+            db.commit()
+
+            stats.elapsed_s = time.perf_counter() - started
+            if progress is not None:
+                progress(stats)
+            page = next_page
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+        pool.shutdown(wait=True)
+
+    stats.elapsed_s = time.perf_counter() - started
+    return stats
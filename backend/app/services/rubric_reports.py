@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.domain.models import AIEvaluation, AISession, APIError
+
+RUBRIC_KEYS = ("clarity", "specificity", "consistency", "responsibility")
+PERCENTILES = (10, 50, 90)
+GROUP_FIELDS = ("session", "user", "mode")
+
+
+@dataclass
+class RubricFrame:
+    """Columnar view of evaluations: one entry per AIEvaluation, ordered by created_at."""
+
+    session_ids: np.ndarray  # object (UUID)
+    user_ids: np.ndarray  # object (UUID)
+    modes: np.ndarray  # object (str)
+    scores: np.ndarray  # float64, shape (n, len(RUBRIC_KEYS)), NaN where a score is missing
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def column(self, field: str) -> np.ndarray:
+        return {"session": self.session_ids, "user": self.user_ids, "mode": self.modes}[field]
+
+
+def load_rubric_frame(
+    db: Session,
+    *,
+    version: str,
+    session_id: UUID | None = None,
+    user_id: UUID | None = None,
+    mode: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> RubricFrame:
+    # Scores are extracted from the JSON in SQL, so only four integers per row come
+    # back instead of the whole rubric_scores/detected_issues blobs.
+    stmt = (
+        select(
+            AIEvaluation.session_id,
+            AISession.user_id,
+            AISession.mode,
+            *(AIEvaluation.rubric_scores[key].as_integer() for key in RUBRIC_KEYS),
+        )
+        .join(AISession, AISession.id == AIEvaluation.session_id)
+        .where(AIEvaluation.scoring_version == version)
+        .order_by(AIEvaluation.created_at, AIEvaluation.id)
+    )
+    if session_id is not None:
+        stmt = stmt.where(AIEvaluation.session_id == session_id)
+    if user_id is not None:
+        stmt = stmt.where(AISession.user_id == user_id)
+    if mode is not None:
+        stmt = stmt.where(AISession.mode == mode)
+    if since is not None:
+        stmt = stmt.where(AIEvaluation.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(AIEvaluation.created_at < until)
+
+    rows = db.execute(stmt).all()
+    n = len(rows)
+    scores = np.full((n, len(RUBRIC_KEYS)), np.nan)
+    session_ids = np.empty(n, dtype=object)
+    user_ids = np.empty(n, dtype=object)
+    modes = np.empty(n, dtype=object)
+    if n:
+        cols = list(zip(*rows))
+        session_ids[:], user_ids[:], modes[:] = cols[0], cols[1], cols[2]
+        scores[:] = np.array(cols[3:], dtype=float).T  # None -> nan
+    return RubricFrame(session_ids=session_ids, user_ids=user_ids, modes=modes, scores=scores)
+
+
+def _grouped_stats(codes: np.ndarray, n_groups: int, scores: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Per-group count, mean, percentiles and trend for every rubric column at once.
+
+    `codes` assigns each row to a group 0..n_groups-1; rows are in time order, so a
+    row's rank within its group is its answer number and the trend is the
+    least-squares slope of the score per answer.
+    """
+    n_rubrics = scores.shape[1]
+    valid = ~np.isnan(scores)
+    counts = np.stack([np.bincount(codes[valid[:, j]], minlength=n_groups) for j in range(n_rubrics)], axis=1)
+    filled = np.where(valid, scores, 0.0)
+
+    sums = np.stack([np.bincount(codes, weights=filled[:, j], minlength=n_groups) for j in range(n_rubrics)], axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+
+    # Percentiles (linear interpolation, like np.percentile): sort by (group, value),
+    # missing scores last inside their group, then index each group's slice directly.
+    percentiles = np.full((len(PERCENTILES), n_groups, n_rubrics), np.nan)
+    for j in range(n_rubrics):
+        order = np.lexsort((np.where(valid[:, j], scores[:, j], np.inf), codes))
+        ordered = scores[order, j]
+        starts = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=n_groups))[:-1]))
+        has = counts[:, j] > 0
+        for qi, q in enumerate(PERCENTILES):
+            pos = starts[has] + (counts[has, j] - 1) * (q / 100.0)
+            lo = np.floor(pos).astype(int)
+            hi = np.ceil(pos).astype(int)
+            percentiles[qi, has, j] = ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+    # Answer number within the group (stable sort keeps time order)
+    by_group = np.argsort(codes, kind="stable")
+    group_sizes = np.bincount(codes, minlength=n_groups)
+    group_starts = np.concatenate(([0], np.cumsum(group_sizes)[:-1]))
+    rank = np.empty(len(codes), dtype=float)
+    rank[by_group] = np.arange(len(codes)) - group_starts[codes[by_group]]
+
+    x = np.where(valid, rank[:, None], 0.0)
+    sx = np.stack([np.bincount(codes, weights=x[:, j], minlength=n_groups) for j in range(n_rubrics)], axis=1)
+    sxx = np.stack([np.bincount(codes, weights=x[:, j] ** 2, minlength=n_groups) for j in range(n_rubrics)], axis=1)
+    sxy = np.stack(
+        [np.bincount(codes, weights=x[:, j] * filled[:, j], minlength=n_groups) for j in range(n_rubrics)], axis=1
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var_x = sxx - sx * sx / counts
+        trend = np.where(var_x > 0, (sxy - sx * sums / counts) / var_x, np.nan)
+
+    return {"count": group_sizes, "mean": means, "percentiles": percentiles, "trend": trend}
+
+
+def _num(value: float) -> float | None:
+    return None if np.isnan(value) else round(float(value), 3)
+
+
+def _by_rubric(values: np.ndarray) -> dict[str, float | None]:
+    return {key: _num(v) for key, v in zip(RUBRIC_KEYS, values)}
+
+
+def _group_summaries(keys: np.ndarray, stats: dict[str, np.ndarray]) -> list[dict]:
+    return [
+        {
+            "key": str(key),
+            "count": int(stats["count"][g]),
+            "mean": _by_rubric(stats["mean"][g]),
+            **{f"p{q}": _by_rubric(stats["percentiles"][qi, g]) for qi, q in enumerate(PERCENTILES)},
+            "trend": _by_rubric(stats["trend"][g]),
+        }
+        for g, key in enumerate(keys)
+    ]
+
+
+def summarize(frame: RubricFrame, group_by: str | None = None) -> list[dict]:
+    """Summaries per distinct value of `group_by` (session/user/mode), or one overall summary."""
+    if not len(frame):
+        return []
+    if group_by is None:
+        keys = np.array(["all"], dtype=object)
+        codes = np.zeros(len(frame), dtype=np.intp)
+    else:
+        # UUIDs/str sort fine as objects; np.unique hands back dense group codes
+        keys, codes = np.unique(frame.column(group_by), return_inverse=True)
+    return _group_summaries(keys, _grouped_stats(codes.astype(np.intp), len(keys), frame.scores))
+
+
+def cohort_report(
+    db: Session,
+    *,
+    version: str,
+    group_by: str = "mode",
+    user_id: UUID | None = None,
+    mode: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> dict:
+    if group_by not in GROUP_FIELDS:
+        raise APIError("INVALID_GROUP_BY", "Unsupported group_by", {"allowed": list(GROUP_FIELDS)}, status_code=422)
+
+    frame = load_rubric_frame(db, version=version, user_id=user_id, mode=mode, since=since, until=until)
+    overall = summarize(frame)
+    return {
+        "version": version,
+        "group_by": group_by,
+        "overall": overall[0] if overall else None,
+        "groups": summarize(frame, group_by),
+    }
+
+
+# Closed sessions get no new answers, so their summary is computed once per version.
+# (A later re-score into the same version can add rows; bump RUBRIC_VERSION instead.)
+_SESSION_CACHE_MAX = 4096
+_session_cache: OrderedDict[tuple[UUID, str], dict] = OrderedDict()
+_session_cache_lock = threading.Lock()
+
+
+def clear_session_report_cache() -> None:
+    with _session_cache_lock:
+        _session_cache.clear()
+
+
+def session_report(db: Session, session_id: UUID, *, version: str) -> dict:
+    key = (session_id, version)
+    with _session_cache_lock:
+        cached = _session_cache.get(key)
+        if cached is not None:
+            _session_cache.move_to_end(key)
+            return cached
+
+    sess = db.get(AISession, session_id)
+    if not sess:
+        raise APIError("NOT_FOUND", "Session not found", status_code=404)
+
+    summary = summarize(load_rubric_frame(db, version=version, session_id=session_id))
+    report = {
+        "session_id": str(session_id),
+        "user_id": str(sess.user_id),
+        "mode": sess.mode,
+        "status": sess.status,
+        "version": version,
+        "summary": summary[0] if summary else None,
+    }
+
+    if sess.status == "closed":
+        with _session_cache_lock:
+            _session_cache[key] = report
+            while len(_session_cache) > _SESSION_CACHE_MAX:
+                _session_cache.popitem(last=False)
+    return report
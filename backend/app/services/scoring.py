@@ -3,6 +3,10 @@ from __future__ import annotations
 import re
 from dataclasses import dataclass
 
+# Stored on every AIEvaluation; bump when the rubric heuristics change, then re-score
+# history with `python -m app.rescore`.
+RUBRIC_VERSION = "2026.10"
+
 _VAGUE_WORDS = {
     "maybe",
     "probably",
@@ -171,40 +175,92 @@ class _Signals:
     contradictions: list[str]
 
 
+_WORD_RE = re.compile(r"[a-zA-Z0-9À-žА-Яа-яІіЇїЄєҐґ]+")
+_DIGIT_RE = re.compile(r"\d")
+# The leading \b of "\b(in|at|...)" is checked in _has_place_like: without it the
+# pattern starts with literals and the regex engine can skip ahead to candidates.
+_PLACE_PREP_RE = re.compile(r"(?:in|at|в|у|bei)\b\s+[A-ZÀ-ŽА-ЯІЇЄҐ]")
+_CITIES = ("berlin", "hamburg", "münchen", "munich", "köln", "cologne", "kyiv", "kiev", "frankfurt")
+_CITY_RE = re.compile(r"\b(" + "|".join(_CITIES) + r")\b")
+
+
+def _needles(*lexicons: set[str]) -> tuple[str, ...]:
+    """
+    Flattens lexicons into one substring-scan tuple. Entries containing a shorter
+    entry are dropped (they can only match where the shorter one already does),
+    and short entries go first since they are the likeliest early hits.
+    """
+    words = set().union(*lexicons)
+    kept = {w for w in words if not any(o != w and o in w for o in words)}
+    return tuple(sorted(kept, key=lambda w: (len(w), w)))
+
+
+# has_time only needs "a month or a time hint", so both share one scan
+_TIME_NEEDLES = _needles(_MONTHS, _TIME_HINTS)
+_ACTION_NEEDLES = _needles(_ACTION_VERBS)
+_RESPONSIBILITY_NEEDLES = _needles(_RESPONSIBILITY_MARKERS)
+_BLAME_NEEDLES = _needles(_BLAME_SHIFT)
+_VAGUE_NEEDLES = _needles(_VAGUE_WORDS)
+
+
 def _norm(s: str) -> str:
-    return re.sub(r"\s+", " ", (s or "").strip().lower())
+    # str.split() splits on the same Unicode whitespace as \s+ and drops the ends
+    return " ".join((s or "").lower().split())
 
 
 def _tokenize(s: str) -> list[str]:
     # keep letters/digits, split everything else
-    return [t for t in re.split(r"[^a-zA-Z0-9À-žА-Яа-яІіЇїЄєҐґ]+", s) if t]
+    return _WORD_RE.findall(s)
+
+
+def _contains_any(txt: str, needles: tuple[str, ...]) -> bool:
+    for n in needles:
+        if n in txt:
+            return True
+    return False
+
+
+def _is_word_char(ch: str) -> bool:
+    # same definition as \w for str patterns
+    return ch.isalnum() or ch == "_"
+
+
+def _has_place_like(content: str, txt: str) -> bool:
+    for m in _PLACE_PREP_RE.finditer(content):
+        start = m.start()
+        if start == 0 or not _is_word_char(content[start - 1]):
+            return True
+    # substring pre-check first: the \b-anchored alternation is slow on long text
+    return _contains_any(txt, _CITIES) and _CITY_RE.search(txt) is not None
+
+
+_CONTRADICTION_WORDS = tuple(dict.fromkeys(w for pair in _CONTRADICTION_PAIRS for w in pair))
 
 
 def _detect_signals(content: str) -> _Signals:
+    """
+    Lexicon scans run on CPython's substring search (str.__contains__), which
+    beats a combined regex alternation or a pure-Python automaton on answers of
+    a few thousand characters; what matters is doing each scan at most once and
+    skipping those whose result can no longer change the signal.
+    """
     txt = _norm(content)
-    tokens = _tokenize(txt)
-    word_count = len(tokens)
+    word_count = len(_tokenize(txt))
 
-    has_numbers = bool(re.search(r"\d", txt))
-    has_month = any(m in txt for m in _MONTHS)
-    has_time_hint = any(h in txt for h in _TIME_HINTS)
-    has_time = has_numbers or has_month or has_time_hint
+    has_numbers = _DIGIT_RE.search(txt) is not None
+    has_time = has_numbers or _contains_any(txt, _TIME_NEEDLES)
 
     # very rough "place-like": mentions city/country words or patterns "in Berlin", "в Киеве"
-    has_place_like = bool(re.search(r"\b(in|at|в|у|bei)\b\s+[A-ZÀ-ŽА-ЯІЇЄҐ]", content)) or bool(
-        re.search(r"\b(berlin|hamburg|münchen|munich|köln|cologne|kyiv|kiev|frankfurt)\b", txt)
-    )
+    has_place_like = _has_place_like(content, txt)
 
-    has_actions = any(v in txt for v in _ACTION_VERBS)
-    responsibility = any(m in txt for m in _RESPONSIBILITY_MARKERS)
-    blame_shift = any(b in txt for b in _BLAME_SHIFT)
+    has_actions = _contains_any(txt, _ACTION_NEEDLES)
+    responsibility = _contains_any(txt, _RESPONSIBILITY_NEEDLES)
+    blame_shift = _contains_any(txt, _BLAME_NEEDLES)
 
-    vagueness = any(w in txt for w in _VAGUE_WORDS)
+    vagueness = _contains_any(txt, _VAGUE_NEEDLES)
 
-    contradictions: list[str] = []
-    for a, b in _CONTRADICTION_PAIRS:
-        if a in txt and b in txt:
-            contradictions.append(f"'{a}' vs '{b}'")
+    present = {w for w in _CONTRADICTION_WORDS if w in txt}
+    contradictions = [f"'{a}' vs '{b}'" for a, b in _CONTRADICTION_PAIRS if a in present and b in present]
 
     return _Signals(
         word_count=word_count,
@@ -0,0 +1,146 @@
+"""
+Open-slot calendar listings.
+
+Both /api/public/slots and /api/booking/slots are hit on every booking-page load
+and serve the same pages, so finished pages (serialized body + ETag) are kept per
+process for SLOT_CACHE_TTL_S. Booking, cancelling and creating slots in this
+process drop them right away; changes made by other processes show up after at
+most the TTL (booking a slot that was taken meanwhile still answers 409).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from app.db.repo import Repo
+from app.domain.models import APIError
+from app.settings import settings
+from app.utils.etag import etag_for, json_bytes
+from app.utils.pagination import MAX_PAGE_SIZE, check_limit, decode_cursor, split_page
+
+DEFAULT_WINDOW = timedelta(days=60)
+MAX_WINDOW = timedelta(days=366)
+# browsers/CDNs revalidate every time; an unchanged calendar costs a 304
+SLOTS_CACHE_CONTROL = "no-cache"
+
+_CACHE_MAX = 1024
+
+
+def _now_utc() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass(frozen=True)
+class SlotPage:
+    payload: bytes  # serialized {"data": [...], "next_cursor": ...}
+    etag: str
+    expires_at: float
+
+
+class SlotListingCache:
+    def __init__(self, ttl_s: float | None = None):
+        self._ttl_s = ttl_s
+        self._pages: dict[tuple, SlotPage] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def ttl(self) -> float:
+        return settings.slot_cache_ttl_s if self._ttl_s is None else self._ttl_s
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: tuple) -> SlotPage | None:
+        page = self._pages.get(key)
+        if page is None or page.expires_at <= time.monotonic():
+            return None
+        return page
+
+    def put(self, key: tuple, page: SlotPage, generation: int) -> None:
+        with self._lock:
+            # built from a read that started before an invalidation: don't keep it
+            if generation != self._generation:
+                return
+            if len(self._pages) >= _CACHE_MAX:
+                now = time.monotonic()
+                self._pages = {k: p for k, p in self._pages.items() if p.expires_at > now}
+                if len(self._pages) >= _CACHE_MAX:
+                    self._pages.clear()
+            self._pages[key] = page
+
+    def invalidate(self) -> None:
+        """Call after committing any change to slot availability."""
+        with self._lock:
+            self._generation += 1
+            self._pages = {}
+
+
+slot_listings = SlotListingCache()
+
+
+def _build_page(
+    db: Session,
+    starts_from: datetime,
+    until: datetime,
+    after: tuple[datetime, UUID] | None,
+    limit: int,
+) -> dict:
+    rows = Repo(db).list_open_slots(starts_from, until, after=after, limit=limit)
+    rows, next_cursor = split_page(rows, limit, lambda s: (s.starts_at_utc, s.id))
+    return {
+        "data": [
+            {
+                "id": str(s.id),
+                "starts_at_utc": s.starts_at_utc.isoformat(),
+                "duration_min": s.duration_min,
+                "title": s.title,
+            }
+            for s in rows
+        ],
+        "next_cursor": next_cursor,
+    }
+
+
+def open_slots_page(
+    db: Session,
+    *,
+    starts_from: datetime | None = None,
+    until: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = 100,
+) -> SlotPage:
+    """A page of open slots in [starts_from (default now), until (default +60 days))."""
+    check_limit(limit)
+    after = decode_cursor(cursor, datetime, UUID) if cursor else None
+
+    key = (starts_from, until, after, limit)
+    cached = slot_listings.get(key)
+    if cached is not None:
+        return cached
+
+    generation = slot_listings.generation
+    if starts_from is not None and starts_from.tzinfo is None:
+        starts_from = starts_from.replace(tzinfo=timezone.utc)
+    if until is not None and until.tzinfo is None:
+        until = until.replace(tzinfo=timezone.utc)
+    window_start = starts_from or _now_utc()
+    window_end = until or window_start + DEFAULT_WINDOW
+    if window_end <= window_start or window_end - window_start > MAX_WINDOW:
+        raise APIError(
+            "INVALID_WINDOW",
+            "Invalid time window",
+            {"max_days": MAX_WINDOW.days},
+            status_code=422,
+        )
+
+    payload = json_bytes(_build_page(db, window_start, window_end, after, limit))
+    page = SlotPage(payload=payload, etag=etag_for(payload), expires_at=time.monotonic() + slot_listings.ttl())
+    slot_listings.put(key, page, generation)
+    return page
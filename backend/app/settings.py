@@ -39,7 +39,27 @@ class Settings(BaseSettings):
 
     # Auth/JWT
     jwt_secret: str = "change-me"
-    jwt_exp_minutes: int = 60
+    # access tokens are short-lived; clients renew them with the refresh token
+    jwt_exp_minutes: int = 15
+    refresh_token_exp_days: int = 30
+    # validate role/status/token version from the token claims instead of loading the user
+    auth_claims_only: bool = True
+    # how often each process re-reads changed token versions from users
+    auth_version_refresh_s: float = 5.0
+    # password hashing runs in its own process pool; beyond max_pending queued hashes login/register answer 503
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 32
+    # pbkdf2 rounds are calibrated at startup to take about this long, never below min_rounds
+    password_hash_target_ms: float = 100.0
+    password_hash_min_rounds: int = 29000
+
+    # Entitlements: users found without units are not re-queried for this long (per process)
+    entitlement_empty_cache_s: float = 5.0
+
+    # Open-slot listings are cached per process for this long (dropped on booking/cancel/create)
+    slot_cache_ttl_s: float = 10.0
+    # how often each process checks catalog_state.version before serving its product snapshot
+    catalog_version_check_s: float = 5.0
 
     # Payments (Stripe)
     stripe_secret_key: str = "sk_test"
@@ -48,10 +68,81 @@ class Settings(BaseSettings):
     # LLM (OpenAI)
     openai_api_key: str = ""
     openai_model: str = "gpt-4.1-mini"
+    openai_base_url: str | None = None
+
+    # LLM HTTP client pool (shared per process, see LLMClientManager)
+    llm_pool_max_connections: int = 50
+    llm_pool_max_keepalive: int = 20
+    llm_keepalive_expiry_s: float = 60.0
+    llm_http2: bool = True
+    llm_timeout_s: float = 30.0
+    llm_connect_timeout_s: float = 5.0
+    llm_max_retries: int = 1
+
+    # LLM endpoint circuit breaker (Responses vs Chat Completions per model)
+    llm_breaker_failure_threshold: int = 3
+    llm_breaker_cooldown_s: float = 300.0
+
+    # LLM bulkhead (app.integrations.llm_dispatch): provider calls in flight per process and per
+    # traffic class (member = /api/ai, public = /api/public/therapy/reply), plus each class's
+    # waiting room; members are served first, a full queue or a longer wait answers 503
+    llm_max_concurrency: int = 24
+    llm_class_concurrency: dict[str, int] = {"member": 24, "public": 8}
+    llm_class_queue: dict[str, int] = {"member": 64, "public": 16}
+    llm_queue_timeout_s: float = 10.0
+
+    # Prompt context per AI turn (app.services.context_builder): token budget per mode for
+    # diagnostic facts + rolling session summary + the most recent messages
+    llm_context_budget_tokens: int = 1200
+    llm_context_budgets: dict[str, int] = {"therapy": 2000}
+    llm_context_recent_messages: int = 6
+    # turns of a public therapy conversation read back from the server-side store per reply
+    therapy_history_turns: int = 12
+    # public conversations untouched this long are deleted (app.services.public_conversations),
+    # checked by the payments worker this often
+    public_conversation_ttl_s: float = 30 * 86400.0
+    public_conversation_purge_interval_s: float = 3600.0
+    # derived diagnostic contexts kept per process (submissions are immutable)
+    diagnostic_cache_size: int = 10000
+    diagnostic_cache_ttl_s: float = 3600.0
 
-    # Rate limits
+    # Question bank: in-memory index, reloaded at most this often per process
+    question_index_ttl_s: float = 300.0
+    # Max questions in a per-session plan (16 bytes each)
+    question_plan_size: int = 512
+
+    # Payments worker: drains payments_events stored by the webhook
+    payment_worker_concurrency: int = 4
+    payment_worker_poll_interval_s: float = 1.0
+    payment_event_max_attempts: int = 8
+
+    # Rate limits: shared through Redis when REDIS_URL is set, per process otherwise
+    # (REDIS_URL also carries entitlement grant notices, see app.services.entitlements)
+    redis_url: str | None = None
     rate_limit_auth: str = "5/minute"
     rate_limit_ai: str = "30/minute"
+    # per-route overrides by limiter name, e.g. {"auth.login": "10/minute"}
+    rate_limits: dict[str, str] = {}
+
+    # Logging: events are buffered and written by a background thread
+    log_buffer_size: int = 10000
+    log_batch_size: int = 256
+    log_flush_interval_s: float = 0.2
+    # share of fast successful requests that are logged; errors and slow requests always are
+    log_request_sample_rate: float = 1.0
+    log_slow_request_ms: float = 1000.0
+
+    # Admission control for /api/public/* (app.http.admission): 503 when this many public requests
+    # are in flight, or a growing share of them while threadpool/event loop queueing delay stays
+    # above the target for a whole interval; signed-in callers and the exempt paths are never shed
+    admission_max_public_inflight: int = 64
+    admission_target_delay_ms: float = 100.0
+    admission_interval_ms: float = 500.0
+    # /api/public/* paths that are never shed, e.g. ["/api/public/checkout"]; only /api/public/ is shed at all
+    admission_exempt_paths: list[str] = []
+
+    # GET /metrics (Prometheus text format); when set, scrapers must send "Authorization: Bearer <token>"
+    metrics_token: str | None = None
 
     model_config = SettingsConfigDict(
         env_file=".env",
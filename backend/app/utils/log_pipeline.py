@@ -0,0 +1,128 @@
+"""
+Buffered log output.
+
+Structured events are appended to a bounded in-memory buffer and written by one
+background thread in batches, rendered as one JSON object per line. Callers (the
+event loop included) never render JSON or block on stdout; when the buffer is
+full new events are dropped and counted instead of slowing requests down.
+
+Request logs may be sampled: errors (status >= 400 or an exception) and slow
+requests are always kept, fast successful ones with LOG_REQUEST_SAMPLE_RATE.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import random
+import sys
+import threading
+from collections import deque
+from typing import IO, Any, Callable
+
+import structlog
+
+from app.settings import settings
+from app.utils.metrics import counter, gauge
+
+LOG_EVENTS_DROPPED = counter("log_events_dropped_total", "Log events dropped because the buffer was full")
+LOG_REQUESTS_SAMPLED_OUT = counter("log_requests_sampled_out_total", "Fast successful requests not logged")
+LOG_BUFFER_DEPTH = gauge("log_buffer_depth", "Log events waiting to be written")
+
+
+class LogPipeline:
+    def __init__(
+        self,
+        stream: Callable[[], IO[str]] = lambda: sys.stdout,
+        *,
+        max_events: int | None = None,
+        batch_size: int | None = None,
+        flush_interval_s: float | None = None,
+    ):
+        self._stream = stream
+        self._max_events = max_events or settings.log_buffer_size
+        self._batch_size = batch_size or settings.log_batch_size
+        self._flush_interval_s = settings.log_flush_interval_s if flush_interval_s is None else flush_interval_s
+        # deque append/popleft are atomic: the hot path takes no lock
+        self._events: deque[dict[str, Any]] = deque()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    # --- producer side ---
+    def submit(self, event: dict[str, Any]) -> bool:
+        if len(self._events) >= self._max_events:
+            LOG_EVENTS_DROPPED.inc()
+            return False
+        self._events.append(event)
+        if self._thread is None:
+            self.start()
+        if len(self._events) >= self._batch_size:
+            self._wake.set()
+        return True
+
+    def __call__(self, _logger, _method_name: str, event_dict: dict[str, Any]):
+        """Final structlog processor: hands the event to the writer instead of rendering it here."""
+        self.submit(event_dict)
+        raise structlog.DropEvent
+
+    def should_log_request(self, status_code: int, duration_ms: float) -> bool:
+        if status_code >= 400 or duration_ms >= settings.log_slow_request_ms:
+            return True
+        rate = settings.log_request_sample_rate
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        LOG_REQUESTS_SAMPLED_OUT.inc()
+        return False
+
+    # --- writer side ---
+    def flush(self) -> int:
+        """Writes everything buffered so far; returns the number of events written."""
+        with self._write_lock:
+            written = 0
+            while self._events:
+                lines = []
+                while self._events and len(lines) < self._batch_size:
+                    lines.append(json.dumps(self._events.popleft(), default=str, ensure_ascii=False))
+                stream = self._stream()
+                stream.write("\n".join(lines) + "\n")
+                stream.flush()
+                written += len(lines)
+            return written
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(self._flush_interval_s)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:  # noqa: BLE001
+                # a broken stream must not kill the writer; the events are lost
+                self._events.clear()
+        self.flush()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Stops the writer after writing what is buffered."""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            thread.join(timeout)
+        else:
+            self.flush()
+
+
+log_pipeline = LogPipeline()
+# bound to the process-wide pipeline only: other instances (tests, benchmarks) stay off /metrics
+LOG_BUFFER_DEPTH.set_function(lambda: float(len(log_pipeline._events)))
+atexit.register(log_pipeline.stop)
@@ -0,0 +1,254 @@
+"""
+In-process metrics primitives (counters, gauges, histograms).
+
+Recording is lock-light: every thread writes into its own shard, so the hot
+path is a thread-local lookup plus a dict update. Shards are merged only when
+somebody reads the values; shards of threads that have exited (idle threadpool
+workers do) are folded into one retired shard then, so the list stays as long
+as the number of live threads.
+"""
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+DEFAULT_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: list[tuple[threading.Thread, dict]] = []
+        self._retired: dict = {}
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            with self._shards_lock:
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+        return shard
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _merge(self, into: dict, key: tuple[str, ...], value) -> None:
+        raise NotImplementedError
+
+    def _shard_items(self):
+        with self._shards_lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    # a dead thread no longer writes: fold its shard in and drop it
+                    for key, value in shard.items():
+                        self._merge(self._retired, key, value)
+            self._shards = live
+            retired = {k: list(v) if isinstance(v, list) else v for k, v in self._retired.items()}
+            shards = [shard for _, shard in live]
+        yield from retired.items()
+        for shard in shards:
+            # list() of a dict is atomic under the GIL
+            yield from list(shard.items())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0.0) + amount
+
+    def _merge(self, into: dict, key: tuple[str, ...], value: float) -> None:
+        into[key] = into.get(key, 0.0) + value
+
+    def collect(self) -> dict[tuple[str, ...], float]:
+        out: dict[tuple[str, ...], float] = {}
+        for key, value in self._shard_items():
+            out[key] = out.get(key, 0.0) + value
+        return out
+
+    def value(self, **labels: str) -> float:
+        return self.collect().get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    """
+    Last-write-wins gauge. Either set explicitly or backed by a callback
+    that is evaluated at collection time (e.g. pool statistics).
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        self._fn: Callable[[], dict[tuple[str, ...], float] | float] | None = None
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn: Callable[[], dict[tuple[str, ...], float] | float]) -> None:
+        self._fn = fn
+
+    def collect(self) -> dict[tuple[str, ...], float]:
+        if self._fn is not None:
+            value = self._fn()
+            return dict(value) if isinstance(value, dict) else {(): float(value)}
+        return dict(self._values)
+
+    def value(self, **labels: str) -> float:
+        return self.collect().get(self._key(labels), 0.0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        shard = self._shard()
+        key = self._key(labels)
+        series = shard.get(key)
+        if series is None:
+            # [bucket counts..., +Inf count, sum]
+            series = [0] * (len(self.buckets) + 1) + [0.0]
+            shard[key] = series
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def _merge(self, into: dict, key: tuple[str, ...], series: list) -> None:
+        acc = into.get(key)
+        if acc is None:
+            into[key] = list(series)
+        else:
+            for i, v in enumerate(series):
+                acc[i] += v
+
+    def collect(self) -> dict[tuple[str, ...], list]:
+        out: dict[tuple[str, ...], list] = {}
+        for key, series in self._shard_items():
+            self._merge(out, key, series)
+        return out
+
+    def count(self, **labels: str) -> int:
+        series = self.collect().get(self._key(labels))
+        return int(sum(series[:-1])) if series else 0
+
+    def sum(self, **labels: str) -> float:
+        series = self.collect().get(self._key(labels))
+        return float(series[-1]) if series else 0.0
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            existing = self._metrics.get(name)
+            if existing is not None:
+                if not isinstance(existing, cls):
+                    raise ValueError(f"Metric {name} already registered as {existing.kind}")
+                return existing
+            metric = cls(name, *args, **kwargs)
+            self._metrics[name] = metric
+            return metric
+
+    def metrics(self) -> list[_Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+    return REGISTRY._get_or_create(Counter, name, help_text, labelnames)
+
+
+def gauge(name: str, help_text: str, labelnames: Iterable[str] = ()) -> Gauge:
+    return REGISTRY._get_or_create(Gauge, name, help_text, labelnames)
+
+
+def histogram(
+    name: str,
+    help_text: str,
+    labelnames: Iterable[str] = (),
+    buckets: Iterable[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    return REGISTRY._get_or_create(Histogram, name, help_text, labelnames, buckets=buckets)
+
+
+# -----------------------------
+# Text exposition (Prometheus format 0.0.4)
+# -----------------------------
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: tuple[tuple[str, str], ...] = ()) -> str:
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(str(v))}"' for n, v in pairs) + "}"
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(registry: Registry = REGISTRY) -> str:
+    lines: list[str] = []
+    for metric in sorted(registry.metrics(), key=lambda m: m.name):
+        help_text = metric.help.replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {metric.name} {help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        if isinstance(metric, Histogram):
+            for key, series in sorted(metric.collect().items()):
+                cumulative = 0
+                for bound, count in zip((*metric.buckets, float("inf")), series[:-1]):
+                    cumulative += count
+                    le = (("le", _num(bound)),)
+                    lines.append(f"{metric.name}_bucket{_labels(metric.labelnames, key, le)} {cumulative}")
+                lines.append(f"{metric.name}_sum{_labels(metric.labelnames, key)} {_num(series[-1])}")
+                lines.append(f"{metric.name}_count{_labels(metric.labelnames, key)} {cumulative}")
+        else:
+            for key, value in sorted(metric.collect().items()):
+                lines.append(f"{metric.name}{_labels(metric.labelnames, key)} {_num(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,79 @@
+"""
+Keyset (cursor) pagination.
+
+Lists are ordered by a unique key such as (created_at, id). A page is fetched
+with `WHERE (created_at, id) > (:last_created_at, :last_id) ORDER BY created_at,
+id LIMIT n + 1`, which a matching composite index answers without scanning the
+rows before it (unlike OFFSET). The extra row only tells whether there is a next
+page. Clients get the last key of a page as an opaque cursor and send it back
+unchanged.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Callable, Sequence, TypeVar
+from uuid import UUID
+
+from sqlalchemy import Select, tuple_
+
+from app.domain.models import APIError
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+T = TypeVar("T")
+
+_PARSERS: dict[type, Callable[[str], Any]] = {
+    datetime: datetime.fromisoformat,
+    UUID: UUID,
+    int: int,
+    str: str,
+}
+
+
+def encode_cursor(*key: Any) -> str:
+    raw = "|".join(v.isoformat() if isinstance(v, datetime) else str(v) for v in key).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> tuple:
+    """Parses a cursor made by encode_cursor() back into a key of the given types."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        parts = raw.split("|")
+        if len(parts) != len(types):
+            raise ValueError("wrong number of key parts")
+        return tuple(_PARSERS[t](p) for t, p in zip(types, parts))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise APIError("INVALID_CURSOR", "Malformed cursor", status_code=422) from exc
+
+
+def check_limit(limit: int) -> None:
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise APIError("INVALID_LIMIT", "limit out of range", {"max": MAX_PAGE_SIZE}, status_code=422)
+
+
+def keyset(
+    stmt: Select,
+    columns: Sequence[Any],
+    after: tuple | None,
+    limit: int,
+    *,
+    descending: bool = False,
+) -> Select:
+    """Orders `stmt` by `columns`, continues after the key `after` and fetches limit + 1 rows."""
+    if after is not None:
+        key, last = tuple_(*columns), tuple_(*after)
+        stmt = stmt.where(key < last if descending else key > last)
+    order = [c.desc() for c in columns] if descending else list(columns)
+    return stmt.order_by(*order).limit(limit + 1)
+
+
+def split_page(rows: Sequence[T], limit: int, key: Callable[[T], tuple]) -> tuple[list[T], str | None]:
+    """Cuts the limit + 1 rows from keyset() down to a page and the cursor of the next one."""
+    page = list(rows[:limit])
+    next_cursor = encode_cursor(*key(page[-1])) if len(rows) > limit else None
+    return page, next_cursor
@@ -0,0 +1,55 @@
+"""
+Token counting for prompt budgets.
+
+Uses tiktoken (o200k_base, the gpt-4o/4.1 family encoding) when it is installed
+(`pip install .[tokenizer]`); otherwise an estimate of one token per three
+characters, which errs on the high side for German and Russian text.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+from functools import lru_cache
+from typing import Any
+
+_TIKTOKEN_AVAILABLE = importlib.util.find_spec("tiktoken") is not None
+_CHARS_PER_TOKEN = 3
+ENCODING_NAME = "o200k_base"
+
+
+@lru_cache(maxsize=1)
+def _encoding() -> Any | None:
+    if not _TIKTOKEN_AVAILABLE:
+        return None
+    import tiktoken
+
+    try:
+        return tiktoken.get_encoding(ENCODING_NAME)
+    except Exception:  # noqa: BLE001
+        # encoding files are downloaded on first use; offline hosts estimate instead
+        return None
+
+
+def tokenizer_name() -> str:
+    return ENCODING_NAME if _encoding() is not None else f"estimate({_CHARS_PER_TOKEN} chars/token)"
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    enc = _encoding()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    return -(-len(text) // _CHARS_PER_TOKEN)
+
+
+def truncate_tokens(text: str, max_tokens: int, ellipsis: str = "…") -> str:
+    """Cuts `text` to at most `max_tokens` tokens (ellipsis included)."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    enc = _encoding()
+    if enc is not None:
+        return enc.decode(enc.encode(text, disallowed_special=())[: max(0, max_tokens - 1)]).rstrip() + ellipsis
+    return text[: max(0, max_tokens - 1) * _CHARS_PER_TOKEN].rstrip() + ellipsis
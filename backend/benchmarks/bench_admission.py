@@ -0,0 +1,103 @@
+"""
+Public API goodput under overload, with and without admission control.
+
+A sync endpoint (threadpool, --work-ms of blocking work per request, standing
+in for DB + LLM time) is offered --rps requests per second for --seconds,
+more than --threads threads can serve. Clients give up after --deadline-ms.
+Requests run in-process through httpx's ASGI transport; no server or database
+needed.
+
+off: every request queues in the threadpool (the original behaviour).
+on: app.http.admission.AdmissionMiddleware with its queueing-delay probe.
+
+"late" answers are work done for clients that had already left.
+
+    python -m benchmarks.bench_admission --rps 400 --threads 20 --work-ms 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+import anyio
+import httpx
+from fastapi import FastAPI
+
+from app.http.admission import AdmissionController, AdmissionMiddleware
+
+
+def _app(args, controller: AdmissionController | None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/public/work")
+    def work():
+        time.sleep(args.work_ms / 1000)
+        return {"data": {"ok": True}}
+
+    if controller is not None:
+        app.add_middleware(AdmissionMiddleware, controller=controller)
+    return app
+
+
+async def _scenario(args, controller: AdmissionController | None) -> dict:
+    anyio.to_thread.current_default_thread_limiter().total_tokens = args.threads
+    if controller is not None:
+        controller.start()
+    counts = {"ok": 0, "late": 0, "shed": 0}
+    transport = httpx.ASGITransport(app=_app(args, controller))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one() -> None:
+            started = time.perf_counter()
+            resp = await client.get("/api/public/work")
+            if resp.status_code == 503:
+                counts["shed"] += 1
+            elif time.perf_counter() - started <= args.deadline_ms / 1000:
+                counts["ok"] += 1
+            else:
+                counts["late"] += 1
+
+        tasks = []
+        for _ in range(int(args.rps * args.seconds)):
+            tasks.append(asyncio.create_task(one()))
+            await asyncio.sleep(1 / args.rps)
+        await asyncio.gather(*tasks)
+
+    if controller is not None:
+        await controller.aclose()
+    return counts
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rps", type=float, default=400)
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--threads", type=int, default=20)
+    ap.add_argument("--work-ms", type=float, default=100)
+    ap.add_argument("--deadline-ms", type=float, default=1000)
+    ap.add_argument("--max-inflight", type=int, default=64)
+    ap.add_argument("--target-delay-ms", type=float, default=100)
+    args = ap.parse_args()
+
+    capacity = args.threads / (args.work_ms / 1000)
+    print(
+        f"offered {args.rps:.0f} rps for {args.seconds:.0f}s, capacity ~{capacity:.0f} rps, "
+        f"deadline {args.deadline_ms:.0f} ms"
+    )
+    print(f"{'admission':>9} | {'in time':>7} {'late':>6} {'503':>6} | {'goodput':>8}")
+    for name, controller in (
+        ("off", None),
+        ("on", AdmissionController(max_inflight=args.max_inflight, target_delay_s=args.target_delay_ms / 1000)),
+    ):
+        counts = asyncio.run(_scenario(args, controller))
+        print(
+            f"{name:>9} | {counts['ok']:>7} {counts['late']:>6} {counts['shed']:>6} | "
+            f"{counts['ok'] / args.seconds:>6.0f}/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
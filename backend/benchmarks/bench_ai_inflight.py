@@ -0,0 +1,196 @@
+"""
+POST /api/ai/sessions/{id}/messages under load: requests in flight vs DB connections checked out.
+
+Drives the real app (app.main:app) through httpx's ASGI transport, so every
+request goes through routing, auth, the rate limiter, the LLM bulkhead,
+send_message -> process_user_message_async, AsyncRepo and AsyncSessionLocal.
+Only the provider is stubbed: AsyncOpenAI.responses.create() answers after
+--llm-ms. For each --pool-size, AsyncSessionLocal is bound to an engine built
+like app.db.session's (same pool class, max_overflow=0), and a sampler reads
+pool.checkedout() while the requests run.
+
+With the connection released before the LLM call, "in LLM" reaches the number
+of requests while "checked out" stays at or below the pool size. A connection
+held across the LLM await caps "in LLM" at the pool size and stretches the run.
+
+Needs a database with the schema applied (DATABASE_URL, as for the app). Rows it
+creates are removed.
+
+    python -m benchmarks.bench_ai_inflight --requests 400 --pool-size 5 15 30 --llm-ms 1500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+from types import SimpleNamespace
+from uuid import UUID, uuid4
+
+import httpx
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.instrumentation import TimedAsyncAdaptedQueuePool
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.domain.models import AIEvaluation, AIMessage, AISession, Entitlement, Order, Product, User
+from app.integrations.llm_openai import llm_clients
+from app.main import app
+from app.security.auth import create_access_token
+from app.services import entitlements
+from app.services.entitlements import EmptyBalanceCache
+from app.settings import settings
+
+_SAMPLE_EVERY_S = 0.005
+
+
+class _Probe:
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.in_llm = 0
+        self.peak = Counter()
+
+    def sample(self, checked_out: int) -> None:
+        for key, value in (("in_flight", self.in_flight), ("in_llm", self.in_llm), ("checked_out", checked_out)):
+            self.peak[key] = max(self.peak[key], value)
+
+
+class _SlowResponses:
+    def __init__(self, probe: _Probe, delay_s: float):
+        self._probe = probe
+        self._delay_s = delay_s
+
+    async def create(self, **_kwargs):
+        self._probe.in_llm += 1
+        try:
+            await asyncio.sleep(self._delay_s)
+        finally:
+            self._probe.in_llm -= 1
+        return SimpleNamespace(output_text="Understood. What would you do differently today?", usage=None)
+
+
+class SlowAsyncOpenAI:
+    """Stands in for AsyncOpenAI: responses.create() answers after a fixed delay."""
+
+    def __init__(self, probe: _Probe, delay_s: float):
+        self.responses = _SlowResponses(probe, delay_s)
+
+
+def _seed(sessions: int, credits: int) -> tuple[UUID, UUID, list[UUID]]:
+    db = SessionLocal()
+    tag = uuid4().hex[:8]
+    product = Product(code=f"BENCH_{tag}", type="ai_pack", name_de="Bench", name_en="Bench", price_cents=0)
+    user = User(email=f"bench-ai-{tag}@example.com", password_hash="!", name="Bench")
+    db.add_all([product, user])
+    db.flush()
+    order = Order(user_id=user.id, product_id=product.id, amount_cents=0, currency="EUR", provider_ref=f"bench_{tag}")
+    db.add(order)
+    db.flush()
+    db.add(Entitlement(user_id=user.id, kind="ai_credits", qty_total=credits, source_order_id=order.id))
+    # one AI session per request, so requests never queue on each other's session row
+    rows = [AISession(user_id=user.id, mode="practice", locale="de") for _ in range(sessions)]
+    db.add_all(rows)
+    db.commit()
+    ids = (product.id, user.id, [row.id for row in rows])
+    db.close()
+    return ids
+
+
+def _cleanup(product_id: UUID, user_id: UUID, session_ids: list[UUID]) -> None:
+    db = SessionLocal()
+    db.execute(delete(AIEvaluation).where(AIEvaluation.session_id.in_(session_ids)))
+    db.execute(delete(AIMessage).where(AIMessage.session_id.in_(session_ids)))
+    db.execute(delete(AISession).where(AISession.id.in_(session_ids)))
+    db.execute(delete(Entitlement).where(Entitlement.user_id == user_id))
+    db.execute(delete(Order).where(Order.user_id == user_id))
+    db.execute(delete(User).where(User.id == user_id))
+    db.execute(delete(Product).where(Product.id == product_id))
+    db.commit()
+    db.close()
+
+
+async def _run(session_ids: list[UUID], token: str, *, pool_size: int, llm_ms: float) -> dict:
+    engine = create_async_engine(
+        settings.database_url,
+        pool_pre_ping=True,
+        poolclass=TimedAsyncAdaptedQueuePool,
+        pool_size=pool_size,
+        max_overflow=0,
+    )
+    AsyncSessionLocal.configure(bind=engine)
+    probe = _Probe()
+    llm_clients._async, llm_clients._async_key = SlowAsyncOpenAI(probe, llm_ms / 1000), settings.openai_api_key
+    statuses: Counter[int] = Counter()
+
+    async def sampler() -> None:
+        while True:
+            probe.sample(engine.sync_engine.pool.checkedout())
+            await asyncio.sleep(_SAMPLE_EVERY_S)
+
+    async def send(http: httpx.AsyncClient, session_id: UUID) -> None:
+        probe.in_flight += 1
+        try:
+            resp = await http.post(
+                f"/api/ai/sessions/{session_id}/messages",
+                json={"content": "I drove after two beers and I take responsibility for it."},
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            statuses[resp.status_code] += 1
+        finally:
+            probe.in_flight -= 1
+
+    transport = httpx.ASGITransport(app=app)
+    sampling = asyncio.create_task(sampler())
+    started = time.perf_counter()
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+            await asyncio.gather(*(send(http, session_id) for session_id in session_ids))
+    finally:
+        elapsed = time.perf_counter() - started
+        sampling.cancel()
+        await engine.dispose()
+
+    return {
+        "in_flight": probe.peak["in_flight"],
+        "in_llm": probe.peak["in_llm"],
+        "checked_out": probe.peak["checked_out"],
+        "elapsed_s": round(elapsed, 2),
+        "req_per_s": round(len(session_ids) / elapsed, 1),
+        "statuses": dict(statuses),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--pool-size", type=int, nargs="+", default=[5, 15, 30])
+    parser.add_argument("--llm-ms", type=float, default=1500.0)
+    args = parser.parse_args()
+
+    # the load comes from one account: lift its rate limit and let the bulkhead admit every call
+    settings.openai_api_key = settings.openai_api_key or "bench"
+    settings.redis_url = None
+    settings.rate_limits = {**settings.rate_limits, "ai.messages": f"{args.requests * 10}/second"}
+    settings.llm_max_concurrency = args.requests
+    settings.llm_class_concurrency = {**settings.llm_class_concurrency, "member": args.requests}
+    entitlements.empty_balances = EmptyBalanceCache()
+
+    runs = len(args.pool_size)
+    product_id, user_id, session_ids = _seed(args.requests * runs, credits=args.requests * runs)
+    token = create_access_token(str(user_id), "user", token_version=0)
+    try:
+        print(f"{'pool':>5} {'in-flight':>10} {'in LLM':>7} {'checked out':>12} {'elapsed s':>10} {'req/s':>8}  statuses")
+        for i, pool_size in enumerate(args.pool_size):
+            batch = session_ids[i * args.requests : (i + 1) * args.requests]
+            r = asyncio.run(_run(batch, token, pool_size=pool_size, llm_ms=args.llm_ms))
+            print(
+                f"{pool_size:>5} {r['in_flight']:>10} {r['in_llm']:>7} {r['checked_out']:>12}"
+                f" {r['elapsed_s']:>10} {r['req_per_s']:>8}  {r['statuses']}"
+            )
+    finally:
+        _cleanup(product_id, user_id, session_ids)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Prompt context size per turn as a conversation grows.
+
+therapy: the original prompt (str(diagnostic_context) + last 8 history items
+verbatim) vs app.services.context_builder.therapy_context().
+training: the whole session history sent verbatim (what adding history without
+a budget would cost) vs session_context() with the rolling summary.
+
+Tokens are counted with app.utils.tokens (tiktoken o200k_base when installed,
+an estimate otherwise; the script prints which). Messages live in memory; no
+database or API key needed.
+
+    python -m benchmarks.bench_context_size --turns 80 --answer-words 120
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+from app.services.context_builder import session_context, therapy_context
+from app.utils.tokens import count_tokens, tokenizer_name
+
+_WORDS = (
+    "ich habe damals nach der feier getrunken und bin trotzdem gefahren das war falsch "
+    "heute trinke ich keinen alkohol mehr seit acht monaten meine familie unterstützt mich "
+    "я понимаю свою ответственность и больше не сажусь за руль после алкоголя"
+).split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    sentences, out = [], []
+    for w in rng.choices(_WORDS, k=words):
+        out.append(w)
+        if len(out) >= rng.randint(8, 16):
+            sentences.append(" ".join(out).capitalize() + ".")
+            out = []
+    if out:
+        sentences.append(" ".join(out).capitalize() + ".")
+    return " ".join(sentences)
+
+
+class MemoryRepo:
+    def __init__(self):
+        self.messages: list = []
+        self.summary = None
+
+    def add(self, role: str, content: str) -> None:
+        created = datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=len(self.messages))
+        self.messages.append(SimpleNamespace(id=uuid4(), role=role, content=content, created_at=created))
+
+    def get_context_summary(self, _session_id):
+        return self.summary
+
+    def list_messages(self, _session_id, *, after=None, limit=50):
+        start = 0
+        if after is not None:
+            start = next((i + 1 for i, m in enumerate(self.messages) if (m.created_at, m.id) == after), 0)
+        return self.messages[start : start + limit + 1]
+
+    def store_context_summary(self, _session_id, summary, last_created_at, last_message_id):
+        self.summary = SimpleNamespace(
+            context_summary=summary,
+            summary_last_created_at=last_created_at,
+            summary_last_message_id=last_message_id,
+        )
+
+
+def legacy_therapy_context(diagnostic_context: dict, history: list[dict]) -> str:
+    """The prompt part generate_therapy_reply() used to build, kept for comparison."""
+    snippets = []
+    for msg in history[-8:]:
+        role = "Клиент" if msg.get("role") == "user" else "Эксперт"
+        snippets.append(f"{role}: {msg.get('content', '').strip()}")
+    return f"Контекст диагностики: {diagnostic_context}\n\n" + "Недавняя история диалога:\n" + "\n".join(snippets)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--turns", type=int, default=80)
+    ap.add_argument("--answer-words", type=int, default=120)
+    ap.add_argument("--reply-words", type=int, default=90)
+    args = ap.parse_args()
+
+    rng = random.Random(5)
+    diagnostic = {
+        "reasons": ["alcohol", "points"],
+        "goal": _text(rng, 60),
+        "situation": _text(rng, 250),
+        "history": _text(rng, 250),
+        "focus": ["Trigger: alcohol", "Ziel", "Rückfallrisiko senken"],
+    }
+    history: list[dict] = []
+    repo, session_id = MemoryRepo(), uuid4()
+    report = {1, 5, 10, 20, 40, args.turns}
+    build_us = {"therapy": 0.0, "training": 0.0}
+
+    print(f"tokenizer: {tokenizer_name()}")
+    print(f"{'turn':>5} | {'therapy legacy':>14} {'packed':>7} | {'training full':>13} {'rolling':>8}")
+    for turn in range(1, args.turns + 1):
+        legacy = count_tokens(legacy_therapy_context(diagnostic, history))
+        t0 = time.perf_counter()
+        packed = count_tokens(therapy_context(diagnostic, history).render("ru"))
+        build_us["therapy"] += (time.perf_counter() - t0) * 1e6
+
+        full = count_tokens("\n".join(f"{m.role}: {m.content}" for m in repo.messages))
+        t0 = time.perf_counter()
+        rolling = count_tokens(session_context(repo, session_id, "practice").render("de"))
+        build_us["training"] += (time.perf_counter() - t0) * 1e6
+
+        if turn in report:
+            print(f"{turn:>5} | {legacy:>14} {packed:>7} | {full:>13} {rolling:>8}")
+
+        answer, reply = _text(rng, args.answer_words), _text(rng, args.reply_words)
+        history = (history + [{"role": "user", "content": answer}, {"role": "assistant", "content": reply}])[-30:]
+        repo.add("user", answer)
+        repo.add("assistant", reply)
+
+    for name, total in build_us.items():
+        print(f"{name}: {total / args.turns:.0f} us per context build")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Diagnostic submission reads per public therapy conversation.
+
+Each conversation sends --turns replies that refer to the same diagnostic
+submission. uncached: the route's original lookup (one read and derivation
+per turn); cached: app.services.diagnostic_context.DiagnosticContextCache.
+The loader sleeps --db-ms to stand in for a database round trip; no database
+needed.
+
+    python -m benchmarks.bench_diagnostic_context --conversations 200 --turns 20 --db-ms 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from types import SimpleNamespace
+from uuid import uuid4
+
+from app.services.diagnostic_context import DiagnosticContextCache, derive
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--conversations", type=int, default=200)
+    ap.add_argument("--turns", type=int, default=20)
+    ap.add_argument("--db-ms", type=float, default=2.0)
+    args = ap.parse_args()
+
+    rows = {
+        uuid4(): SimpleNamespace(
+            reasons=["alcohol", "points"],
+            goal="Führerschein zurück " * 10,
+            situation="Kontrolle nach einer Feier " * 20,
+            history="Seit acht Monaten kein Alkohol " * 10,
+            recommended_plan="pro",
+        )
+        for _ in range(args.conversations)
+    }
+    reads = {"uncached": 0, "cached": 0}
+
+    def loader(name):
+        def load(submission_id):
+            reads[name] += 1
+            time.sleep(args.db_ms / 1000)
+            return rows.get(submission_id)
+
+        return load
+
+    total_turns = args.conversations * args.turns
+    timings = {}
+
+    load = loader("uncached")
+    t0 = time.perf_counter()
+    for sid in rows:
+        for _ in range(args.turns):
+            derive(load(sid))
+    timings["uncached"] = time.perf_counter() - t0
+
+    load, cache = loader("cached"), DiagnosticContextCache(max_entries=10000, ttl_s=3600)
+    t0 = time.perf_counter()
+    for sid in rows:
+        for _ in range(args.turns):
+            cache.get(sid, load)
+    timings["cached"] = time.perf_counter() - t0
+
+    print(f"{args.conversations} conversations x {args.turns} turns, {args.db_ms} ms per read")
+    for name in ("uncached", "cached"):
+        print(
+            f"{name:>8}: {reads[name]:>6} reads, {reads[name] / args.conversations:.1f} per conversation, "
+            f"{timings[name] / total_turns * 1e6:.0f} us per turn"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Entitlement consumption under concurrency: the original SELECT ... FOR UPDATE +
+ORM update vs the single conditional UPDATE ... RETURNING
+(app.services.entitlements.take), including the empty-balance short circuit.
+
+Every consumer thread takes one unit per transaction from the same user, like
+parallel AI messages from one account; "empty" consumers hammer an account
+without credits. Needs a database with the schema applied (Postgres for real
+numbers; an sqlite file URL works as a smoke test). Rows it creates are removed.
+
+    python -m benchmarks.bench_entitlements --database-url postgresql+psycopg://... --threads 32 --takes 4000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from uuid import UUID, uuid4
+
+from sqlalchemy import create_engine, delete, or_, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db.repo import Repo
+from app.domain.models import Entitlement, Order, Product, User
+from app.services import entitlements
+from app.services.entitlements import EmptyBalanceCache
+from app.settings import settings
+
+
+def legacy_consume(db: Session, user_id: UUID, kind: str) -> bool:
+    """The implementation entitlements.take() replaced, kept verbatim for comparison."""
+    now = datetime.now(timezone.utc)
+    ent = db.scalar(
+        select(Entitlement)
+        .where(
+            Entitlement.user_id == user_id,
+            Entitlement.kind == kind,
+            Entitlement.qty_used < Entitlement.qty_total,
+            Entitlement.valid_from <= now,
+            or_(Entitlement.valid_to.is_(None), Entitlement.valid_to >= now),
+        )
+        .order_by(Entitlement.valid_to.is_(None), Entitlement.valid_to, Entitlement.created_at)
+        .with_for_update()
+    )
+    if not ent:
+        return False
+    ent.qty_used += 1
+    return True
+
+
+def current_consume(db: Session, user_id: UUID, kind: str) -> bool:
+    return entitlements.take(Repo(db), user_id, kind) is not None
+
+
+def _seed(factory: sessionmaker, *, grants: int, qty: int) -> tuple[UUID, UUID, UUID]:
+    db = factory()
+    tag = uuid4().hex[:8]
+    product = Product(code=f"BENCH_{tag}", type="ai_pack", name_de="Bench", name_en="Bench", price_cents=0)
+    rich = User(email=f"bench-rich-{tag}@example.com", password_hash="!", name="Bench")
+    empty = User(email=f"bench-empty-{tag}@example.com", password_hash="!", name="Bench")
+    db.add_all([product, rich, empty])
+    db.flush()
+    now = datetime.now(timezone.utc)
+    for i in range(grants):
+        order = Order(user_id=rich.id, product_id=product.id, amount_cents=0, currency="EUR", provider_ref=f"bench_{uuid4().hex}")
+        db.add(order)
+        db.flush()
+        db.add(
+            Entitlement(
+                user_id=rich.id,
+                kind="ai_credits",
+                qty_total=qty,
+                valid_to=now + timedelta(days=i + 1),
+                source_order_id=order.id,
+            )
+        )
+    db.commit()
+    ids = (product.id, rich.id, empty.id)
+    db.close()
+    return ids
+
+
+def _cleanup(factory: sessionmaker, product_id: UUID, user_ids: tuple[UUID, ...]) -> None:
+    db = factory()
+    db.execute(delete(Entitlement).where(Entitlement.user_id.in_(user_ids)))
+    db.execute(delete(Order).where(Order.product_id == product_id))
+    db.execute(delete(User).where(User.id.in_(user_ids)))
+    db.execute(delete(Product).where(Product.id == product_id))
+    db.commit()
+    db.close()
+
+
+def _run(factory: sessionmaker, consume, user_id: UUID, *, threads: int, takes: int) -> dict:
+    def one(_i: int) -> bool:
+        db = factory()
+        try:
+            ok = consume(db, user_id, "ai_credits")
+            db.commit()
+            return ok
+        finally:
+            db.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        taken = sum(pool.map(one, range(takes)))
+    elapsed = time.perf_counter() - started
+    return {"taken": taken, "elapsed_s": round(elapsed, 3), "takes_per_s": round(takes / elapsed, 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=settings.database_url)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--takes", type=int, default=4000)
+    parser.add_argument("--grants", type=int, default=3, help="entitlement rows of the consuming user")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url, pool_size=args.threads, max_overflow=0)
+    factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    # enough units for both runs; every take succeeds, so the runs compare the same work
+    qty = -(-args.takes * 2 // args.grants)
+    product_id, rich_id, empty_id = _seed(factory, grants=args.grants, qty=qty)
+    try:
+        for name, consume in (("legacy", legacy_consume), ("current", current_consume)):
+            entitlements.empty_balances = EmptyBalanceCache()
+            print(name, "with credits", _run(factory, consume, rich_id, threads=args.threads, takes=args.takes))
+            print(name, "no credits  ", _run(factory, consume, empty_id, threads=args.threads, takes=args.takes))
+    finally:
+        _cleanup(factory, product_id, (rich_id, empty_id))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Member reply latency during a public traffic spike, with and without the LLM bulkhead.
+
+The provider is simulated: it serves --provider-slots calls at a time, each
+taking --llm-ms, and queues the rest in arrival order (what a rate-limited
+account looks like from here). A steady stream of member calls runs while a
+burst of --public-burst public calls arrives at once.
+
+shared: every call goes straight to the provider (the original behaviour).
+bulkhead: calls go through app.integrations.llm_dispatch.LLMBulkhead sized to
+the provider, with the public share and queue from the flags.
+
+    python -m benchmarks.bench_llm_bulkhead --public-burst 200 --members 40 --llm-ms 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.domain.models import APIError
+from app.integrations.llm_dispatch import MEMBER, PUBLIC, LLMBulkhead
+
+
+def _pct(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def _scenario(args, bulkhead: LLMBulkhead | None) -> dict:
+    provider = asyncio.Semaphore(args.provider_slots)
+    latency: dict[str, list[float]] = {MEMBER: [], PUBLIC: []}
+    rejected = {MEMBER: 0, PUBLIC: 0}
+
+    async def call(traffic: str) -> None:
+        started = time.perf_counter()
+        try:
+            slot = await bulkhead.acquire_async(traffic) if bulkhead is not None else None
+        except APIError:
+            rejected[traffic] += 1
+            return
+        try:
+            async with provider:
+                await asyncio.sleep(args.llm_ms / 1000)
+        finally:
+            if slot is not None:
+                slot.release()
+        latency[traffic].append(time.perf_counter() - started)
+
+    async def members() -> None:
+        tasks = []
+        for _ in range(args.members):
+            tasks.append(asyncio.create_task(call(MEMBER)))
+            await asyncio.sleep(args.member_gap_ms / 1000)
+        await asyncio.gather(*tasks)
+
+    async def burst() -> None:
+        await asyncio.sleep(args.llm_ms / 1000)
+        await asyncio.gather(*(call(PUBLIC) for _ in range(args.public_burst)))
+
+    await asyncio.gather(members(), burst())
+    return {"latency": latency, "rejected": rejected}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--provider-slots", type=int, default=16)
+    ap.add_argument("--llm-ms", type=float, default=200.0)
+    ap.add_argument("--members", type=int, default=40)
+    ap.add_argument("--member-gap-ms", type=float, default=25.0)
+    ap.add_argument("--public-burst", type=int, default=200)
+    ap.add_argument("--public-slots", type=int, default=4)
+    ap.add_argument("--public-queue", type=int, default=16)
+    ap.add_argument("--timeout-s", type=float, default=10.0)
+    args = ap.parse_args()
+
+    bulkhead = LLMBulkhead(
+        max_concurrency=args.provider_slots,
+        class_limits={MEMBER: args.provider_slots, PUBLIC: args.public_slots},
+        queue_limits={MEMBER: args.members, PUBLIC: args.public_queue},
+        timeout_s=args.timeout_s,
+    )
+    print(
+        f"provider: {args.provider_slots} slots x {args.llm_ms:.0f} ms; "
+        f"{args.members} member calls, burst of {args.public_burst} public calls"
+    )
+    print(f"{'':>9} | {'member p50':>10} {'p95':>7} {'max':>7} | {'public ok':>9} {'p95':>7} {'503':>5}")
+    for name, bh in (("shared", None), ("bulkhead", bulkhead)):
+        result = asyncio.run(_scenario(args, bh))
+        member, public = result["latency"][MEMBER], result["latency"][PUBLIC]
+        print(
+            f"{name:>9} | {statistics.median(member) * 1000:>8.0f}ms {_pct(member, 0.95) * 1000:>5.0f}ms "
+            f"{max(member) * 1000:>5.0f}ms | {len(public):>9} {_pct(public, 0.95) * 1000:>5.0f}ms "
+            f"{result['rejected'][PUBLIC]:>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
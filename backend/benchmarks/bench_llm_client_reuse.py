@@ -0,0 +1,138 @@
+"""
+Micro-benchmark: new OpenAI client per call vs the shared LLMClientManager pool.
+
+Runs a local stub of the Responses endpoint and issues N sequential calls:
+
+  per-call  - `OpenAI(api_key=...)` built for every call (old behaviour)
+  pooled    - `llm_clients.sync_client()` (one keep-alive pool per process)
+
+Reports latency per call and how many TCP connections the stub accepted.
+With --tls the stub serves a throwaway self-signed certificate (needs the
+`openssl` CLI), which makes the handshake savings visible. Usage:
+
+    python -m benchmarks.bench_llm_client_reuse --calls 200 --tls
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from openai import OpenAI
+
+from app.integrations.llm_openai import llm_clients
+from app.settings import settings
+
+_RESPONSE = json.dumps(
+    {
+        "id": "resp_bench",
+        "object": "response",
+        "created_at": 0,
+        "model": "bench",
+        "status": "completed",
+        "output": [
+            {
+                "id": "msg_bench",
+                "type": "message",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": "ok", "annotations": []}],
+            }
+        ],
+    }
+).encode()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+    _lock = threading.Lock()
+
+    def setup(self):
+        with _StubHandler._lock:
+            _StubHandler.connections += 1
+        super().setup()
+
+    def do_POST(self):  # noqa: N802
+        self.rfile.read(int(self.headers.get("content-length") or 0))
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(_RESPONSE)
+
+    def log_message(self, *_args):
+        pass
+
+
+def _self_signed_cert(workdir: Path) -> tuple[str, str]:
+    cert, key = workdir / "cert.pem", workdir / "key.pem"
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+            "-keyout", str(key), "-out", str(cert),
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return str(cert), str(key)
+
+
+def _start_stub(tls: bool, workdir: Path) -> tuple[ThreadingHTTPServer, str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    scheme = "http"
+    if tls:
+        cert, key = _self_signed_cert(workdir)
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(cert, key)
+        server.socket = ctx.wrap_socket(server.socket, server_side=True)
+        # httpx picks the CA up from SSL_CERT_FILE for both client flavours
+        os.environ["SSL_CERT_FILE"] = cert
+        scheme = "https"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def _run(label: str, calls: int, make_client, close_each: bool) -> None:
+    _StubHandler.connections = 0
+    started = time.perf_counter()
+    for _ in range(calls):
+        client = make_client()
+        client.responses.create(model="bench", instructions="sys", input="hi")
+        if close_each:
+            client.close()
+    elapsed = time.perf_counter() - started
+    print(f"{label:>9} {calls:>6} {elapsed * 1000 / calls:>10.2f} {_StubHandler.connections:>12}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--tls", action="store_true", help="serve the stub over TLS (self-signed)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server, base_url = _start_stub(args.tls, Path(tmp))
+        settings.openai_api_key = "sk-bench"
+        settings.openai_base_url = base_url
+
+        print(f"stub: {base_url}")
+        print(f"{'client':>9} {'calls':>6} {'ms/call':>10} {'connections':>12}")
+        _run("per-call", args.calls, lambda: OpenAI(api_key="sk-bench", base_url=base_url), close_each=True)
+        _run("pooled", args.calls, llm_clients.sync_client, close_each=False)
+
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
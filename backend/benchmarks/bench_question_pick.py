@@ -0,0 +1,92 @@
+"""
+Question selection: `ORDER BY random() LIMIT 1` vs the in-memory QuestionIndex.
+
+Builds a synthetic bank (default 100k questions, 20 topics, levels 1-5) in an
+in-memory SQLite table shaped like `questions` and times picks for the
+practice band (levels 2-4), with and without a topic filter. SQLite, like
+Postgres, has to scan and sort every matching row for `ORDER BY random()`,
+so the SQL cost grows with the bank while the index pick stays flat.
+
+    python -m benchmarks.bench_question_pick --questions 100000 --picks 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sqlite3
+import time
+import uuid
+
+from app.services.question_bank import IndexedQuestion, QuestionIndex, _pick_question
+
+
+def _build(n: int, topics: int) -> tuple[sqlite3.Connection, list[IndexedQuestion], list[str]]:
+    topic_ids = [str(uuid.uuid4()) for _ in range(topics)]
+    rng = random.Random(1)
+    rows = [
+        (str(uuid.uuid4()), rng.choice(topic_ids), rng.randint(1, 5), f"Frage {i}?", f"Question {i}?")
+        for i in range(n)
+    ]
+
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        "CREATE TABLE questions (id TEXT PRIMARY KEY, topic_id TEXT NOT NULL, level INTEGER NOT NULL, "
+        "question_de TEXT NOT NULL, question_en TEXT NOT NULL)"
+    )
+    conn.execute("CREATE INDEX ix_questions_topic_id ON questions (topic_id)")
+    conn.executemany("INSERT INTO questions VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+
+    indexed = [IndexedQuestion(uuid.UUID(r[0]), uuid.UUID(r[1]), r[2], r[3], r[4]) for r in rows]
+    return conn, indexed, topic_ids
+
+
+def _time(fn, picks: int) -> float:
+    started = time.perf_counter()
+    for _ in range(picks):
+        fn()
+    return (time.perf_counter() - started) * 1e6 / picks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=100_000)
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--picks", type=int, default=200)
+    args = parser.parse_args()
+
+    conn, indexed, topic_ids = _build(args.questions, args.topics)
+
+    started = time.perf_counter()
+    index = QuestionIndex(indexed)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    topic = topic_ids[0]
+    sql_any = "SELECT * FROM questions WHERE level >= 2 AND level <= 4 ORDER BY random() LIMIT 1"
+    sql_topic = "SELECT * FROM questions WHERE topic_id = ? AND level >= 2 AND level <= 4 ORDER BY random() LIMIT 1"
+
+    results = [
+        ("sql, any topic", _time(lambda: conn.execute(sql_any).fetchone(), args.picks)),
+        ("sql, one topic", _time(lambda: conn.execute(sql_topic, (topic,)).fetchone(), args.picks)),
+        (
+            "index, any topic",
+            _time(lambda: _pick_question(index, mode="practice", topic_id=None, level_min=None, level_max=None), args.picks),
+        ),
+        (
+            "index, one topic",
+            _time(
+                lambda: _pick_question(index, mode="practice", topic_id=uuid.UUID(topic), level_min=None, level_max=None),
+                args.picks,
+            ),
+        ),
+    ]
+
+    print(f"bank: {args.questions} questions, index build {build_ms:.1f} ms")
+    print(f"{'strategy':>18} {'us/pick':>12}")
+    for label, us in results:
+        print(f"{label:>18} {us:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
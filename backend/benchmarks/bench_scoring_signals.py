@@ -0,0 +1,111 @@
+"""
+Signal detection: the original `_detect_signals` (regexes compiled through the
+`re` cache, one generator-driven scan per lexicon entry, separate month and
+time-hint passes) vs the current one on long answers.
+
+Answers are ~8000 characters of mixed DE/EN/RU prose; "plain" answers contain
+no lexicon entries (every scan runs to the end), "rich" answers hit early.
+
+    python -m benchmarks.bench_scoring_signals --chars 8000 --answers 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+
+from app.services import scoring
+from app.services.scoring import _Signals
+
+_FILLER = (
+    "der fahrer die strasse das auto the road a car with the police report und dann hat er "
+    "дорога машина водитель полиция протокол after the evening we drove home zusammen mit freunden"
+).split()
+
+
+def legacy_detect_signals(content: str) -> _Signals:
+    """The implementation `_detect_signals` replaced, kept verbatim for comparison."""
+    txt = re.sub(r"\s+", " ", (content or "").strip().lower())
+    tokens = [t for t in re.split(r"[^a-zA-Z0-9À-žА-Яа-яІіЇїЄєҐґ]+", txt) if t]
+    word_count = len(tokens)
+
+    has_numbers = bool(re.search(r"\d", txt))
+    has_month = any(m in txt for m in scoring._MONTHS)
+    has_time_hint = any(h in txt for h in scoring._TIME_HINTS)
+    has_time = has_numbers or has_month or has_time_hint
+
+    has_place_like = bool(re.search(r"\b(in|at|в|у|bei)\b\s+[A-ZÀ-ŽА-ЯІЇЄҐ]", content)) or bool(
+        re.search(r"\b(berlin|hamburg|münchen|munich|köln|cologne|kyiv|kiev|frankfurt)\b", txt)
+    )
+
+    has_actions = any(v in txt for v in scoring._ACTION_VERBS)
+    responsibility = any(m in txt for m in scoring._RESPONSIBILITY_MARKERS)
+    blame_shift = any(b in txt for b in scoring._BLAME_SHIFT)
+    vagueness = any(w in txt for w in scoring._VAGUE_WORDS)
+
+    contradictions: list[str] = []
+    for a, b in scoring._CONTRADICTION_PAIRS:
+        if a in txt and b in txt:
+            contradictions.append(f"'{a}' vs '{b}'")
+
+    return _Signals(
+        word_count=word_count,
+        has_numbers=has_numbers,
+        has_time=has_time,
+        has_place_like=has_place_like,
+        has_actions=has_actions,
+        responsibility=responsibility,
+        blame_shift=blame_shift,
+        vagueness=vagueness,
+        contradictions=contradictions,
+    )
+
+
+def _answer(rng: random.Random, chars: int, rich: bool) -> str:
+    lexicon = sorted(
+        scoring._VAGUE_WORDS
+        | scoring._BLAME_SHIFT
+        | scoring._RESPONSIBILITY_MARKERS
+        | scoring._ACTION_VERBS
+        | scoring._MONTHS
+        | {a for pair in scoring._CONTRADICTION_PAIRS for a in pair}
+    )
+    words: list[str] = []
+    size = 0
+    while size < chars:
+        w = rng.choice(lexicon) if rich and rng.random() < 0.2 else rng.choice(_FILLER)
+        words.append(w.capitalize() if rng.random() < 0.1 else w)
+        size += len(w) + 1
+    return " ".join(words)[:chars]
+
+
+def _bench(fn, answers: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for a in answers:
+            fn(a)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(answers) * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chars", type=int, default=8000)
+    ap.add_argument("--answers", type=int, default=200)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    rng = random.Random(3)
+    for label, rich in (("plain", False), ("rich", True)):
+        answers = [_answer(rng, args.chars, rich) for _ in range(args.answers)]
+        assert all(legacy_detect_signals(a) == scoring._detect_signals(a) for a in answers)
+        old = _bench(legacy_detect_signals, answers, args.repeat)
+        new = _bench(scoring._detect_signals, answers, args.repeat)
+        print(f"{label:>5}: legacy {old:8.1f} us/answer  current {new:8.1f} us/answer  ({old / new:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.domain.models import (
+    Booking,
+    Entitlement,
+    Order,
+    Product,
+    PublicConversation,
+    PublicConversationTurn,
+    RefreshToken,
+    Slot,
+    User,
+)
+
+
+class QueryCounter:
+    """Records every SQL statement sent through an engine."""
+
+    def __init__(self, engine):
+        self.statements: list[str] = []
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, _conn, _cursor, statement, _params, _context, _executemany):
+        self.statements.append(statement)
+
+    @contextmanager
+    def budget(self, max_queries: int):
+        """Fails the test if the block runs more than `max_queries` statements."""
+        start = len(self.statements)
+        yield
+        ran = self.statements[start:]
+        assert len(ran) <= max_queries, (
+            f"query budget exceeded: {len(ran)} > {max_queries}\n" + "\n---\n".join(ran)
+        )
+
+
+@pytest.fixture
+def sqlite_db():
+    """
+    In-memory SQLite with the account/purchase/booking/conversation tables (the Postgres-only
+    ones are left out). Yields (session factory, QueryCounter).
+    """
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    tables = (User, RefreshToken, Product, Order, Entitlement, Slot, Booking, PublicConversation, PublicConversationTurn)
+    for model in tables:
+        model.__table__.create(engine)
+    yield sessionmaker(bind=engine, autoflush=False, expire_on_commit=False), QueryCounter(engine)
+    engine.dispose()
@@ -0,0 +1,117 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.http.admission import (
+    ADMISSION_DECISIONS,
+    ADMISSION_SHED_SHARE,
+    AdmissionController,
+    AdmissionMiddleware,
+    admission,
+)
+from app.security.auth import create_access_token
+from app.settings import settings
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _client(controller):
+    app = FastAPI()
+
+    @app.get("/api/public/products")
+    def products():
+        return {"data": []}
+
+    @app.post("/api/payments/webhook")
+    def webhook():
+        return {"data": {"received": True}}
+
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    return TestClient(app)
+
+
+def test_shed_share_grows_while_delay_stays_over_target():
+    clock = Clock()
+    controller = AdmissionController(target_delay_s=0.1, interval_s=1.0, clock=clock)
+
+    for _ in range(3):
+        controller.observe_delay(0.5)
+        clock.now += 1.0
+        controller.observe_delay(0.2)  # closes the interval; its minimum is still over target
+    assert round(controller.shed_share, 2) == 0.3
+    assert controller.delay_s == 0.2
+
+    # one fast sample in the interval: not overloaded, the share halves
+    controller.observe_delay(0.01)
+    clock.now += 1.0
+    controller.observe_delay(0.5)
+    assert round(controller.shed_share, 2) == 0.15
+
+
+def test_full_public_surface_sheds_with_503_and_retry_after():
+    controller = AdmissionController(max_inflight=0, interval_s=1.0)
+    api = _client(controller)
+    before = ADMISSION_DECISIONS.value(decision="shed", reason="inflight")
+
+    resp = api.get("/api/public/products")
+    assert resp.status_code == 503
+    assert resp.json()["error"] == {
+        "code": "OVERLOADED",
+        "message": "Service is busy, retry shortly",
+        "details": {"reason": "inflight"},
+    }
+    assert resp.headers["Retry-After"] == "2"
+    assert ADMISSION_DECISIONS.value(decision="shed", reason="inflight") == before + 1
+
+    # the webhook and signed-in callers keep flowing
+    assert api.post("/api/payments/webhook").status_code == 200
+    token = create_access_token("00000000-0000-0000-0000-000000000001", "user")
+    assert api.get("/api/public/products", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+    assert api.get("/api/public/products", headers={"Authorization": "Bearer forged"}).status_code == 503
+    assert controller.inflight == 0
+
+
+def test_exempt_public_paths_are_never_shed(monkeypatch):
+    monkeypatch.setattr(settings, "admission_exempt_paths", ["/api/public/products"])
+    api = _client(AdmissionController(max_inflight=0, interval_s=1.0))
+
+    assert api.get("/api/public/products").status_code == 200
+
+    monkeypatch.setattr(settings, "admission_exempt_paths", [])
+    assert api.get("/api/public/products").status_code == 503
+
+
+def test_delay_shedding_is_probabilistic():
+    controller = AdmissionController(max_inflight=10, rand=iter([0.1, 0.9]).__next__)
+    controller.shed_share = 0.5
+    api = _client(controller)
+
+    assert api.get("/api/public/products").status_code == 503
+    assert api.get("/api/public/products").status_code == 200
+
+
+def test_probe_measures_threadpool_delay():
+    controller = AdmissionController(interval_s=0.05)
+
+    async def run():
+        controller.start()
+        await asyncio.sleep(0.3)
+        await controller.aclose()
+
+    asyncio.run(run())
+    assert 0 <= controller.delay_s < 0.1
+    assert controller.shed_share == 0.0
+
+
+def test_extra_controllers_leave_the_exported_gauges_alone():
+    other = AdmissionController()
+    other.shed_share = 0.9
+
+    assert ADMISSION_SHED_SHARE.value() == admission.shed_share
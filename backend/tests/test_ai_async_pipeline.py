@@ -0,0 +1,239 @@
+import asyncio
+from types import SimpleNamespace
+from uuid import uuid4
+
+import anyio
+import pytest
+
+from app.domain.models import APIError
+from app.services import ai_orchestrator
+
+
+class FakeAsyncDB:
+    def __init__(self, events):
+        self.events = events
+
+    async def commit(self):
+        self.events.append("commit")
+
+
+class FakeAsyncRepo:
+    def __init__(self, events, credits=1):
+        self.events = events
+        self.credits = credits
+        self.db = SimpleNamespace(info={})
+
+    async def take_entitlement(self, _user_id, _kind):
+        if self.credits <= 0:
+            return None
+        self.credits -= 1
+        self.events.append("credit")
+        return uuid4()
+
+    async def refund_entitlement(self, _entitlement_id):
+        self.credits += 1
+        self.events.append("refund")
+
+    async def delete_message(self, _message_id):
+        self.events.append("delete:user")
+
+    async def add_message(self, _session_id, role, content):
+        self.events.append(f"msg:{role}")
+        return SimpleNamespace(id=uuid4(), role=role, content=content)
+
+    async def add_evaluation(self, **_kwargs):
+        self.events.append("evaluation")
+
+    async def get_context_summary(self, _session_id):
+        return None
+
+    async def list_messages(self, _session_id, *, after=None, limit=50):
+        return []
+
+
+def _patch(monkeypatch, events, credits=1):
+    repo = FakeAsyncRepo(events, credits=credits)
+    monkeypatch.setattr(ai_orchestrator, "AsyncRepo", lambda _db: repo)
+
+    async def fake_question(_db, _session_id, locale, mode):
+        return "Next?"
+
+    async def fake_reply(**_kwargs):
+        events.append("llm")
+        return "Feedback"
+
+    async def fake_stream(**_kwargs):
+        events.append("llm")
+        for part in ("Feed", "back"):
+            yield part
+
+    monkeypatch.setattr(ai_orchestrator, "next_session_question_async", fake_question)
+    monkeypatch.setattr(ai_orchestrator, "generate_assistant_reply_async", fake_reply)
+    monkeypatch.setattr(ai_orchestrator, "stream_assistant_reply", fake_stream)
+    return repo
+
+
+class FakeSessionFactory:
+    def __init__(self, events):
+        self.events = events
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return FakeAsyncDB(self.events)
+
+    async def __aexit__(self, *_exc):
+        return False
+
+
+def test_async_pipeline_commits_before_llm_call(monkeypatch):
+    events: list[str] = []
+    _patch(monkeypatch, events)
+
+    msg = asyncio.run(
+        ai_orchestrator.process_user_message_async(FakeAsyncDB(events), uuid4(), uuid4(), "answer", "de", "practice")
+    )
+
+    assert msg.content == "Feedback"
+    assert events == ["credit", "msg:user", "commit", "llm", "msg:assistant", "evaluation", "commit"]
+
+
+def test_async_pipeline_without_credits_never_calls_llm(monkeypatch):
+    events: list[str] = []
+    _patch(monkeypatch, events, credits=0)
+
+    with pytest.raises(APIError) as exc:
+        asyncio.run(
+            ai_orchestrator.process_user_message_async(FakeAsyncDB(events), uuid4(), uuid4(), "answer", "de", "practice")
+        )
+
+    assert exc.value.code == "NO_CREDITS"
+    assert "llm" not in events
+
+
+def test_stream_turn_persists_reply_when_complete(monkeypatch):
+    events: list[str] = []
+    _patch(monkeypatch, events)
+
+    async def run():
+        turn = await ai_orchestrator.start_turn_async(FakeAsyncDB(events), uuid4(), uuid4(), "answer", "de", "mock")
+        return [item async for item in ai_orchestrator.stream_turn_async(turn, FakeSessionFactory(events))]
+
+    items = asyncio.run(run())
+
+    assert [v for k, v in items if k == "delta"] == ["Feed", "back"]
+    assert items[-1][0] == "done" and items[-1][1].content == "Feedback"
+    assert events[-3:] == ["msg:assistant", "evaluation", "commit"]
+    assert "refund" not in events
+
+
+def test_stream_turn_refunds_credit_on_disconnect(monkeypatch):
+    events: list[str] = []
+    repo = _patch(monkeypatch, events)
+
+    async def run():
+        turn = await ai_orchestrator.start_turn_async(FakeAsyncDB(events), uuid4(), uuid4(), "answer", "de", "mock")
+        stream = ai_orchestrator.stream_turn_async(turn, FakeSessionFactory(events))
+        await stream.__anext__()
+        await stream.aclose()  # client went away after the first token
+
+    asyncio.run(run())
+
+    assert repo.credits == 1
+    assert events[-3:] == ["refund", "delete:user", "commit"]
+    assert "msg:assistant" not in events
+
+
+def test_unstarted_stream_is_refunded_exactly_once(monkeypatch):
+    events: list[str] = []
+    repo = _patch(monkeypatch, events)
+
+    async def run():
+        turn = await ai_orchestrator.start_turn_async(FakeAsyncDB(events), uuid4(), uuid4(), "answer", "de", "mock")
+        # the client went away before the response body was iterated
+        await ai_orchestrator.settle_turn_async(turn, FakeSessionFactory(events))
+        await ai_orchestrator.settle_turn_async(turn, FakeSessionFactory(events))
+
+    asyncio.run(run())
+
+    assert repo.credits == 1
+    assert events.count("refund") == 1
+
+
+def test_settle_after_completed_stream_keeps_the_credit(monkeypatch):
+    events: list[str] = []
+    repo = _patch(monkeypatch, events)
+
+    async def run():
+        turn = await ai_orchestrator.start_turn_async(FakeAsyncDB(events), uuid4(), uuid4(), "answer", "de", "mock")
+        async for _ in ai_orchestrator.stream_turn_async(turn, FakeSessionFactory(events)):
+            pass
+        await ai_orchestrator.settle_turn_async(turn, FakeSessionFactory(events))
+
+    asyncio.run(run())
+
+    assert repo.credits == 0
+    assert "refund" not in events
+
+
+def test_closing_the_turn_stream_closes_the_provider_stream(monkeypatch):
+    events: list[str] = []
+    _patch(monkeypatch, events)
+
+    async def provider_stream(**_kwargs):
+        try:
+            yield "Feed"
+            yield "back"
+        finally:
+            events.append("provider:closed")
+
+    monkeypatch.setattr(ai_orchestrator, "stream_assistant_reply", provider_stream)
+
+    async def run():
+        turn = await ai_orchestrator.start_turn_async(FakeAsyncDB(events), uuid4(), uuid4(), "answer", "de", "mock")
+        stream = ai_orchestrator.stream_turn_async(turn, FakeSessionFactory(events))
+        await stream.__anext__()
+        await stream.aclose()
+
+    asyncio.run(run())
+
+    # closed before the refund, not left to garbage collection
+    assert events.index("provider:closed") < events.index("refund")
+
+
+def test_disconnect_during_the_finish_commit_keeps_the_answered_turn(monkeypatch):
+    events: list[str] = []
+    repo = _patch(monkeypatch, events)
+    committing = asyncio.Event()
+
+    class SlowCommitDB(FakeAsyncDB):
+        async def commit(self):
+            committing.set()
+            await asyncio.sleep(0.05)
+            self.events.append("commit")
+
+    class SlowSessionFactory(FakeSessionFactory):
+        async def __aenter__(self):
+            return SlowCommitDB(self.events)
+
+    async def run():
+        turn = await ai_orchestrator.start_turn_async(FakeAsyncDB(events), uuid4(), uuid4(), "answer", "de", "mock")
+
+        async def consume():
+            async for _ in ai_orchestrator.stream_turn_async(turn, SlowSessionFactory(events)):
+                pass
+
+        # Starlette cancels the streaming task through its task group when the client goes away
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(consume)
+            await committing.wait()
+            tg.cancel_scope.cancel()
+        return turn
+
+    turn = asyncio.run(run())
+
+    assert turn.settled
+    assert events[-3:] == ["msg:assistant", "evaluation", "commit"]
+    assert repo.credits == 0
+    assert "refund" not in events
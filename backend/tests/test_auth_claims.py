@@ -0,0 +1,114 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+from uuid import uuid4
+
+import jwt
+import pytest
+
+from app import deps
+from app.domain.models import APIError
+from app.security.auth import create_access_token, decode_access_token
+from app.security.token_versions import TokenVersionCache
+from app.settings import settings
+
+
+class NoQueryDB:
+    def get(self, *_args):
+        raise AssertionError("claims-only auth must not query the user")
+
+
+class FakeLoader:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.calls = []
+
+    def __call__(self, since):
+        self.calls.append(since)
+        return self.rows
+
+
+def _bearer(token: str) -> str:
+    return f"Bearer {token}"
+
+
+@pytest.fixture
+def versions(monkeypatch):
+    cache = TokenVersionCache(loader=FakeLoader(), refresh_s=3600)
+    monkeypatch.setattr(deps, "token_versions", cache)
+    monkeypatch.setattr(settings, "auth_claims_only", True)
+    return cache
+
+
+def test_access_token_carries_role_status_and_version():
+    payload = decode_access_token(create_access_token("u1", "admin", status="active", token_version=3))
+    assert (payload["role"], payload["st"], payload["tv"]) == ("admin", "active", 3)
+
+
+def test_principal_from_claims_without_queries(versions):
+    uid = uuid4()
+    principal = deps.get_principal(_bearer(create_access_token(str(uid), "consultant", token_version=0)), NoQueryDB())
+    assert (principal.id, principal.role) == (uid, "consultant")
+    assert deps.require_roles("consultant")(principal) is principal
+    with pytest.raises(APIError):
+        deps.require_roles("admin")(principal)
+
+
+def test_bumped_version_revokes_older_tokens(versions):
+    uid = uuid4()
+    old = create_access_token(str(uid), "user", token_version=0)
+    versions.note(uid, 1)
+
+    with pytest.raises(APIError) as exc:
+        deps.get_principal(_bearer(old), NoQueryDB())
+    assert exc.value.code == "TOKEN_REVOKED"
+
+    assert deps.get_principal(_bearer(create_access_token(str(uid), "user", token_version=1)), NoQueryDB()).id == uid
+
+
+def test_legacy_token_without_version_falls_back_to_db(versions, monkeypatch):
+    uid = uuid4()
+    legacy = jwt.encode({"sub": str(uid), "role": "user"}, settings.jwt_secret, algorithm="HS256")
+    identity = SimpleNamespace(id=uid, role="user", status="blocked", token_version=0)
+    monkeypatch.setattr(deps, "Repo", lambda _db: SimpleNamespace(get_user_identity=lambda _id: identity))
+
+    with pytest.raises(APIError) as exc:
+        deps.get_principal(_bearer(legacy), None)
+    assert exc.value.code == "USER_BLOCKED"
+
+
+def test_version_cache_polls_changed_rows_and_survives_failures():
+    uid = uuid4()
+    loader = FakeLoader([(uid, 2)])
+    cache = TokenVersionCache(loader=loader, refresh_s=0)
+
+    assert cache.current(uid) == 2
+    assert loader.calls[0] is None  # bootstrap: every user ever bumped
+
+    loader.rows = [(uid, 1)]  # versions never go backwards
+    assert cache.current(uid) == 2
+    assert loader.calls[1] is not None  # then only rows changed since the last poll
+
+    def broken(_since):
+        raise RuntimeError("db down")
+
+    cache._loader = broken
+    assert cache.current(uid) == 2
+
+
+def test_async_principal_refreshes_versions_off_the_event_loop(monkeypatch):
+    uid = uuid4()
+    threads = []
+
+    def loader(_since):
+        threads.append(threading.current_thread())
+        return [(uid, 1)]
+
+    monkeypatch.setattr(deps, "token_versions", TokenVersionCache(loader=loader, refresh_s=3600))
+    monkeypatch.setattr(settings, "auth_claims_only", True)
+    old = create_access_token(str(uid), "user", token_version=0)
+
+    with pytest.raises(APIError) as exc:
+        asyncio.run(deps.get_principal_async(_bearer(old), NoQueryDB()))
+    assert exc.value.code == "TOKEN_REVOKED"
+    assert threads and threads[0] is not threading.main_thread()
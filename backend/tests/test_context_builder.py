@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+from app.services import context_builder
+from app.services.context_builder import Turn, budget_for, pack, session_context, therapy_context
+from app.utils.tokens import count_tokens
+
+
+class FakeRepo:
+    """Messages of one session in memory, with the keyset/summary calls session_context() makes."""
+
+    def __init__(self):
+        self.messages = []
+        self.summary = None
+        self.rows_read = []
+
+    def add(self, role, content):
+        created = datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=len(self.messages))
+        self.messages.append(SimpleNamespace(id=uuid4(), role=role, content=content, created_at=created))
+
+    def get_context_summary(self, _session_id):
+        return self.summary
+
+    def list_messages(self, _session_id, *, after=None, limit=50):
+        rows = [m for m in self.messages if after is None or (m.created_at, m.id) > after][: limit + 1]
+        self.rows_read.append(len(rows))
+        return rows
+
+    def store_context_summary(self, _session_id, summary, last_created_at, last_message_id):
+        self.summary = SimpleNamespace(
+            context_summary=summary,
+            summary_last_created_at=last_created_at,
+            summary_last_message_id=last_message_id,
+        )
+
+
+def test_pack_keeps_newest_turns_within_budget():
+    turns = [Turn("user" if i % 2 == 0 else "assistant", f"turn {i} " + "word " * 150) for i in range(40)]
+    packed = pack("practice", summary="- earlier", turns=turns)
+
+    assert packed.tokens <= budget_for("practice").total
+    assert packed.turns[-1].content.startswith("turn 39")
+    assert [int(t.content.split()[1]) for t in packed.turns] == sorted(int(t.content.split()[1]) for t in packed.turns)
+
+
+def test_rolling_summary_reads_a_constant_window(monkeypatch):
+    monkeypatch.setattr(context_builder.settings, "llm_context_recent_messages", 4)
+    repo, session_id = FakeRepo(), uuid4()
+
+    sizes = []
+    for i in range(30):
+        context = session_context(repo, session_id, "practice")
+        sizes.append(context.tokens)
+        repo.add("user", f"Answer {i}: I drank on {i} evenings. More detail follows here.")
+        repo.add("assistant", f"Feedback {i}. Next question?")
+
+    # after the first turns every call reads the same handful of rows
+    assert max(repo.rows_read[5:]) <= 6
+    assert context.turns[-1].content.startswith("Feedback 28")
+    assert context.summary.endswith("- Answer 26: I drank on 26 evenings.")
+    assert "More detail" not in context.summary  # first sentence only
+    # the summary is capped too: the oldest digests went first
+    assert "Answer 0:" not in context.summary
+    assert count_tokens(context.summary) <= budget_for("practice").summary
+    assert max(sizes) <= budget_for("practice").total
+
+
+def test_backlog_is_folded_in_one_turn(monkeypatch):
+    monkeypatch.setattr(context_builder.settings, "llm_context_recent_messages", 4)
+    monkeypatch.setattr(context_builder, "_FOLD_BATCH", 10)
+    repo, session_id = FakeRepo(), uuid4()
+    for i in range(60):
+        repo.add("user" if i % 2 == 0 else "assistant", f"Message {i}.")
+
+    context = session_context(repo, session_id, "practice")
+    assert [t.content for t in context.turns] == ["Message 56.", "Message 57.", "Message 58.", "Message 59."]
+    assert repo.summary.summary_last_message_id == repo.messages[55].id
+
+
+def test_therapy_context_renders_facts_not_a_dict():
+    context = therapy_context(
+        {"reasons": ["alcohol"], "goal": "Get my licence back " * 200, "history": "", "focus": ["Stabilisation"]},
+        [{"role": "user", "content": "I feel anxious"}, {"role": "assistant", "content": "Tell me more"}],
+    )
+    text = context.render("en")
+    assert "reasons: alcohol" in text and "focus: Stabilisation" in text
+    assert "{" not in text and "history:" not in text
+    assert "User: I feel anxious\nAssistant: Tell me more" in text
+    assert count_tokens(context.facts) <= budget_for("therapy").facts
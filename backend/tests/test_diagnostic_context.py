@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from app.services import diagnostic_context
+from app.services.diagnostic_context import (
+    DEFAULT_CONTEXT,
+    DIAGNOSTIC_CACHE_SIZE,
+    DiagnosticContextCache,
+    diagnostic_contexts,
+)
+
+
+def _submission(history=""):
+    return SimpleNamespace(
+        reasons=["alcohol"], goal="Get my licence back", situation="", history=history, recommended_plan="pro"
+    )
+
+
+class Loader:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = 0
+
+    def __call__(self, submission_id):
+        self.calls += 1
+        return self.rows.get(submission_id)
+
+
+def test_twenty_turns_read_the_submission_once():
+    sid = uuid4()
+    load = Loader({sid: _submission(history="x" * 200)})
+    cache = DiagnosticContextCache(max_entries=10, ttl_s=60)
+
+    contexts = [cache.get(sid, load) for _ in range(20)]
+
+    assert load.calls == 1
+    assert all(c is contexts[0] for c in contexts)
+    assert contexts[0].plan == "pro" and contexts[0].risk_level == "high"
+    assert contexts[0].facts["focus"][0] == "Триггер: alcohol"
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(diagnostic_context.time, "monotonic", lambda: now[0])
+    sid = uuid4()
+    load = Loader({sid: _submission()})
+    cache = DiagnosticContextCache(max_entries=10, ttl_s=30)
+
+    cache.get(sid, load)
+    now[0] += 29
+    cache.get(sid, load)
+    assert load.calls == 1
+    now[0] += 2
+    cache.get(sid, load)
+    assert load.calls == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    a, b, c = uuid4(), uuid4(), uuid4()
+    load = Loader({a: _submission(), b: _submission(), c: _submission()})
+    cache = DiagnosticContextCache(max_entries=2, ttl_s=60)
+
+    cache.get(a, load)
+    cache.get(b, load)
+    cache.get(a, load)  # b is now the oldest
+    cache.get(c, load)
+    assert load.calls == 3
+    cache.get(a, load)
+    assert load.calls == 3
+    cache.get(b, load)
+    assert load.calls == 4
+
+
+def test_unknown_submission_is_not_cached():
+    sid = uuid4()
+    load = Loader({})
+    cache = DiagnosticContextCache(max_entries=10, ttl_s=60)
+
+    assert cache.get(sid, load) is None
+    load.rows[sid] = _submission()
+    assert cache.get(sid, load).plan == "pro"
+    assert load.calls == 2
+
+
+def test_default_context_is_read_only():
+    # contexts are shared between requests
+    with pytest.raises(TypeError):
+        DEFAULT_CONTEXT.facts["goal"] = "changed"
+
+
+def test_extra_caches_leave_the_exported_gauge_alone():
+    sid = uuid4()
+    cache = DiagnosticContextCache(max_entries=10, ttl_s=60)
+    cache.get(sid, Loader({sid: _submission()}))
+
+    assert DIAGNOSTIC_CACHE_SIZE.value() == len(diagnostic_contexts._entries)
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+
+from app.db.repo import Repo
+from app.domain.models import Entitlement, Order, Product, User
+from app.services import entitlements
+from app.services.entitlements import EmptyBalanceCache
+
+
+@pytest.fixture
+def ledger(sqlite_db, monkeypatch):
+    factory, counter = sqlite_db
+    monkeypatch.setattr(entitlements, "empty_balances", EmptyBalanceCache(ttl_s=60))
+    db = factory()
+    product = Product(code="AI_PACK", type="ai_pack", name_de="P", name_en="P", price_cents=100)
+    user = User(email="u@example.com", password_hash="!", name="U")
+    db.add_all([product, user])
+    db.flush()
+    yield db, user, product, counter
+    db.close()
+
+
+def _grant(db, user, product, qty, valid_to=None, kind="ai_credits") -> Entitlement:
+    order = Order(user_id=user.id, product_id=product.id, amount_cents=100, currency="EUR", provider_ref=uuid4().hex)
+    db.add(order)
+    db.flush()
+    ent = Entitlement(user_id=user.id, kind=kind, qty_total=qty, valid_to=valid_to, source_order_id=order.id)
+    db.add(ent)
+    db.commit()
+    return ent
+
+
+def test_take_uses_earliest_expiry_first_and_unlimited_last(ledger):
+    db, user, product, _ = ledger
+    now = datetime.now(timezone.utc)
+    unlimited = _grant(db, user, product, 1)
+    later = _grant(db, user, product, 1, valid_to=now + timedelta(days=30))
+    sooner = _grant(db, user, product, 1, valid_to=now + timedelta(days=2))
+    _grant(db, user, product, 5, valid_to=now - timedelta(days=1))  # expired
+
+    repo = Repo(db)
+    taken = [entitlements.take(repo, user.id, "ai_credits") for _ in range(4)]
+    db.commit()
+
+    assert taken == [sooner.id, later.id, unlimited.id, None]
+
+
+def test_exhausted_user_is_short_circuited_until_a_grant(ledger):
+    db, user, product, counter = ledger
+    repo = Repo(db)
+
+    assert entitlements.take(repo, user.id, "ai_credits") is None
+    with counter.budget(0):
+        assert entitlements.take(repo, user.id, "ai_credits") is None
+        assert not entitlements.has_units(repo, user.id, "ai_credits")
+
+    ent = _grant(db, user, product, 1)
+    entitlements.empty_balances.forget(user.id, "ai_credits")
+    assert entitlements.take(repo, user.id, "ai_credits") == ent.id
+
+
+def test_grant_clears_the_empty_entry_only_once_committed(ledger, monkeypatch):
+    db, user, product, _ = ledger
+    announced = []
+    monkeypatch.setattr(entitlements.grant_notices, "publish", lambda *key: announced.append(key))
+    assert entitlements.take(Repo(db), user.id, "ai_credits") is None
+
+    order = Order(user_id=user.id, product_id=product.id, amount_cents=100, currency="EUR", provider_ref="pi_1")
+    db.add(order)
+    db.flush()
+    db.add(Entitlement(user_id=user.id, kind="ai_credits", qty_total=1, source_order_id=order.id))
+    entitlements.granted(db, user.id, "ai_credits")
+    db.flush()
+    assert entitlements.empty_balances.known_empty(user.id, "ai_credits")  # not visible to other sessions yet
+    assert announced == []
+
+    db.commit()
+    assert not entitlements.empty_balances.known_empty(user.id, "ai_credits")
+    assert announced == [(user.id, "ai_credits")]
+
+
+def test_empty_read_overlapping_a_grant_is_not_cached():
+    cache = EmptyBalanceCache(ttl_s=60)
+    uid = uuid4()
+    before = cache.generation()  # reader starts its query
+    cache.forget(uid, "ai_credits")  # grant commits
+    cache.note_empty(uid, "ai_credits", before)  # reader saw the pre-commit balance
+    assert not cache.known_empty(uid, "ai_credits")
+
+    cache.note_empty(uid, "ai_credits", cache.generation())
+    assert cache.known_empty(uid, "ai_credits")
+
+
+def test_grant_notice_from_another_process_clears_the_entry(ledger):
+    _, user, _, _ = ledger
+    entitlements.empty_balances.note_empty(user.id, "booking_access", entitlements.empty_balances.generation())
+
+    entitlements.GrantNotices.received(f"{user.id}:booking_access".encode())
+
+    assert not entitlements.empty_balances.known_empty(user.id, "booking_access")
+
+
+def test_balances_per_kind(ledger):
+    db, user, product, _ = ledger
+    soon = datetime.now(timezone.utc) + timedelta(days=3)
+    _grant(db, user, product, 10)
+    _grant(db, user, product, 4, valid_to=soon)
+    _grant(db, user, product, 1, kind="booking_access")
+    entitlements.take(Repo(db), user.id, "ai_credits")
+    db.commit()
+
+    result = entitlements.balances(Repo(db), user.id)
+
+    assert result["ai_credits"]["remaining"] == 13
+    assert result["ai_credits"]["next_expiry"].startswith(soon.date().isoformat())
+    assert result["booking_access"] == {"remaining": 1, "next_expiry": None}
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import httpx
+import openai
+
+from app.integrations import llm_openai
+from app.integrations.llm_openai import CHAT, RESPONSES, EndpointBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_on_capability_error_and_probes_after_cooldown():
+    clock = FakeClock()
+    breaker = EndpointBreaker(failure_threshold=3, cooldown_s=60, clock=clock)
+
+    breaker.record_failure("m", RESPONSES, AttributeError("no responses api", name="responses"))
+    assert breaker.state("m", RESPONSES) == "open"
+    assert breaker.allow("m", RESPONSES) is False
+    assert breaker.allow("other-model", RESPONSES) is True
+
+    clock.now += 61
+    assert breaker.allow("m", RESPONSES) is True  # probe
+    assert breaker.allow("m", RESPONSES) is False  # only one probe at a time
+    breaker.record_success("m", RESPONSES)
+    assert breaker.state("m", RESPONSES) == "closed"
+
+
+def test_breaker_needs_threshold_for_transient_errors():
+    breaker = EndpointBreaker(failure_threshold=2, cooldown_s=60, clock=FakeClock())
+
+    breaker.record_failure("m", CHAT, TimeoutError())
+    assert breaker.state("m", CHAT) == "closed"
+    breaker.record_failure("m", CHAT, TimeoutError())
+    assert breaker.state("m", CHAT) == "open"
+
+
+def test_known_bad_responses_endpoint_is_skipped(monkeypatch):
+    calls = {"chat": 0}
+
+    def create(**_kwargs):
+        calls["chat"] += 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="chat reply"))])
+
+    # an SDK/client without the Responses API
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    breaker = EndpointBreaker(failure_threshold=3, cooldown_s=300)
+    monkeypatch.setattr(llm_openai, "llm_breaker", breaker)
+    monkeypatch.setattr(llm_openai.llm_clients, "sync_client", lambda: fake_client)
+
+    before = llm_openai.LLM_FALLBACKS.value(model="m", source=RESPONSES, target=CHAT, reason="breaker_open")
+    assert llm_openai._complete("m", "sys", "hi") == "chat reply"
+    assert llm_openai._complete("m", "sys", "hi") == "chat reply"
+
+    assert calls["chat"] == 2
+    assert breaker.state("m", RESPONSES) == "open"
+    after = llm_openai.LLM_FALLBACKS.value(model="m", source=RESPONSES, target=CHAT, reason="breaker_open")
+    assert after - before == 1
+
+
+def _bad_request(code):
+    response = httpx.Response(400, request=httpx.Request("POST", "https://api.openai.com/v1/responses"))
+    return openai.BadRequestError("bad request", response=response, body={"code": code})
+
+
+def test_single_bad_request_leaves_the_breaker_closed():
+    breaker = EndpointBreaker(failure_threshold=1, cooldown_s=300, clock=FakeClock())
+
+    breaker.record_failure("m", RESPONSES, _bad_request("context_length_exceeded"))
+    breaker.record_failure("m", CHAT, _bad_request("context_length_exceeded"))
+    assert breaker.allow("m", RESPONSES) is True
+    assert breaker.allow("m", CHAT) is True
+
+    # a bug in our own code is a transient failure, not a missing endpoint
+    breaker = EndpointBreaker(failure_threshold=3, cooldown_s=300, clock=FakeClock())
+    breaker.record_failure("m", RESPONSES, AttributeError("'NoneType' object has no attribute 'text'"))
+    assert breaker.state("m", RESPONSES) == "closed"
+
+    breaker.record_failure("m", RESPONSES, _bad_request("unsupported_parameter"))
+    assert breaker.state("m", RESPONSES) == "open"
@@ -0,0 +1,25 @@
+import asyncio
+
+from app.integrations.llm_openai import LLMClientManager
+
+
+def test_llm_client_manager_reuses_clients_until_key_changes(monkeypatch):
+    monkeypatch.setattr("app.integrations.llm_openai.settings.openai_api_key", "sk-test-1")
+    manager = LLMClientManager()
+
+    first = manager.sync_client()
+    assert manager.sync_client() is first
+    assert manager.async_client() is manager.async_client()
+
+    monkeypatch.setattr("app.integrations.llm_openai.settings.openai_api_key", "sk-test-2")
+    assert manager.sync_client() is not first
+
+    asyncio.run(manager.aclose())
+    assert manager._sync is None and manager._async is None
+
+
+def test_llm_client_manager_start_is_noop_without_key(monkeypatch):
+    monkeypatch.setattr("app.integrations.llm_openai.settings.openai_api_key", "")
+    manager = LLMClientManager()
+    manager.start()
+    assert manager._sync is None and manager._async is None
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.domain.models import APIError
+from app.integrations.llm_dispatch import LLM_BULKHEAD_CALLS, MEMBER, PUBLIC, LLMBulkhead, llm_bulkhead
+
+
+def test_class_limit_and_full_queue_fail_fast():
+    bulkhead = LLMBulkhead(max_concurrency=4, class_limits={PUBLIC: 1}, queue_limits={PUBLIC: 0}, timeout_s=1)
+
+    with bulkhead.acquire(PUBLIC):
+        with pytest.raises(APIError) as err:
+            bulkhead.acquire(PUBLIC)
+        # members still get in while public is at its limit
+        with bulkhead.acquire(MEMBER):
+            pass
+
+    assert err.value.status_code == 503
+    assert err.value.code == "LLM_BUSY"
+    assert err.value.details["reason"] == "queue_full"
+    assert int(err.value.headers["Retry-After"]) >= 1
+    with bulkhead.acquire(PUBLIC):
+        pass
+
+
+def test_freed_slot_goes_to_members_first():
+    bulkhead = LLMBulkhead(max_concurrency=1, queue_limits={MEMBER: 4, PUBLIC: 4}, timeout_s=5)
+    served = []
+
+    async def call(traffic, name):
+        with await bulkhead.acquire_async(traffic):
+            served.append(name)
+            await asyncio.sleep(0)
+
+    async def run():
+        slot = await bulkhead.acquire_async(PUBLIC)
+        tasks = [asyncio.create_task(call(PUBLIC, "public-1"))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call(MEMBER, "member-1")))
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call(PUBLIC, "public-2")))
+        await asyncio.sleep(0)
+        assert bulkhead.snapshot()[(PUBLIC, "queued")] == 2
+        slot.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert served == ["member-1", "public-1", "public-2"]
+
+
+def test_wait_times_out_and_leaves_the_queue():
+    bulkhead = LLMBulkhead(max_concurrency=1, queue_limits={MEMBER: 1}, timeout_s=0.05)
+    held = bulkhead.acquire(MEMBER)
+
+    with pytest.raises(APIError) as err:
+        bulkhead.acquire(MEMBER)
+    assert err.value.details["reason"] == "timeout"
+    assert bulkhead.snapshot()[(MEMBER, "queued")] == 0
+
+    held.release()
+    held.release()  # idempotent
+    assert bulkhead.snapshot()[(MEMBER, "running")] == 0
+
+
+def test_threads_never_exceed_the_limit():
+    bulkhead = LLMBulkhead(max_concurrency=3, queue_limits={MEMBER: 50}, timeout_s=5)
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def worker():
+        with bulkhead.acquire(MEMBER):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            threading.Event().wait(0.005)
+            with lock:
+                running[0] -= 1
+
+    threads = [threading.Thread(target=worker) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert peak[0] == 3
+    assert bulkhead.snapshot() == {(MEMBER, "running"): 0.0, (MEMBER, "queued"): 0.0}
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    bulkhead = LLMBulkhead(max_concurrency=1, queue_limits={MEMBER: 2}, timeout_s=5)
+
+    async def run():
+        slot = await bulkhead.acquire_async(MEMBER)
+        waiter = asyncio.create_task(bulkhead.acquire_async(MEMBER))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        slot.release()
+
+    asyncio.run(run())
+    assert bulkhead.snapshot() == {(MEMBER, "running"): 0.0, (MEMBER, "queued"): 0.0}
+
+
+def test_extra_bulkheads_leave_the_exported_gauge_alone():
+    other = LLMBulkhead(max_concurrency=1)
+    with other.acquire(MEMBER):
+        assert LLM_BULKHEAD_CALLS.collect() == llm_bulkhead.snapshot()
@@ -0,0 +1,70 @@
+import io
+import json
+
+import pytest
+import structlog
+
+from app.utils import log_pipeline as module
+from app.utils.log_pipeline import LOG_BUFFER_DEPTH, LOG_EVENTS_DROPPED, LogPipeline
+
+
+def test_events_are_written_in_batches_as_json_lines(monkeypatch):
+    out = io.StringIO()
+    writes = []
+    out.write = lambda text, _write=out.write: writes.append(text) or _write(text)
+    pipe = LogPipeline(lambda: out, max_events=100, batch_size=3)
+    monkeypatch.setattr(pipe, "start", lambda: None)  # no writer thread; flush by hand
+
+    for i in range(7):
+        assert pipe.submit({"event": "e", "i": i})
+    assert pipe.flush() == 7
+
+    assert len(writes) == 3  # 3 + 3 + 1
+    assert [json.loads(line)["i"] for line in out.getvalue().splitlines()] == list(range(7))
+
+
+def test_full_buffer_drops_and_counts(monkeypatch):
+    pipe = LogPipeline(io.StringIO, max_events=2, batch_size=10)
+    monkeypatch.setattr(pipe, "start", lambda: None)
+    dropped = LOG_EVENTS_DROPPED.value()
+
+    results = [pipe.submit({"event": "e"}) for _ in range(5)]
+
+    assert results == [True, True, False, False, False]
+    assert LOG_EVENTS_DROPPED.value() == dropped + 3
+
+
+def test_structlog_events_go_through_the_writer_thread():
+    out = io.StringIO()
+    pipe = LogPipeline(lambda: out, flush_interval_s=0.01)
+    log = structlog.wrap_logger(structlog.PrintLogger(io.StringIO()), processors=[pipe])
+
+    log.info("payment_event_processed", event_id="evt_1")
+    pipe.stop()
+
+    assert json.loads(out.getvalue()) == {"event": "payment_event_processed", "event_id": "evt_1"}
+
+
+@pytest.mark.parametrize(
+    "status, duration_ms, kept",
+    [(200, 5, False), (404, 5, True), (500, 5, True), (200, 5000, True)],
+)
+def test_request_sampling_keeps_errors_and_slow_requests(monkeypatch, status, duration_ms, kept):
+    monkeypatch.setattr(module.settings, "log_request_sample_rate", 0.0)
+    monkeypatch.setattr(module.settings, "log_slow_request_ms", 1000.0)
+
+    assert LogPipeline().should_log_request(status, duration_ms) is kept
+
+
+def test_extra_pipelines_leave_the_exported_gauge_alone(monkeypatch):
+    process_wide = LogPipeline(lambda: io.StringIO(), max_events=100)
+    monkeypatch.setattr(module, "log_pipeline", process_wide)
+    other = LogPipeline(lambda: io.StringIO(), max_events=100)
+    for pipe in (process_wide, other):
+        monkeypatch.setattr(pipe, "start", lambda: None)
+
+    process_wide.submit({"event": "e"})
+    for i in range(5):
+        other.submit({"event": "e", "i": i})
+
+    assert LOG_BUFFER_DEPTH.value() == 1
@@ -0,0 +1,85 @@
+import threading
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.db.instrumentation import begin_request_tally, instrument_engine
+from app.main import app
+from app.utils.metrics import Counter, Histogram, Registry, render
+
+
+def test_render_text_format():
+    registry = Registry()
+    hits = registry._get_or_create(Counter, "hits_total", "Hits", ("path",))
+    latency = registry._get_or_create(Histogram, "latency_seconds", "Latency", (), buckets=(0.1, 1.0))
+    hits.inc(path='/a"b')
+    hits.inc(2, path='/a"b')
+    latency.observe(0.05)
+    latency.observe(0.1)
+    latency.observe(3)
+
+    lines = render(registry).splitlines()
+    assert "# TYPE hits_total counter" in lines
+    assert 'hits_total{path="/a\\"b"} 3' in lines
+    assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{le="1"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert "latency_seconds_sum 3.15" in lines
+    assert "latency_seconds_count 3" in lines
+
+
+def test_metrics_endpoint_labels_requests_by_route_template():
+    client = TestClient(app)
+    client.get("/health")
+    client.get("/no/such/path/123")
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = resp.text
+    assert 'http_request_duration_seconds_count{route="/health",method="GET",status="200"}' in body
+    assert 'http_request_duration_seconds_count{route="unmatched",method="GET",status="404"}' in body
+    assert "/no/such/path/123" not in body
+    assert "# TYPE db_pool_checkout_wait_seconds histogram" in body
+
+
+def test_metrics_token(monkeypatch):
+    monkeypatch.setattr("app.main.settings.metrics_token", "s3cret")
+    client = TestClient(app)
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+
+def test_statements_are_tallied_per_request(sqlite_db):
+    factory, _ = sqlite_db
+    db = factory()
+    instrument_engine(db.get_bind(), "test")
+
+    tally = begin_request_tally()
+    db.execute(text("SELECT 1"))
+    db.execute(text("SELECT 2"))
+    db.close()
+
+    assert tally.statements == 2
+    assert tally.seconds > 0
+
+
+def test_shards_of_exited_threads_are_folded():
+    registry = Registry()
+    calls = registry._get_or_create(Counter, "t_calls_total", "calls", ("op",))
+    latency = registry._get_or_create(Histogram, "t_latency_seconds", "latency", buckets=(0.1, 1.0))
+
+    def worker():
+        calls.inc(op="a")
+        latency.observe(0.5)
+
+    for _ in range(20):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+    assert calls.value(op="a") == 20
+    assert latency.count() == 20 and latency.sum() == 10.0
+    assert calls._shards == [] and latency._shards == []
+    calls.inc(op="a")  # the main thread keeps its live shard
+    assert calls.value(op="a") == 21 and len(calls._shards) == 1
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+from uuid import UUID, uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import deps
+from app.db.session import get_db
+from app.domain.models import APIError, Booking, Role, Slot, User
+from app.main import app
+from app.security.auth import create_access_token
+from app.security.token_versions import TokenVersionCache
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def api(sqlite_db, monkeypatch):
+    factory, counter = sqlite_db
+
+    def override_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_db
+    monkeypatch.setattr(deps, "token_versions", TokenVersionCache(loader=lambda _since: [], refresh_s=3600))
+    yield TestClient(app), factory, counter
+    app.dependency_overrides.pop(get_db, None)
+
+
+def _auth(user: User) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(str(user.id), user.role.value, token_version=0)}"}
+
+
+def _walk(client, url, headers, limit):
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit} | ({"cursor": cursor} if cursor else {})
+        body = client.get(url, params=params, headers=headers).json()
+        pages.append([row["id"] for row in body["data"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_cursor_roundtrip_and_rejects_garbage():
+    key = (datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc), uuid4())
+    assert decode_cursor(encode_cursor(*key), datetime, UUID) == key
+    with pytest.raises(APIError) as exc:
+        decode_cursor("bm90LWEta2V5", datetime, UUID)
+    assert exc.value.code == "INVALID_CURSOR"
+
+
+def test_admin_users_pages_through_equal_timestamps(api):
+    client, factory, counter = api
+    created = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    db = factory()
+    # same created_at for everyone: the id breaks ties, nobody is skipped or repeated
+    users = [
+        User(email=f"u{i}@example.com", password_hash="!", name=f"U{i}", role=Role.user, created_at=created)
+        for i in range(7)
+    ]
+    users[0].role = Role.admin
+    db.add_all(users)
+    db.commit()
+
+    with counter.budget(1):
+        first = client.get("/api/admin/users", params={"limit": 3}, headers=_auth(users[0])).json()
+    assert len(first["data"]) == 3 and first["next_cursor"]
+
+    pages = _walk(client, "/api/admin/users", _auth(users[0]), limit=3)
+    assert [len(p) for p in pages] == [3, 3, 1]
+    assert sorted(i for p in pages for i in p) == sorted(str(u.id) for u in users)
+    db.close()
+
+
+def test_my_bookings_newest_first_in_pages(api):
+    client, factory, _ = api
+    db = factory()
+    user = User(email="b@example.com", password_hash="!", name="B")
+    db.add(user)
+    db.flush()
+    start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    bookings = []
+    for i in range(5):
+        slot = Slot(consultant_id=user.id, starts_at_utc=start + timedelta(days=i), duration_min=50, title="S")
+        db.add(slot)
+        db.flush()
+        bookings.append(Booking(user_id=user.id, slot_id=slot.id, created_at=start + timedelta(hours=i)))
+    db.add_all(bookings)
+    db.commit()
+
+    pages = _walk(client, "/api/booking/my", _auth(user), limit=2)
+    assert pages == [[str(b.id) for b in reversed(bookings)][i : i + 2] for i in (0, 2, 4)]
+
+    resp = client.get("/api/booking/my", params={"cursor": "%%%"}, headers=_auth(user))
+    assert resp.status_code == 422
+    db.close()
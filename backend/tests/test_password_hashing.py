@@ -0,0 +1,140 @@
+import asyncio
+import threading
+
+import pytest
+from passlib.hash import pbkdf2_sha256
+
+from app.domain.models import APIError
+from app.security import passwords
+from app.security.passwords import (
+    PASSWORD_HASH_QUEUE,
+    PasswordHasher,
+    is_usable_password,
+    password_hasher,
+    unusable_password,
+)
+
+
+def test_unusable_password_never_verifies():
+    hasher = PasswordHasher(workers=0)
+    marker = unusable_password()
+
+    assert not is_usable_password(marker)
+    assert hasher.verify(marker, marker) == (False, None)
+    assert hasher.verify("anything", None) == (False, None)
+
+
+def test_verify_upgrades_hash_below_current_rounds():
+    hasher = PasswordHasher(workers=0)
+    old_hash = pbkdf2_sha256.using(rounds=1000).hash("secret-123")
+    hasher.rounds = 2000
+
+    assert hasher.verify("wrong-pass", old_hash) == (False, None)
+    valid, upgraded = hasher.verify("secret-123", old_hash)
+    assert valid
+    assert pbkdf2_sha256.from_string(upgraded).rounds == 2000
+    assert hasher.verify("secret-123", upgraded) == (True, None)
+
+
+def test_verify_keeps_hash_near_current_rounds(monkeypatch):
+    # another replica calibrated a little lower: not worth a rehash on every login
+    monkeypatch.setattr(passwords.settings, "password_hash_min_rounds", 1000)
+    hasher = PasswordHasher(workers=0)
+    hasher.rounds = 10_000
+
+    near = pbkdf2_sha256.using(rounds=8_500).hash("secret-123")
+    assert hasher.verify("secret-123", near) == (True, None)
+
+    far = pbkdf2_sha256.using(rounds=7_000).hash("secret-123")
+    valid, upgraded = hasher.verify("secret-123", far)
+    assert valid
+    assert pbkdf2_sha256.from_string(upgraded).rounds == 10_000
+
+
+def test_verify_upgrades_hash_below_the_floor(monkeypatch):
+    monkeypatch.setattr(passwords.settings, "password_hash_min_rounds", 9_000)
+    hasher = PasswordHasher(workers=0)
+    hasher.rounds = 10_000
+
+    valid, upgraded = hasher.verify("secret-123", pbkdf2_sha256.using(rounds=8_500).hash("secret-123"))
+    assert valid
+    assert pbkdf2_sha256.from_string(upgraded).rounds == 10_000
+
+
+def test_worker_pool_does_not_fork(monkeypatch):
+    created = {}
+
+    class FakePool:
+        def __init__(self, max_workers, mp_context):
+            created["method"] = mp_context.get_start_method()
+
+    monkeypatch.setattr(passwords, "ProcessPoolExecutor", FakePool)
+    PasswordHasher(workers=1)._executor()
+
+    assert created["method"] in {"forkserver", "spawn"}
+
+
+def test_tune_respects_minimum_rounds(monkeypatch):
+    monkeypatch.setattr(passwords.settings, "password_hash_min_rounds", 50_000)
+    monkeypatch.setattr(passwords, "_time_hash", lambda rounds: 1.0)  # very slow machine
+    hasher = PasswordHasher(workers=0)
+
+    assert hasher.tune(target_ms=100) == 50_000
+
+
+def test_full_queue_fails_fast_with_503(monkeypatch):
+    release = threading.Event()
+    entered = threading.Event()
+
+    def slow_hash(password, rounds):
+        entered.set()
+        release.wait(5)
+        return "hashed"
+
+    monkeypatch.setattr(passwords, "_hash", slow_hash)
+    hasher = PasswordHasher(workers=0, max_pending=1)
+
+    worker = threading.Thread(target=hasher.hash, args=("first-password",))
+    worker.start()
+    entered.wait(5)
+    try:
+        with pytest.raises(APIError) as err:
+            hasher.hash("second-password")
+        assert err.value.status_code == 503
+        assert err.value.headers == {"Retry-After": "1"}
+    finally:
+        release.set()
+        worker.join()
+
+    assert hasher.hash("third-password") == "hashed"
+
+
+def test_async_hash_holds_no_thread_while_waiting():
+    # with a real pool the wait is a future on the event loop, not a blocked worker thread
+    hasher = PasswordHasher(workers=1)
+    try:
+
+        async def run():
+            hashed = await hasher.hash_async("secret-123")
+            return await hasher.verify_async("secret-123", hashed)
+
+        valid, upgraded = asyncio.run(run())
+        assert valid and upgraded is None
+        assert hasher.queue_depth() == 0
+    finally:
+        hasher.shutdown()
+
+
+def test_async_full_queue_fails_fast_with_503():
+    hasher = PasswordHasher(workers=0, max_pending=0)
+
+    with pytest.raises(APIError) as err:
+        asyncio.run(hasher.hash_async("secret-123"))
+    assert err.value.code == "AUTH_BUSY" and err.value.status_code == 503
+
+
+def test_extra_hashers_leave_the_exported_gauge_alone():
+    other = PasswordHasher(workers=1)
+    other._pending = 10
+
+    assert PASSWORD_HASH_QUEUE.value() == password_hasher.queue_depth()
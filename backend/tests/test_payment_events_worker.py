@@ -0,0 +1,124 @@
+import asyncio
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.domain.models import APIError, PaymentEvent
+from app.http import routes_payments
+from app.services import payment_events
+
+
+def _session_factory():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    PaymentEvent.__table__.create(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)
+
+
+def test_worker_applies_due_events_and_backs_off_failures(monkeypatch):
+    factory = _session_factory()
+    db = factory()
+    for i, etype in enumerate(["checkout.session.completed", "charge.refunded", "checkout.session.completed"]):
+        db.add(PaymentEvent(event_id=f"evt_{i}", type=etype, payload_json={"id": f"evt_{i}", "type": etype}))
+    db.add(PaymentEvent(event_id="evt_done", type="x", payload_json={}, processed_at=datetime.now(timezone.utc)))
+    db.commit()
+    db.close()
+
+    seen = []
+
+    def fake_apply(_db, event):
+        seen.append(event["id"])
+        if event["id"] == "evt_2":
+            raise APIError("ORDER_NOT_FOUND", "Order for provider reference not found", status_code=404)
+        return event["type"] == "checkout.session.completed"
+
+    monkeypatch.setattr(payment_events, "apply_payment_event", fake_apply)
+    applied_before = payment_events.PAYMENT_EVENT_RESULTS.value(outcome="applied")
+
+    assert payment_events.drain_payment_events(factory, concurrency=1) == 3
+    assert sorted(seen) == ["evt_0", "evt_1", "evt_2"]
+    assert payment_events.PAYMENT_EVENT_RESULTS.value(outcome="applied") == applied_before + 1
+
+    db = factory()
+    rows = {e.event_id: e for e in db.scalars(select(PaymentEvent))}
+    assert rows["evt_0"].processed_at is not None and rows["evt_1"].processed_at is not None
+    failed = rows["evt_2"]
+    assert failed.processed_at is None and failed.attempts == 1
+    assert failed.last_error.startswith("APIError") and failed.available_at is not None
+    db.close()
+
+    # the failed event is not due yet, nothing else is pending
+    assert payment_events.drain_payment_events(factory, concurrency=1) == 0
+
+
+def test_event_failing_its_last_attempt_is_dead_lettered(monkeypatch):
+    factory = _session_factory()
+    db = factory()
+    db.add(PaymentEvent(event_id="evt_dead", type="checkout.session.completed", payload_json={}, attempts=2))
+    db.commit()
+    db.close()
+
+    def broken_apply(_db, _event):
+        raise RuntimeError("order table unreachable")
+
+    monkeypatch.setattr(payment_events, "apply_payment_event", broken_apply)
+    monkeypatch.setattr(payment_events.settings, "payment_event_max_attempts", 3)
+    dead_before = payment_events.PAYMENT_EVENT_RESULTS.value(outcome="dead")
+
+    assert payment_events.drain_payment_events(factory, concurrency=1) == 1
+    assert payment_events.PAYMENT_EVENT_RESULTS.value(outcome="dead") == dead_before + 1
+
+    db = factory()
+    evt = db.scalar(select(PaymentEvent))
+    assert evt.attempts == 3 and evt.failed_at is not None and evt.available_at is None
+    assert evt.last_error == "RuntimeError: order table unreachable"
+    db.close()
+
+    # never claimed again, even with a higher attempt budget
+    monkeypatch.setattr(payment_events.settings, "payment_event_max_attempts", 10)
+    assert payment_events.drain_payment_events(factory, concurrency=1) == 0
+
+
+class _FakeAsyncDB:
+    def __init__(self):
+        self.commits = 0
+
+    async def commit(self):
+        self.commits += 1
+
+
+class _FakeAsyncRepo:
+    stored: set[str] = set()
+
+    def __init__(self, _db):
+        pass
+
+    async def enqueue_payment_event(self, provider, event_id, event_type, payload):
+        if event_id in self.stored:
+            return False
+        self.stored.add(event_id)
+        return True
+
+
+class _FakeRequest:
+    async def body(self):
+        return b"{}"
+
+
+def test_webhook_only_stores_the_event(monkeypatch):
+    monkeypatch.setattr(
+        routes_payments,
+        "construct_event",
+        lambda **_kw: {"id": "evt_1", "type": "checkout.session.completed"},
+    )
+    monkeypatch.setattr(routes_payments, "AsyncRepo", _FakeAsyncRepo)
+    _FakeAsyncRepo.stored = set()
+    db = _FakeAsyncDB()
+
+    first = asyncio.run(routes_payments.webhook(_FakeRequest(), "sig", db))
+    replay = asyncio.run(routes_payments.webhook(_FakeRequest(), "sig", db))
+
+    assert first["data"] == {"received": True, "deduplicated": False}
+    assert replay["data"]["deduplicated"] is True
+    assert db.commits == 2
@@ -0,0 +1,94 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app.db.session import get_db
+from app.domain.models import CatalogState, Product
+from app.main import app
+from app.services import catalog as catalog_module
+from app.services.catalog import ProductCatalog
+
+
+@pytest.fixture
+def shop(sqlite_db, monkeypatch):
+    factory, counter = sqlite_db
+    CatalogState.__table__.create(factory.kw["bind"])
+    db = factory()
+    db.add(CatalogState(id=1, version=1))
+    db.add_all(
+        [
+            Product(code="PLAN_PRO", type="program", name_de="Pro", name_en="Pro", price_cents=70000),
+            Product(code="OLD", type="program", name_de="Old", name_en="Old", price_cents=100, active=False),
+        ]
+    )
+    db.commit()
+    db.close()
+
+    def override_db():
+        session = factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_db
+    monkeypatch.setattr(catalog_module.catalog, "_check_s", 3600)
+    catalog_module.catalog.reset()
+    yield TestClient(app), factory, counter
+    app.dependency_overrides.pop(get_db, None)
+    catalog_module.catalog.reset()
+
+
+def _bump(factory, **changes):
+    # what the products trigger does in Postgres
+    db = factory()
+    db.execute(update(Product).where(Product.code == "PLAN_PRO").values(**changes))
+    db.execute(update(CatalogState).values(version=CatalogState.version + 1))
+    db.commit()
+    db.close()
+
+
+def test_lookups_are_served_from_the_snapshot(shop):
+    _, factory, counter = shop
+    cat = ProductCatalog(check_s=3600)
+    db = factory()
+
+    pro = cat.get_by_code(db, "PLAN_PRO")
+    with counter.budget(0):
+        assert cat.get(db, pro.id) is pro
+        assert cat.get_by_code(db, "OLD") is None  # inactive products are not sold by code
+        assert [p.code for p in cat.list_active(db)] == ["PLAN_PRO"]
+    db.close()
+
+
+def test_snapshot_is_rebuilt_only_when_the_version_moves(shop):
+    _, factory, counter = shop
+    cat = ProductCatalog(check_s=0)
+    db = factory()
+    first = cat.snapshot(db)
+
+    with counter.budget(1):  # version check only
+        assert cat.snapshot(db) is first
+
+    _bump(factory, price_cents=80000)
+    rebuilt = cat.snapshot(db)
+    assert rebuilt.version == first.version + 1
+    assert rebuilt.by_code["PLAN_PRO"].price_cents == 80000
+    db.close()
+
+
+def test_products_endpoint_supports_conditional_get(shop):
+    client, factory, counter = shop
+    first = client.get("/api/public/products")
+    assert first.json()["data"][0]["code"] == "PLAN_PRO"
+    assert first.headers["cache-control"] == "public, max-age=60"
+
+    with counter.budget(0):
+        again = client.get("/api/public/products", headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+
+    _bump(factory, price_cents=80000)
+    catalog_module.catalog.invalidate()  # what the admin product route does after commit
+    changed = client.get("/api/public/products", headers={"If-None-Match": first.headers["etag"]})
+    assert changed.status_code == 200
+    assert changed.json()["data"][0]["price_cents"] == 80000
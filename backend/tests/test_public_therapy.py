@@ -1,4 +1,21 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from uuid import UUID, uuid4
+
+import anyio
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db.session import get_db
+from app.deps import Principal, get_principal
+from app.domain.models import PublicConversation, PublicConversationTurn
+from app.http import routes_public
+from app.integrations.llm_dispatch import PUBLIC, LLMBulkhead
 from app.integrations.llm_openai import generate_therapy_reply
+from app.main import app
+from app.security.rate_limit import limiter
+from app.services.public_conversations import purge_stale_conversations
 
 
 def test_generate_therapy_reply_fallback_when_no_key(monkeypatch):
@@ -7,9 +24,152 @@ def test_generate_therapy_reply_fallback_when_no_key(monkeypatch):
     reply = generate_therapy_reply(
         locale="ru",
         diagnostic_context={"focus": ["Триггер: алкоголь"]},
-        history=[{"role": "user", "content": "Мне тревожно"}],
         user_message="Мне тревожно",
     )
 
     assert "Триггер: алкоголь" in reply
     assert len(reply) > 30
+
+
+@pytest.fixture
+def client(sqlite_db, monkeypatch):
+    factory, counter = sqlite_db
+
+    def override_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    prompts = []
+
+    async def fake_reply(*, locale, diagnostic_context, user_message, context=""):
+        prompts.append(context)
+        return f"reply to {user_message}"
+
+    app.dependency_overrides[get_db] = override_db
+    monkeypatch.setattr(routes_public, "generate_therapy_reply_async", fake_reply)
+    limiter.reset()
+    yield TestClient(app), prompts, counter
+    app.dependency_overrides.pop(get_db, None)
+
+
+def test_conversation_state_is_kept_server_side(client):
+    api, prompts, _ = client
+
+    first = api.post("/api/public/therapy/reply", json={"message": "Мне тревожно", "locale": "ru"}).json()
+    handle = first["conversation_id"]
+    assert handle
+
+    second = api.post(
+        "/api/public/therapy/reply",
+        json={"message": "Что сказать на MPU?", "locale": "ru", "conversation_id": handle},
+    ).json()
+    assert second["conversation_id"] == handle
+    assert "Клиент: Мне тревожно" in prompts[-1]
+    assert "Эксперт: reply to Мне тревожно" in prompts[-1]
+
+    missing = api.post(
+        "/api/public/therapy/reply",
+        json={"message": "hello", "conversation_id": "00000000-0000-0000-0000-000000000000"},
+    )
+    assert missing.status_code == 404
+    assert missing.json()["error"]["code"] == "CONVERSATION_NOT_FOUND"
+
+
+def test_clients_sending_history_stay_stateless(client):
+    api, prompts, counter = client
+
+    with counter.budget(0):
+        resp = api.post(
+            "/api/public/therapy/reply",
+            json={"message": "Und jetzt?", "locale": "de", "history": [{"role": "user", "content": "Hallo"}]},
+        )
+    assert resp.status_code == 200
+    assert resp.json()["conversation_id"] is None
+    assert "Nutzer: Hallo" in prompts[-1]
+
+
+def test_failed_first_reply_stores_no_conversation(client, sqlite_db, monkeypatch):
+    api, _, _ = client
+    factory, _ = sqlite_db
+
+    async def broken_reply(**_kwargs):
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(routes_public, "generate_therapy_reply_async", broken_reply)
+    with pytest.raises(RuntimeError):
+        api.post("/api/public/therapy/reply", json={"message": "Мне тревожно", "locale": "ru"})
+
+    db = factory()
+    assert db.query(PublicConversation).count() == 0
+    db.close()
+
+
+def test_stale_conversations_are_purged_with_their_turns(client, sqlite_db):
+    api, _, _ = client
+    factory, _ = sqlite_db
+    stale = api.post("/api/public/therapy/reply", json={"message": "Мне тревожно"}).json()["conversation_id"]
+    fresh = api.post("/api/public/therapy/reply", json={"message": "Что дальше?"}).json()["conversation_id"]
+
+    db = factory()
+    db.get(PublicConversation, UUID(stale)).updated_at = datetime.now(timezone.utc) - timedelta(days=31)
+    db.commit()
+    db.close()
+
+    assert purge_stale_conversations(factory) == 1
+
+    db = factory()
+    assert [str(c.id) for c in db.query(PublicConversation)] == [fresh]
+    assert {str(t.conversation_id) for t in db.query(PublicConversationTurn)} == {fresh}
+    db.close()
+
+
+def test_busy_assistant_answers_503_before_any_write(client, monkeypatch):
+    api, prompts, counter = client
+    full = LLMBulkhead(class_limits={PUBLIC: 0}, queue_limits={PUBLIC: 0})
+    monkeypatch.setattr(routes_public, "llm_bulkhead", full)
+
+    with counter.budget(0):
+        resp = api.post("/api/public/therapy/reply", json={"message": "Мне тревожно", "locale": "ru"})
+    assert resp.status_code == 503
+    assert resp.json()["error"]["code"] == "LLM_BUSY"
+    assert resp.headers["Retry-After"]
+    assert prompts == []
+
+
+def test_queued_public_replies_leave_the_threadpool_to_members(client, monkeypatch):
+    bulkhead = LLMBulkhead(max_concurrency=4, class_limits={PUBLIC: 1}, queue_limits={PUBLIC: 8}, timeout_s=30)
+    monkeypatch.setattr(routes_public, "llm_bulkhead", bulkhead)
+    member = Principal(id=uuid4(), role="user", status="active", token_version=0)
+    app.dependency_overrides[get_principal] = lambda: member
+
+    async def main():
+        # two threads: with the old sync handler, two queued public requests would hold both
+        anyio.to_thread.current_default_thread_limiter().total_tokens = 2
+        held = await bulkhead.acquire_async(PUBLIC)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            public = [
+                asyncio.create_task(http.post("/api/public/therapy/reply", json={"message": "Мне тревожно"}))
+                for _ in range(4)
+            ]
+            for _ in range(500):
+                if bulkhead.snapshot().get((PUBLIC, "queued")) == 4:
+                    break
+                await asyncio.sleep(0.01)
+            assert bulkhead.snapshot()[(PUBLIC, "queued")] == 4
+
+            # a paid sync route (threadpool) is served while the public queue is full
+            balances = await asyncio.wait_for(http.get("/api/auth/me/entitlements"), 5)
+            held.release()
+            return balances, await asyncio.gather(*public)
+
+    try:
+        balances, replies = asyncio.run(main())
+    finally:
+        app.dependency_overrides.pop(get_principal, None)
+
+    assert balances.status_code == 200
+    assert [r.status_code for r in replies] == [200] * 4
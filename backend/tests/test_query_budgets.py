@@ -0,0 +1,85 @@
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import deps
+from app.db.session import get_db
+from app.domain.models import Entitlement, Order, Product, Role, User
+from app.main import app
+from app.security.auth import create_access_token, hash_password
+from app.security.token_versions import TokenVersionCache
+
+
+@pytest.fixture
+def api(sqlite_db, monkeypatch):
+    factory, counter = sqlite_db
+
+    def override_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_db
+    monkeypatch.setattr(deps, "token_versions", TokenVersionCache(loader=lambda _since: [], refresh_s=3600))
+    yield TestClient(app), factory, counter
+    app.dependency_overrides.pop(get_db, None)
+
+
+def _seed_users_with_history(factory, n_users=3, purchases=15) -> list[User]:
+    db = factory()
+    product = Product(code=f"P{uuid4().hex[:6]}", type="ai_pack", name_de="P", name_en="P", price_cents=100)
+    db.add(product)
+    users = []
+    for i in range(n_users):
+        user = User(
+            email=f"u{i}@example.com",
+            password_hash=hash_password("secret-123"),
+            name=f"U{i}",
+            role=Role.admin if i == 0 else Role.user,
+        )
+        db.add(user)
+        db.flush()
+        for _ in range(purchases):
+            order = Order(user_id=user.id, product_id=product.id, amount_cents=100, currency="EUR", provider_ref=uuid4().hex)
+            db.add(order)
+            db.flush()
+            db.add(Entitlement(user_id=user.id, kind="ai_credits", qty_total=5, source_order_id=order.id))
+        users.append(user)
+    db.commit()
+    db.close()
+    return users
+
+
+def _auth(user: User) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(str(user.id), user.role.value, token_version=0)}"}
+
+
+def test_me_is_one_query_regardless_of_purchase_history(api):
+    client, factory, counter = api
+    user = _seed_users_with_history(factory)[1]
+
+    with counter.budget(1):
+        resp = client.get("/api/auth/me", headers=_auth(user))
+    assert resp.status_code == 200 and resp.json()["data"]["email"] == "u1@example.com"
+
+
+def test_admin_user_list_is_one_query(api):
+    client, factory, counter = api
+    admin = _seed_users_with_history(factory)[0]
+
+    # role check comes from the token claims, the listing is a single projection
+    with counter.budget(1):
+        resp = client.get("/api/admin/users", headers=_auth(admin))
+    assert resp.status_code == 200 and len(resp.json()["data"]) == 3
+
+
+def test_login_loads_only_the_user_and_stores_a_refresh_token(api):
+    client, factory, counter = api
+    _seed_users_with_history(factory)
+
+    with counter.budget(2):
+        resp = client.post("/api/auth/login", json={"email": "u2@example.com", "password": "secret-123"})
+    assert resp.status_code == 200 and resp.json()["data"]["refresh_token"]
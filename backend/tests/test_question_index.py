@@ -0,0 +1,137 @@
+import asyncio
+import random
+import threading
+from types import SimpleNamespace
+from uuid import uuid4
+
+from app.services import question_bank
+from app.services.question_bank import IndexedQuestion, QuestionIndex
+
+
+def _q(topic_id, level):
+    return IndexedQuestion(id=uuid4(), topic_id=topic_id, level=level, question_de=f"de-{level}", question_en=f"en-{level}")
+
+
+def test_question_index_samples_within_band_and_topic():
+    t1, t2 = uuid4(), uuid4()
+    index = QuestionIndex([_q(t1, 1), _q(t1, 3), _q(t2, 3), _q(t2, 5)])
+    rng = random.Random(7)
+
+    picks = {index.sample(topic_id=None, level_min=2, level_max=4, rng=rng).topic_id for _ in range(50)}
+    assert picks == {t1, t2}
+
+    for _ in range(20):
+        q = index.sample(topic_id=t2, level_min=4, level_max=5, rng=rng)
+        assert (q.topic_id, q.level) == (t2, 5)
+
+    assert index.sample(topic_id=t1, level_min=5, level_max=5) is None
+
+
+def test_next_question_widens_and_reloads_after_invalidation(monkeypatch):
+    topic = uuid4()
+    loads = []
+
+    def fake_load(_db):
+        loads.append(1)
+        return QuestionIndex([_q(topic, 2)])
+
+    monkeypatch.setattr(question_bank, "load_question_index", fake_load)
+    question_bank.invalidate_question_index()
+
+    # unknown topic -> widened to any topic within the practice band
+    assert question_bank.next_question(None, locale="en", mode="practice", topic_id=uuid4()) == "en-2"
+    # explicit band with no match -> widened back to the mode band, served from the cached index
+    assert question_bank.next_question(None, locale="de", mode="practice", level_min=5, level_max=5) == "de-2"
+    assert len(loads) == 1
+
+    question_bank.invalidate_question_index()
+    question_bank.next_question(None, locale="de", mode="diagnostic")
+    assert len(loads) == 2
+
+
+class FakeAsyncDB:
+    def __init__(self, rows, on_execute=None):
+        self.rows = rows
+        self.queries = 0
+        self.on_execute = on_execute
+
+    async def execute(self, _stmt):
+        self.queries += 1
+        await asyncio.sleep(0)
+        if self.on_execute:
+            self.on_execute()
+        return SimpleNamespace(all=lambda: self.rows)
+
+
+def test_async_index_loads_once_and_builds_off_the_event_loop(monkeypatch):
+    topic = uuid4()
+    builders = []
+    build = question_bank._build_index
+
+    def recording_build(rows):
+        builders.append(threading.current_thread())
+        return build(rows)
+
+    monkeypatch.setattr(question_bank, "_build_index", recording_build)
+    question_bank.invalidate_question_index()
+    db = FakeAsyncDB([(uuid4(), topic, 2, "de-2", "en-2")])
+
+    async def main():
+        return await asyncio.gather(*(question_bank.get_question_index_async(db) for _ in range(5)))
+
+    indexes = asyncio.run(main())
+
+    assert db.queries == 1 and len({id(i) for i in indexes}) == 1
+    assert builders and builders[0] is not threading.main_thread()
+    assert question_bank._cached_index() is indexes[0]
+
+
+def test_async_load_overlapping_an_invalidation_is_not_cached():
+    question_bank.invalidate_question_index()
+    db = FakeAsyncDB([(uuid4(), uuid4(), 2, "de-2", "en-2")], on_execute=question_bank.invalidate_question_index)
+
+    index = asyncio.run(question_bank.get_question_index_async(db))
+
+    assert index.size == 1  # the caller still gets its rows
+    assert question_bank._cached_index() is None
+
+
+class FakePlanRepo:
+    """Mimics the UPDATE ... RETURNING cursor semantics of Repo.advance_question_cursor()."""
+
+    def __init__(self):
+        self.plan = None
+        self.cursor = 0
+        self.rebuilds = 0
+
+    def advance_question_cursor(self, _session_id):
+        if self.plan is None or self.cursor * 16 >= len(self.plan):
+            return None
+        self.cursor += 1
+        return self.plan[(self.cursor - 1) * 16 : self.cursor * 16]
+
+    def store_question_plan(self, _session_id, plan, cursor=0):
+        self.plan, self.cursor = plan, cursor
+        self.rebuilds += 1
+
+
+def test_session_plan_never_repeats_until_band_exhausted(monkeypatch):
+    topic = uuid4()
+    bank = [_q(topic, level) for level in (2, 3, 4, 4, 3)] + [_q(topic, 1)]  # level 1 is outside practice
+    index = QuestionIndex(bank)
+    repo = FakePlanRepo()
+    monkeypatch.setattr(question_bank, "get_question_index", lambda _db: index)
+    monkeypatch.setattr(question_bank, "Repo", lambda _db: repo)
+
+    session_id = uuid4()
+    first_round = []
+    for _ in range(5):
+        question_bank.next_session_question(None, session_id, "en", mode="practice")
+        first_round.append(index.get(question_bank._plan_entry(repo.plan[(repo.cursor - 1) * 16 : repo.cursor * 16])))
+
+    assert len({q.id for q in first_round}) == 5
+    assert all(2 <= q.level <= 4 for q in first_round)
+    assert repo.rebuilds == 1
+
+    question_bank.next_session_question(None, session_id, "en", mode="practice")
+    assert repo.rebuilds == 2 and repo.cursor == 1
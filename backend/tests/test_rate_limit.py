@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.domain.models import APIError
+from app.main import api_error_handler
+from app.security.auth import create_access_token
+from app.security.rate_limit import GCRA_SCRIPT, MemoryBackend, RateLimiter, RedisBackend, gcra, parse_rate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """Runs the limiter script's logic in Python against a dict (one server shared by all 'workers')."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.values: dict[str, float] = {}
+        self.fail = False
+
+    def register_script(self, script):
+        assert script == GCRA_SCRIPT
+
+        async def run(keys, args):
+            if self.fail:
+                raise ConnectionError("redis down")
+            interval, window = float(args[0]), float(args[1])
+            rate = parse_rate(f"{round(window / interval)}/{int(window)} seconds")
+            decision, tat = gcra(self.values.get(keys[0], 0.0), self.clock(), rate)
+            self.values[keys[0]] = tat
+            return [int(decision.allowed), str(decision.remaining), str(decision.retry_after_s)]
+
+        return run
+
+
+def test_parse_rate():
+    assert parse_rate("5/minute").window_s == 60
+    assert parse_rate("100 per hour").limit == 100
+    assert parse_rate("10/30 seconds").window_s == 30
+    with pytest.raises(ValueError):
+        parse_rate("fast")
+
+
+def test_burst_then_steady_rate():
+    clock = FakeClock()
+    backend = MemoryBackend(clock=clock)
+    rate = parse_rate("5/minute")
+
+    results = [backend.hit_sync("k", rate) for _ in range(6)]
+    assert [r.allowed for r in results] == [True] * 5 + [False]
+    assert results[0].remaining == 4
+    assert results[-1].retry_after_s == pytest.approx(12)
+
+    clock.now += 12
+    assert backend.hit_sync("k", rate).allowed
+
+
+def test_workers_share_one_budget_through_redis():
+    clock = FakeClock()
+    redis = FakeRedis(clock)
+    workers = [RateLimiter(shared=RedisBackend(redis)) for _ in range(3)]
+    rate = parse_rate("5/minute")
+
+    async def run():
+        return [await workers[i % 3].hit("auth.login:ip:1.2.3.4", rate) for i in range(9)]
+
+    assert sum(d.allowed for d in asyncio.run(run())) == 5
+
+
+def test_redis_failure_falls_back_to_local_limits():
+    clock = FakeClock()
+    redis = FakeRedis(clock)
+    redis.fail = True
+    limiter = RateLimiter(shared=RedisBackend(redis), local=MemoryBackend(clock=clock))
+    rate = parse_rate("2/minute")
+
+    async def run():
+        return [await limiter.hit("k", rate) for _ in range(3)]
+
+    assert [d.allowed for d in asyncio.run(run())] == [True, True, False]
+
+
+def test_dependency_keys_by_user_and_answers_429(monkeypatch):
+    limiter = RateLimiter(local=MemoryBackend(clock=FakeClock()))
+    app = FastAPI()
+    app.add_exception_handler(APIError, api_error_handler)
+
+    @app.post("/x", dependencies=[Depends(limiter.limit("test.x", "1/minute"))])
+    def x():
+        return {"data": {"ok": True}}
+
+    client = TestClient(app)
+    alice = {"Authorization": f"Bearer {create_access_token('alice', 'user')}"}
+    bob = {"Authorization": f"Bearer {create_access_token('bob', 'user')}"}
+
+    assert client.post("/x", headers=alice).status_code == 200
+    limited = client.post("/x", headers=alice)
+    assert limited.status_code == 429
+    assert limited.json()["error"]["code"] == "RATE_LIMIT"
+    assert limited.headers["retry-after"] == "60"
+    assert client.post("/x", headers=bob).status_code == 200  # same address, other user
+    assert client.post("/x").status_code == 200  # anonymous: keyed by address
+
+    monkeypatch.setattr("app.security.rate_limit.settings.rate_limits", {"test.x": "5/minute"})
+    carol = {"Authorization": f"Bearer {create_access_token('carol', 'user')}"}
+    assert [client.post("/x", headers=carol).status_code for _ in range(6)] == [200] * 5 + [429]
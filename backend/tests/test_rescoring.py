@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.domain.models import AIEvaluation, AIMessage, ScoringCheckpoint
+from app.services.rescoring import rescore_messages
+
+
+def _session_factory():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    for model in (AIMessage, AIEvaluation, ScoringCheckpoint):
+        model.__table__.create(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)
+
+
+def _seed(factory, n_user: int) -> None:
+    session_id = uuid4()
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    db = factory()
+    for i in range(n_user):
+        # pairs share a timestamp so the keyset has to fall back to the id
+        ts = base + timedelta(seconds=i // 2)
+        db.add(AIMessage(session_id=session_id, role="user", content=f"I did stop in Berlin {i}", created_at=ts))
+        db.add(AIMessage(session_id=session_id, role="assistant", content="ok", created_at=ts))
+    db.commit()
+    db.close()
+
+
+def test_rescore_writes_versioned_rows_and_resumes_from_checkpoint():
+    factory = _session_factory()
+    _seed(factory, 11)
+
+    first = rescore_messages(factory, version="v-test", batch_size=3, workers=0, limit=5)
+    assert (first.processed, first.written) == (5, 5)
+
+    progress = []
+    second = rescore_messages(factory, version="v-test", batch_size=3, workers=0, progress=progress.append)
+    assert (second.processed, second.written, second.total_processed) == (6, 6, 11)
+    assert len(progress) == 2
+
+    db = factory()
+    rows = db.execute(select(AIEvaluation.message_id, AIEvaluation.scoring_version)).all()
+    user_ids = set(db.scalars(select(AIMessage.id).where(AIMessage.role == "user")))
+    assert {r.message_id for r in rows} == user_ids
+    assert len(rows) == 11 and {r.scoring_version for r in rows} == {"v-test"}
+    assert db.get(ScoringCheckpoint, "v-test").processed == 11
+    db.close()
+
+    # nothing left past the checkpoint
+    assert rescore_messages(factory, version="v-test", workers=0).processed == 0
+
+
+def test_rescore_restart_skips_rows_already_written_for_the_version():
+    factory = _session_factory()
+    _seed(factory, 4)
+    rescore_messages(factory, version="v1", batch_size=10, workers=0)
+
+    again = rescore_messages(factory, version="v1", batch_size=10, workers=0, restart=True)
+    assert (again.processed, again.written) == (4, 0)
+
+    other = rescore_messages(factory, version="v2", batch_size=10, workers=0)
+    assert other.written == 4
+
+    db = factory()
+    assert db.scalar(select(func.count()).select_from(AIEvaluation)) == 8
+    db.close()
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.domain.models import AIEvaluation, AISession
+from app.services import rubric_reports
+from app.services.rubric_reports import RUBRIC_KEYS, RubricFrame, cohort_report, session_report, summarize
+
+
+def test_summarize_matches_per_group_numpy_reference():
+    rng = np.random.default_rng(5)
+    n = 400
+    groups = np.array(["a", "b", "c"], dtype=object)[rng.integers(0, 3, n)]
+    scores = rng.integers(0, 6, (n, len(RUBRIC_KEYS))).astype(float)
+    scores[rng.random((n, len(RUBRIC_KEYS))) < 0.05] = np.nan
+    frame = RubricFrame(session_ids=groups, user_ids=groups, modes=groups, scores=scores)
+
+    for row in summarize(frame, "mode"):
+        sub = scores[groups == row["key"]]
+        assert row["count"] == len(sub)
+        for j, key in enumerate(RUBRIC_KEYS):
+            col = sub[:, j][~np.isnan(sub[:, j])]
+            x = np.arange(len(sub))[~np.isnan(sub[:, j])]
+            assert row["mean"][key] == round(col.mean(), 3)
+            assert row["p10"][key] == round(np.percentile(col, 10), 3)
+            assert row["p90"][key] == round(np.percentile(col, 90), 3)
+            assert abs(row["trend"][key] - np.polyfit(x, col, 1)[0]) < 1e-3
+
+
+def _db():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    for model in (AISession, AIEvaluation):
+        model.__table__.create(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)()
+
+
+def _add_session(db, user_id, mode, status, clarity_series):
+    sess = AISession(user_id=user_id, mode=mode, status=status)
+    db.add(sess)
+    db.flush()
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for i, clarity in enumerate(clarity_series):
+        db.add(
+            AIEvaluation(
+                session_id=sess.id,
+                message_id=uuid4(),
+                rubric_scores={"clarity": clarity, "specificity": 3, "consistency": 4, "responsibility": 2},
+                summary_feedback="",
+                detected_issues={},
+                scoring_version="v1",
+                created_at=base + timedelta(minutes=i),
+            )
+        )
+    db.commit()
+    return sess
+
+
+def test_reports_group_and_cache_closed_sessions(monkeypatch):
+    rubric_reports.clear_session_report_cache()
+    db = _db()
+    user = uuid4()
+    closed = _add_session(db, user, "practice", "closed", [1, 2, 3, 4])
+    _add_session(db, user, "mock", "active", [5, 5])
+
+    report = cohort_report(db, version="v1", group_by="mode")
+    assert report["overall"]["count"] == 6
+    by_mode = {g["key"]: g for g in report["groups"]}
+    assert by_mode["practice"]["mean"]["clarity"] == 2.5
+    assert by_mode["practice"]["trend"]["clarity"] == 1.0
+    assert by_mode["mock"]["trend"]["clarity"] == 0.0
+    assert cohort_report(db, version="v0")["groups"] == []
+
+    first = session_report(db, closed.id, version="v1")
+    assert first["summary"]["p50"]["clarity"] == 2.5
+
+    monkeypatch.setattr(rubric_reports, "load_rubric_frame", lambda *a, **k: (_ for _ in ()).throw(AssertionError))
+    assert session_report(db, closed.id, version="v1") is first
@@ -0,0 +1,79 @@
+import random
+import re
+
+from app.services import scoring
+from app.services.scoring import _detect_signals, _Signals
+
+
+def _reference_signals(content: str) -> _Signals:
+    # Frozen copy of the original implementation; _detect_signals must agree with it exactly.
+    txt = re.sub(r"\s+", " ", (content or "").strip().lower())
+    tokens = [t for t in re.split(r"[^a-zA-Z0-9À-žА-Яа-яІіЇїЄєҐґ]+", txt) if t]
+    has_numbers = bool(re.search(r"\d", txt))
+    return _Signals(
+        word_count=len(tokens),
+        has_numbers=has_numbers,
+        has_time=has_numbers
+        or any(m in txt for m in scoring._MONTHS)
+        or any(h in txt for h in scoring._TIME_HINTS),
+        has_place_like=bool(re.search(r"\b(in|at|в|у|bei)\b\s+[A-ZÀ-ŽА-ЯІЇЄҐ]", content))
+        or bool(re.search(r"\b(berlin|hamburg|münchen|munich|köln|cologne|kyiv|kiev|frankfurt)\b", txt)),
+        has_actions=any(v in txt for v in scoring._ACTION_VERBS),
+        responsibility=any(m in txt for m in scoring._RESPONSIBILITY_MARKERS),
+        blame_shift=any(b in txt for b in scoring._BLAME_SHIFT),
+        vagueness=any(w in txt for w in scoring._VAGUE_WORDS),
+        contradictions=[f"'{a}' vs '{b}'" for a, b in scoring._CONTRADICTION_PAIRS if a in txt and b in txt],
+    )
+
+
+_CRAFTED = [
+    "",
+    "   ",
+    "I did it in Berlin on 12.03.2021, they made me, maybe.",
+    "Ich habe einen Fehler gemacht. Seit März besuche ich einen Kurs bei Müller.",
+    "Я беру ответственность, я никогда не пил, но иногда бывало. В Киеве.",
+    "never\tsometimes\n\nalways often",
+    "bin Berlin, xat Munich, at_ Hamburg, in Köln, у Дома",
+    "in Berlin",
+    "Kyiv2021 frankfurter mainz",
+    "NOT MY FAULT — Irgendwie quasi.",
+    "ich habe   mich\nangemeldet",
+    "٣ months",
+]
+
+_ALPHABET = list("abcdefghijklmnopqrstuvwxyzäöüßABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÜабвгдеиклмнопрстуяАБВГДКМЯ0123456789_-.,")
+_ALPHABET += [" ", " ", " ", "\t", "\n", " ", " "]
+
+
+def _random_text(rng: random.Random) -> str:
+    lexicon = sorted(
+        scoring._VAGUE_WORDS
+        | scoring._BLAME_SHIFT
+        | scoring._RESPONSIBILITY_MARKERS
+        | scoring._ACTION_VERBS
+        | scoring._TIME_HINTS
+        | scoring._MONTHS
+        | set(scoring._CITIES)
+        | {w for pair in scoring._CONTRADICTION_PAIRS for w in pair}
+        | {"in", "at", "bei", "в", "у", "Berlin", "Köln", "Дом"}
+    )
+    parts = []
+    for _ in range(rng.randint(0, 30)):
+        if rng.random() < 0.4:
+            word = rng.choice(lexicon)
+            parts.append(word.upper() if rng.random() < 0.1 else word)
+        else:
+            parts.append("".join(rng.choice(_ALPHABET) for _ in range(rng.randint(1, 6))))
+    return "".join(p + rng.choice(_ALPHABET[-7:] + ["", ","]) for p in parts)
+
+
+def test_detect_signals_matches_reference_on_crafted_inputs():
+    for text in _CRAFTED:
+        assert _detect_signals(text) == _reference_signals(text), text
+
+
+def test_detect_signals_matches_reference_on_random_inputs():
+    rng = random.Random(2024)
+    for _ in range(3000):
+        text = _random_text(rng)
+        assert _detect_signals(text) == _reference_signals(text), text
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db.session import get_db
+from app.domain.models import Slot
+from app.main import app
+from app.services import slots
+
+
+@pytest.fixture
+def api(sqlite_db, monkeypatch):
+    factory, counter = sqlite_db
+
+    def override_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_db
+    monkeypatch.setattr(slots.slot_listings, "_ttl_s", 60)
+    slots.slot_listings.invalidate()
+    yield TestClient(app), factory, counter
+    app.dependency_overrides.pop(get_db, None)
+
+
+def _add_slots(factory, starts: list[datetime], status="open"):
+    db = factory()
+    db.add_all(
+        Slot(consultant_id=uuid4(), starts_at_utc=s, duration_min=50, title=f"S{i}", status=status)
+        for i, s in enumerate(starts)
+    )
+    db.commit()
+    db.close()
+
+
+def test_window_excludes_past_and_pages_with_cursor(api):
+    client, factory, _ = api
+    now = datetime.now(timezone.utc)
+    _add_slots(factory, [now - timedelta(days=1)])
+    _add_slots(factory, [now + timedelta(days=1)], status="booked")
+    _add_slots(factory, [now + timedelta(hours=h) for h in range(1, 6)])
+    _add_slots(factory, [now + timedelta(days=90)])  # outside the default window
+
+    first = client.get("/api/public/slots", params={"limit": 3}).json()
+    assert [s["title"] for s in first["data"]] == ["S0", "S1", "S2"]
+    assert first["next_cursor"]
+
+    second = client.get("/api/booking/slots", params={"limit": 3, "cursor": first["next_cursor"]}).json()
+    assert [s["title"] for s in second["data"]] == ["S3", "S4"]
+    assert second["next_cursor"] is None
+
+    bad = client.get("/api/public/slots", params={"cursor": "not-a-cursor"})
+    assert bad.status_code == 422
+    assert bad.json()["error"]["code"] == "INVALID_CURSOR"
+
+
+def test_unchanged_calendar_is_cached_and_revalidates_with_304(api):
+    client, factory, counter = api
+    _add_slots(factory, [datetime.now(timezone.utc) + timedelta(hours=2)])
+
+    first = client.get("/api/public/slots")
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    with counter.budget(0):
+        again = client.get("/api/public/slots", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+
+
+def test_changes_invalidate_the_cached_page(api):
+    client, factory, _ = api
+    now = datetime.now(timezone.utc)
+    _add_slots(factory, [now + timedelta(hours=2)])
+    etag = client.get("/api/public/slots").headers["etag"]
+
+    _add_slots(factory, [now + timedelta(hours=3)])
+    assert client.get("/api/public/slots", headers={"If-None-Match": etag}).status_code == 304  # still cached
+
+    slots.slot_listings.invalidate()  # what booking/cancel/admin slot creation do after commit
+    fresh = client.get("/api/public/slots", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert len(fresh.json()["data"]) == 2